@@ -4,7 +4,7 @@ import os
 import threading
 
 from PyStoreDB.conf import DEFAULT_STORE_NAME, PyStoreDBSettings
-from PyStoreDB.core import CollectionReference, DocumentReference
+from PyStoreDB.core import CollectionReference, DocumentReference, WriteBatch
 from PyStoreDB.engines import PyStoreDBEngine
 from PyStoreDB.errors import PyStoreDBNameError, PyStoreDBInitialisationError
 from ._delegates import StoreDelegate
@@ -57,11 +57,15 @@ class _PyStoreDBMeta(type):
         Returns:
             PyStoreDB: The removed instance.
         """
-        return cls.__instances.pop(name)
+        instance = cls.__instances.pop(name)
+        instance._delegate.engine.close()
+        return instance
 
     def clear_instances(cls):
         """Clear all instances of PyStoreDB."""
-        cls.__instances = {}
+        instances, cls.__instances = cls.__instances, {}
+        for instance in instances.values():
+            instance._delegate.engine.close()
 
     def get_instance(cls, name: str = DEFAULT_STORE_NAME, *args, **kwargs) -> PyStoreDB:
         """Create or get an instance of PyStoreDB by name.
@@ -84,12 +88,16 @@ class _PyStoreDBMeta(type):
             if not name.isalnum():
                 raise PyStoreDBNameError(name)
             if name not in cls.__instances:
-                engine = cls.settings.engine_class(name)
+                engine = cls.settings.engine_class(name, **cls.settings.engine_options)
                 delegate = StoreDelegate(engine)
                 instance = cls.__instances.setdefault(
                     name, super().__call__(name, delegate=delegate, *args, **kwargs)
                 )
-                cls._initialize_store(engine, instance)
+                try:
+                    cls._initialize_store(engine, instance)
+                except Exception:
+                    del cls.__instances[name]
+                    raise
             return cls.__instances[name]
 
     @staticmethod
@@ -162,6 +170,15 @@ class PyStoreDB(metaclass=_PyStoreDBMeta):
         from ._impl import JsonDocumentReference
         return JsonDocumentReference(self._delegate.doc(path))
 
+    def batch(self) -> WriteBatch:
+        """Create a batch of writes committed to the store with a single save.
+
+        Returns:
+            WriteBatch: WriteBatch object.
+        """
+        from ._impl import JsonWriteBatch
+        return JsonWriteBatch(self._delegate)
+
     def clear(self):
         """Clear the store."""
         self._delegate.engine.clear()
@@ -8,6 +8,7 @@ from PyStoreDB.constants import Json
 from PyStoreDB.core import FieldPath
 
 if TYPE_CHECKING:
+    from PyStoreDB.core.aggregate import Aggregation
     from PyStoreDB.engines import PyStoreDBEngine
 
 __all__ = ['StoreDelegate', 'CollectionDelegate', 'DocumentDelegate', 'QueryDelegate']
@@ -100,6 +101,22 @@ class QueryDelegate:
     def get(self, path: str):
         return self._copy(path=path)
 
+    def stream(self):
+        return self.engine.stream_collection(self.path, **self.kwargs)
+
+    def count(self) -> int:
+        return self.engine.count_collection(self.path, **self.kwargs)
+
+    def aggregate(self, aggregations: dict[str, Aggregation]) -> dict[str, Any]:
+        return self.engine.aggregate_collection(self.path, aggregations, **self.kwargs)
+
+    def group(self, fields: list[FieldPath], aggregations: dict[str, Aggregation], orders: list[tuple[FieldPath, bool]],
+              limit: int | None) -> list[dict[str, Any]]:
+        return self.engine.group_collection(self.path, fields, aggregations, orders, limit, **self.kwargs)
+
+    def explain(self, analyze: bool):
+        return self.engine.explain(self.path, analyze=analyze, **self.kwargs)
+
     def limit(self, limit):
         return self._copy(limit=limit)
 
@@ -136,6 +153,9 @@ class QueryDelegate:
     def where(self, filters):
         return self._copy(filters=filters)
 
+    def select(self, fields: list[str]):
+        return self._copy(select=fields)
+
 
 class CollectionDelegate(QueryDelegate, StoreDelegate):
 
@@ -147,6 +167,26 @@ class CollectionDelegate(QueryDelegate, StoreDelegate):
     def id(self):
         return self.path.split('/')[-1]
 
+    def create_index(self, fields: tuple):
+        self.engine.create_index(self.path, self._index_fields(fields))
+
+    def drop_index(self, fields: tuple):
+        self.engine.drop_index(self.path, self._index_fields(fields))
+
+    @staticmethod
+    def _index_fields(fields: tuple) -> list[tuple[str, bool]]:
+        if not fields:
+            raise ValueError('An index needs at least one field')
+        index_fields = []
+        for field in fields:
+            field, descending = field if isinstance(field, tuple) else (field, False)
+            if field == FieldPath.document_id:
+                raise ValueError('The document id can not be indexed')
+            index_fields.append((str(field), bool(descending)))
+        if len({field for field, _ in index_fields}) != len(index_fields):
+            raise ValueError('An index can not hold a field twice')
+        return index_fields
+
     def doc(self, path: str | None):
         if path is None:
             path = generate_uuid()
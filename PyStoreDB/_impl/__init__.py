@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import copy
 from functools import cached_property
 from typing import Any, TypeVar
 
 from PyStoreDB._delegates import DocumentDelegate, CollectionDelegate, QueryDelegate
 from PyStoreDB._impl.converter import FromPyStoreDB, ToPyStoreDB
 from PyStoreDB._impl.query import JsonQuery
+from PyStoreDB._impl.batch import JsonWriteBatch
 from PyStoreDB.constants import Json
 from PyStoreDB.core import (
     DocumentReference,
@@ -23,12 +25,11 @@ __all__ = [
     'JsonQuery',
     'JsonQuerySnapshot',
     'JsonQueryDocumentSnapshot',
+    'JsonWriteBatch',
 ]
 
 _T = TypeVar('_T')
 
-from PyStoreDB.core.aggregate import Count
-
 
 class JsonDocumentReference(DocumentReference[Json]):
     @property
@@ -88,13 +89,32 @@ class JsonDocumentSnapshot(DocumentSnapshot[Json]):
 
 
 class JsonQueryDocumentSnapshot(JsonDocumentSnapshot, QueryDocumentSnapshot[Json]):
+    """Document of a query result, holding the data the document had when the query was run."""
 
-    def __init__(self, delegate):
+    def __init__(self, delegate: DocumentDelegate, data: Json, select: list[str] | None = None):
         super().__init__(delegate)
+        # the nested maps and lists may be shared with the store, the snapshot keeps its own copy of them
+        self._data = {
+            key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value for key, value in data.items()
+            if select is None or key in select
+        }
+        # the order_by fields of a projected query are kept apart for the cursors
+        self._cursor_data = {} if select is None else {key: data[key] for key in data if key not in select}
 
     @property
     def data(self) -> Json:
-        return super().data
+        return self._data
+
+    def get(self, field: str | FieldPath, default=None) -> Any:
+        if field == FieldPath.document_id:
+            return self.id
+        return self._data.get(field if isinstance(field, str) else field.path, default)
+
+    def cursor_value(self, field: str | FieldPath) -> Any:
+        path = field if isinstance(field, str) else field.path
+        if path in self._cursor_data:
+            return self._cursor_data[path]
+        return self.get(field)
 
     @property
     def exists(self) -> bool:
@@ -114,14 +134,16 @@ class JsonQuerySnapshot(QuerySnapshot[Json]):
                 DocumentDelegate(
                     f'{self._delegate.path}/{_id}',
                     self._delegate.engine,
-                )
+                ),
+                doc,
+                self._delegate.kwargs.get('select'),
             )
             for _id, doc in data.items()
         ]
 
     @property
     def size(self) -> int:
-        return Count(FieldPath.document_id).apply(self.docs)
+        return len(self.docs)
 
 
 class JsonCollectionReference(JsonQuery, CollectionReference[Json]):
@@ -146,6 +168,12 @@ class JsonCollectionReference(JsonQuery, CollectionReference[Json]):
         doc.set(data)
         return doc
 
+    def create_index(self, *fields: str | FieldPath | tuple[str | FieldPath, bool]) -> None:
+        self._delegate.create_index(fields)
+
+    def drop_index(self, *fields: str | FieldPath | tuple[str | FieldPath, bool]) -> None:
+        self._delegate.drop_index(fields)
+
     def __init__(self, delegate: CollectionDelegate):
         super().__init__(delegate)
         self._delegate = delegate
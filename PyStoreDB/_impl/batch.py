@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Any
+
+from PyStoreDB._delegates import StoreDelegate
+from PyStoreDB._impl.converter import WithConverterDocumentReference
+from PyStoreDB.constants import Json
+from PyStoreDB.core import DocumentReference, WriteBatch
+
+__all__ = ['JsonWriteBatch']
+
+
+class JsonWriteBatch(WriteBatch):
+
+    def __init__(self, delegate: StoreDelegate):
+        self._delegate = delegate
+        self._writes: list[tuple[str, str, Json | None]] = []
+        self._committed = False
+
+    def set(self, reference: DocumentReference, data: Any, **kwargs) -> JsonWriteBatch:
+        path, data = self._resolve(reference, data)
+        self._add(self._delegate.engine.SET, path, {**data, **kwargs})
+        return self
+
+    def update(self, reference: DocumentReference, data: Any = None, **kwargs) -> JsonWriteBatch:
+        path, data = self._resolve(reference, data)
+        self._add(self._delegate.engine.UPDATE, path, {**(data or {}), **kwargs})
+        return self
+
+    def delete(self, reference: DocumentReference) -> JsonWriteBatch:
+        path, _ = self._resolve(reference, None)
+        self._add(self._delegate.engine.DELETE, path, None)
+        return self
+
+    def commit(self) -> None:
+        assert not self._committed, 'This batch has already been committed'
+        self._committed = True
+        if self._writes:
+            self._delegate.engine.commit(self._writes)
+
+    def _add(self, op: str, path: str, data: Json | None):
+        assert not self._committed, 'Cannot add writes to a batch that has already been committed'
+        self._writes.append((op, path, data))
+
+    def _resolve(self, reference: DocumentReference, data: Any) -> tuple[str, Json | None]:
+        if isinstance(reference, WithConverterDocumentReference):
+            if data is not None:
+                data = reference._to_json(data)
+            reference = reference._original_reference
+        delegate = getattr(reference, '_delegate', None)
+        assert delegate is not None and delegate.engine is self._delegate.engine, \
+            'Invalid batch. The document must belong to the same store as the batch'
+        return delegate.path, data
+
+    def __len__(self):
+        return len(self._writes)
@@ -1,4 +1,4 @@
-from typing import TypeVar, Any, Callable, Generic, cast
+from typing import TypeVar, Any, Callable, Generic, Iterator, cast
 
 from PyStoreDB.constants import Json
 from PyStoreDB.core import (
@@ -8,6 +8,7 @@ from PyStoreDB.core import (
     DocumentSnapshot,
     QueryDocumentSnapshot,
     Query,
+    GroupedQuery,
     FieldPath
 )
 
@@ -86,6 +87,9 @@ class WithConverterDocumentSnapshot(DocumentSnapshot[_T], Generic[_T]):
     def get(self, field: str | FieldPath, default=None) -> Any:
         return self._original_snapshot.get(field, default)
 
+    def cursor_value(self, field: str | FieldPath) -> Any:
+        return self._original_snapshot.cursor_value(field)
+
     def __init__(
             self,
             original_snapshot: DocumentSnapshot[Json],
@@ -160,6 +164,13 @@ class WithConverterQuery(Query[_T], Generic[_T]):
     def get(self) -> QuerySnapshot[_T]:
         return WithConverterQuerySnapshot(self._original_query.get(), from_json=self._from_json, to_json=self._to_json)
 
+    def stream(self) -> Iterator[QueryDocumentSnapshot[_T]]:
+        for doc in self._original_query.stream():
+            yield WithConverterQueryDocumentSnapshot(doc, self._from_json, self._to_json)
+
+    def explain(self, analyze: bool = False) -> dict[str, Any]:
+        return self._original_query.explain(analyze)
+
     def limit(self, limit: int) -> Query[_T]:
         return self._map_query(self._original_query.limit(limit))
 
@@ -190,8 +201,14 @@ class WithConverterQuery(Query[_T], Generic[_T]):
     def exclude(self, *args, **kwargs) -> Query[_T]:
         return self._map_query(self._original_query.exclude(*args, **kwargs))
 
-    def aggregate(self, *args) -> dict[str, Any]:
-        return self._original_query.aggregate(*args)
+    def select(self, *fields: str | FieldPath) -> Query[_T]:
+        return self._map_query(self._original_query.select(*fields))
+
+    def aggregate(self, *args, **kwargs) -> dict[str, Any]:
+        return self._original_query.aggregate(*args, **kwargs)
+
+    def group_by(self, *fields: str | FieldPath) -> GroupedQuery:
+        return self._original_query.group_by(*fields)
 
     def with_converter(self, from_json: FromPyStoreDB[_U], to_json: ToPyStoreDB[_U]) -> Query[_T]:
         return WithConverterQuery(self._original_query, from_json, to_json)
@@ -226,6 +243,12 @@ class WithConverterCollectionReference(WithConverterQuery[_T], CollectionReferen
         data = self._to_json(data)
         return WithConverterDocumentReference(self._original_collection.add(data), self._from_json, self._to_json)
 
+    def create_index(self, *fields: str | FieldPath | tuple[str | FieldPath, bool]) -> None:
+        self._original_collection.create_index(*fields)
+
+    def drop_index(self, *fields: str | FieldPath | tuple[str | FieldPath, bool]) -> None:
+        self._original_collection.drop_index(*fields)
+
     @property
     def id(self) -> str:
         return self._original_collection.id
@@ -1,15 +1,15 @@
 from __future__ import annotations
 
-from typing import Any, TypeVar
+from typing import Any, Iterator, TypeVar
 
-from PyStoreDB._delegates import QueryDelegate
+from PyStoreDB._delegates import QueryDelegate, DocumentDelegate
 from PyStoreDB._impl import ToPyStoreDB, FromPyStoreDB
 from PyStoreDB.constants import Json
-from PyStoreDB.core import Query, QuerySnapshot, FieldPath, DocumentSnapshot
+from PyStoreDB.core import Query, GroupedQuery, QuerySnapshot, FieldPath, DocumentSnapshot, QueryDocumentSnapshot
 from PyStoreDB.core.aggregate import Aggregation
 from PyStoreDB.core.filters import Q
 
-__all__ = ['JsonQuery']
+__all__ = ['JsonQuery', 'JsonGroupedQuery']
 
 _T = TypeVar('_T')
 
@@ -17,12 +17,23 @@ _T = TypeVar('_T')
 class JsonQuery(Query[Json]):
 
     def count(self) -> int:
-        return self.get().size
+        return self._delegate.count()
 
     def get(self) -> QuerySnapshot[Json]:
         from PyStoreDB._impl import JsonQuerySnapshot
         return JsonQuerySnapshot(self._delegate)
 
+    def stream(self) -> Iterator[QueryDocumentSnapshot[Json]]:
+        from PyStoreDB._impl import JsonQueryDocumentSnapshot
+        for doc_id, data in self._delegate.stream():
+            yield JsonQueryDocumentSnapshot(
+                DocumentDelegate(f'{self._delegate.path}/{doc_id}', self._delegate.engine), data,
+                self._kwargs.get('select'),
+            )
+
+    def explain(self, analyze: bool = False) -> dict[str, Any]:
+        return self._delegate.explain(analyze)
+
     def limit(self, limit: int) -> JsonQuery[Json]:
         assert limit > 0, 'limit must be a positive number greater than 0'
         assert 'limit_to_last' not in self._kwargs, 'Invalid query. You cannot call limit() after limit_to_last(), these are mutually exclusive'
@@ -100,12 +111,28 @@ class JsonQuery(Query[Json]):
         _filters.extend([Q(*args, **kwargs, negated=True)])
         return JsonQuery(self._delegate.where(_filters))
 
+    def select(self, *fields: str | FieldPath) -> JsonQuery[Json]:
+        assert len(fields) > 0, 'select requires at least one field'
+        for field in fields:
+            self._assert_valid_field_type(field)
+        # the id of the documents is always part of their snapshots
+        fields = [str(field) for field in fields if str(field) != str(FieldPath.document_id)]
+
+        return JsonQuery(self._delegate.select(list(dict.fromkeys(fields))))
+
     def aggregate(self, mapping: dict[str, Aggregation] = None, **kwargs) -> dict[str, Any]:
         if mapping is None:
             mapping = {}
-        mapping = {**mapping, **kwargs}
-        data = self.get().docs
-        return {key: aggregation.apply(data) for key, aggregation in mapping.items()}
+        return self._delegate.aggregate({**mapping, **kwargs})
+
+    def group_by(self, *fields: str | FieldPath) -> JsonGroupedQuery:
+        assert len(fields) > 0, 'group_by requires at least one field'
+        for field in fields:
+            self._assert_valid_field_type(field)
+        fields = [field if isinstance(field, FieldPath) else FieldPath(field) for field in fields]
+        assert len(set(fields)) == len(fields), 'group_by fields must be unique'
+
+        return JsonGroupedQuery(self._delegate, fields)
 
     def with_converter(self, from_json: FromPyStoreDB[_T], to_json: ToPyStoreDB[_T]) -> Query[_T]:
         from PyStoreDB._impl.converter import WithConverterQuery
@@ -143,7 +170,7 @@ class JsonQuery(Query[Json]):
         for order in orders:
             if order[0] != FieldPath.document_id:
                 try:
-                    value = _snapshot.get(str(order[0]))
+                    value = _snapshot.cursor_value(str(order[0]))
                     if value is None:
                         raise KeyError
                     values.append(value)  # TODO check this when support map and list lookup
@@ -164,3 +191,35 @@ class JsonQuery(Query[Json]):
         values.append(_snapshot.id)
 
         return orders, values
+
+
+class JsonGroupedQuery(GroupedQuery):
+
+    def order_by(self, field: str | FieldPath, descending=False) -> JsonGroupedQuery:
+        JsonQuery._assert_valid_field_type(field)
+        field = field if isinstance(field, FieldPath) else FieldPath(field)
+        assert all([item != field for item, _ in self._orders]), f'order by field "{field}" already exists in query'
+
+        return JsonGroupedQuery(self._delegate, self._fields, [*self._orders, (field, descending)], self._limit)
+
+    def limit(self, limit: int) -> JsonGroupedQuery:
+        assert limit > 0, 'limit must be a positive number greater than 0'
+
+        return JsonGroupedQuery(self._delegate, self._fields, self._orders, limit)
+
+    def aggregate(self, mapping: dict[str, Aggregation] = None, **kwargs) -> list[dict[str, Any]]:
+        aggregations = {**(mapping or {}), **kwargs}
+        group_fields = {str(field) for field in self._fields}
+        assert not group_fields & set(aggregations), 'aggregation keys must not be group_by fields'
+        for field, _ in self._orders:
+            assert str(field) in group_fields or str(field) in aggregations, \
+                f'order by field "{field}" must be a group_by field or an aggregation key'
+
+        return self._delegate.group(self._fields, aggregations, self._orders or None, self._limit)
+
+    def __init__(self, query_delegate: QueryDelegate, fields: list[FieldPath],
+                 orders: list[tuple[FieldPath, bool]] = None, limit: int = None):
+        self._delegate = query_delegate
+        self._fields = fields
+        self._orders = orders or []
+        self._limit = limit
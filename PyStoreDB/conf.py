@@ -1,10 +1,15 @@
 import os
 
 from PyStoreDB.engines import PyStoreDBEngine, PyStoreDBRawEngine
+from PyStoreDB.engines._raw.codecs import get_codec
 
 DEFAULT_STORE_NAME = 'default'
 
-__all__ = ['PyStoreDBSettings', 'DEFAULT_STORE_NAME']
+DURABILITY_LEVELS = ('sync', 'group', 'async')
+
+FSYNC_POLICIES = ('always', 'checkpoint', 'never')
+
+__all__ = ['PyStoreDBSettings', 'DEFAULT_STORE_NAME', 'DURABILITY_LEVELS', 'FSYNC_POLICIES']
 
 
 class PyStoreDBSettings:
@@ -13,17 +18,60 @@ class PyStoreDBSettings:
     Attributes:
         store_dir (str): The directory for storage.
         engine_class (type): The engine class to use.
+        engine_options (dict): Keyword arguments given to the engine class when a store is created.
+        wal (bool): Whether writes are appended to a write-ahead log instead of rewriting the whole store.
+        checkpoint_interval (int): The number of log records after which a full snapshot is written.
+        durability (str): When writes are persisted, one of 'sync', 'group' or 'async'.
+        flush_interval (float): The delay in milliseconds within which writes are coalesced by the flusher.
+        group_commit_size (int): The number of unflushed writes after which a 'group' writer waits for a flush.
+        codec (str): The format of the store files.
+        fsync (str): When written files are forced to the disk, one of 'always', 'checkpoint' or 'never'.
     """
 
-    def __init__(self, store_dir: str = 'store', engine_class: PyStoreDBEngine = PyStoreDBRawEngine):
+    def __init__(
+            self,
+            store_dir: str = 'store',
+            engine_class: PyStoreDBEngine = PyStoreDBRawEngine,
+            engine_options: dict = None,
+            wal: bool = False,
+            checkpoint_interval: int = 1000,
+            durability: str = 'sync',
+            flush_interval: float = 10,
+            group_commit_size: int = 1000,
+            codec: str = 'json',
+            fsync: str = 'checkpoint',
+    ):
         """Initializes the PyStoreDB settings.
 
         Args:
             store_dir (str): The directory for storage.
             engine_class (type): The engine class to use.
+            engine_options (dict, optional): Keyword arguments given to the engine class when a store is created.
+            wal (bool): Whether writes are appended to a write-ahead log instead of rewriting the whole store.
+            checkpoint_interval (int): The number of log records after which a full snapshot is written.
+            durability (str): When writes are persisted:
+                'sync' every write is persisted before returning,
+                'group' writes are coalesced within flush_interval ms or group_commit_size writes,
+                'async' a background thread flushes the store every flush_interval ms.
+            flush_interval (float): The delay in milliseconds within which writes are coalesced by the flusher.
+            group_commit_size (int): The number of unflushed writes after which a 'group' writer waits for a flush.
+            codec (str): The format of the store files, 'json' (indented), 'compact-json' or 'binary',
+                optionally compressed with '+zlib' or '+lzma' (e.g. 'binary+zlib').
+            fsync (str): When written files are forced to the disk:
+                'always' snapshots and every log append are fsynced,
+                'checkpoint' snapshots, checkpoints and compactions are fsynced but log appends are not,
+                'never' files are left to the OS page cache.
         """
         self.store_dir = store_dir
         self.engine_class = engine_class
+        self.engine_options = dict(engine_options or {})
+        self.wal = wal
+        self.checkpoint_interval = checkpoint_interval
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.group_commit_size = group_commit_size
+        self.codec = codec
+        self.fsync = fsync
 
     @property
     def store_dir(self):
@@ -66,4 +114,143 @@ class PyStoreDBSettings:
         if issubclass(kclass, PyStoreDBEngine):
             self.__engine_class = kclass
         else:
-            raise TypeError(f"{kclass.__name__} is not subclass of PyStoreDBEngine")
\ No newline at end of file
+            raise TypeError(f"{kclass.__name__} is not subclass of PyStoreDBEngine")
+
+    @property
+    def checkpoint_interval(self):
+        """Gets the number of write-ahead log records between two snapshots.
+
+        Returns:
+            int: The checkpoint interval.
+        """
+        return self.__checkpoint_interval
+
+    @checkpoint_interval.setter
+    def checkpoint_interval(self, interval: int):
+        """Sets the number of write-ahead log records between two snapshots.
+
+        Args:
+            interval (int): The checkpoint interval.
+
+        Raises:
+            ValueError: If the interval is not a positive integer.
+        """
+        if not isinstance(interval, int) or interval <= 0:
+            raise ValueError('checkpoint_interval must be a positive integer')
+        self.__checkpoint_interval = interval
+
+    @property
+    def durability(self):
+        """Gets the durability level.
+
+        Returns:
+            str: The durability level.
+        """
+        return self.__durability
+
+    @durability.setter
+    def durability(self, level: str):
+        """Sets the durability level.
+
+        Args:
+            level (str): One of 'sync', 'group' or 'async'.
+
+        Raises:
+            ValueError: If the level is unknown.
+        """
+        if level not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_LEVELS)}")
+        self.__durability = level
+
+    @property
+    def flush_interval(self):
+        """Gets the delay in milliseconds within which writes are coalesced.
+
+        Returns:
+            float: The flush interval.
+        """
+        return self.__flush_interval
+
+    @flush_interval.setter
+    def flush_interval(self, interval: float):
+        """Sets the delay in milliseconds within which writes are coalesced.
+
+        Args:
+            interval (float): The flush interval.
+
+        Raises:
+            ValueError: If the interval is not a positive number.
+        """
+        if not isinstance(interval, (int, float)) or interval <= 0:
+            raise ValueError('flush_interval must be a positive number')
+        self.__flush_interval = interval
+
+    @property
+    def group_commit_size(self):
+        """Gets the number of unflushed writes after which a writer waits for a flush.
+
+        Returns:
+            int: The group commit size.
+        """
+        return self.__group_commit_size
+
+    @group_commit_size.setter
+    def group_commit_size(self, size: int):
+        """Sets the number of unflushed writes after which a writer waits for a flush.
+
+        Args:
+            size (int): The group commit size.
+
+        Raises:
+            ValueError: If the size is not a positive integer.
+        """
+        if not isinstance(size, int) or size <= 0:
+            raise ValueError('group_commit_size must be a positive integer')
+        self.__group_commit_size = size
+
+    @property
+    def codec(self):
+        """Gets the name of the codec of the store files.
+
+        Returns:
+            str: The codec name.
+        """
+        return self.__codec
+
+    @codec.setter
+    def codec(self, name: str):
+        """Sets the codec of the store files.
+
+        Args:
+            name (str): The codec name, e.g. 'json', 'compact-json', 'binary' or 'binary+zlib'.
+
+        Raises:
+            ValueError: If the codec is unknown.
+        """
+        if not isinstance(name, str):
+            raise ValueError('codec must be a string')
+        get_codec(name)
+        self.__codec = name
+
+    @property
+    def fsync(self):
+        """Gets the fsync policy.
+
+        Returns:
+            str: The fsync policy.
+        """
+        return self.__fsync
+
+    @fsync.setter
+    def fsync(self, policy: str):
+        """Sets the fsync policy.
+
+        Args:
+            policy (str): One of 'always', 'checkpoint' or 'never'.
+
+        Raises:
+            ValueError: If the policy is unknown.
+        """
+        if policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        self.__fsync = policy
@@ -6,7 +6,7 @@ from typing import Generic, TypeVar, Any, Callable
 from PyStoreDB.constants import Json
 from PyStoreDB.core.filters import __all__ as _filters_all
 from .field_path import FieldPath
-from .query import Query, QuerySnapshot
+from .query import Query, GroupedQuery, QuerySnapshot
 
 _T = TypeVar('_T')
 _U = TypeVar('_U')
@@ -19,7 +19,9 @@ __all__ = [
     'QueryDocumentSnapshot',
     'QuerySnapshot',
     'Query',
+    'GroupedQuery',
     'FieldPath',
+    'WriteBatch',
     *_filters_all,
 ]
 
@@ -108,6 +110,40 @@ class CollectionReference(StoreObject, Query[_T], Generic[_T]):
         """
         pass
 
+    @abc.abstractmethod
+    def create_index(self, *fields: str | FieldPath | tuple[str | FieldPath, bool]) -> None:
+        """Create a secondary index on fields of the documents of the collection.
+
+        The index is kept up to date by the writes and used instead of scanning the whole
+        collection. The index definition is persisted with the store.
+
+        A single field index serves the `where` lookups on its field (exact, in, isnull,
+        lt, lte, gt, gte and range). Like in Firestore, an index also serves the queries
+        filtering some of its leading fields with equality and ordered by the remaining ones,
+        with the same directions: ``create_index('status', ('created_at', True))`` serves
+        ``where(status='open').order_by('created_at', descending=True).limit(20)``, which
+        then only reads the documents it returns.
+
+        Args:
+            *fields (str | FieldPath | tuple[str | FieldPath, bool]): The fields to index,
+                a field is either a field name or a ``(field, descending)`` pair.
+
+        Raises:
+            ValueError: If no field is given, a field is given twice or is the document id.
+            PyStoreDBError: If the engine of the store doesn't support secondary indexes.
+        """
+        pass
+
+    @abc.abstractmethod
+    def drop_index(self, *fields: str | FieldPath | tuple[str | FieldPath, bool]) -> None:
+        """Drop the secondary index on fields of the documents of the collection.
+
+        Args:
+            *fields (str | FieldPath | tuple[str | FieldPath, bool]): The fields of the index,
+                as given to `create_index`.
+        """
+        pass
+
     @abc.abstractmethod
     def with_converter(self, from_json: Callable[[_T], _U], to_json: Callable[[_U], _T]) -> CollectionReference[_U]:
         """Get a collection reference with data conversion functions.
@@ -196,6 +232,20 @@ class DocumentSnapshot(abc.ABC, Generic[_T]):
         """
         pass
 
+    def cursor_value(self, field: str | FieldPath) -> Any:
+        """Get the value of a field positioning a query cursor on the document.
+
+        It is the value of `get`, unless the field is an order_by field of a query
+        projected out of the snapshot by ``select()``, which the snapshot keeps for cursors.
+
+        Args:
+            field (str | FieldPath): The order_by field.
+
+        Returns:
+            Any: The value of the field, None if the document doesn't have it.
+        """
+        return self.get(field)
+
     def __getitem__(self, item: str) -> Any:
         """Get the value of a specific field using the indexing syntax.
 
@@ -335,4 +385,73 @@ class QueryDocumentSnapshot(DocumentSnapshot[_T], Generic[_T]):
         Returns:
             _T: The core data contained in the document snapshot.
         """
-        pass
\ No newline at end of file
+        pass
+
+
+class WriteBatch(abc.ABC):
+    """Represents a batch of writes applied to the store as a single operation.
+
+    Writes are collected with `set`, `update` and `delete` and nothing is written
+    until `commit` is called. The whole batch is validated before being applied and
+    persisted once, which makes bulk loads much cheaper than writing documents one by one.
+    A batch can be used as a context manager, it is committed when the block exits
+    without raising.
+    """
+
+    @abc.abstractmethod
+    def set(self, reference: DocumentReference, data: Any, **kwargs) -> WriteBatch:
+        """Add a write replacing the data of a document.
+
+        Args:
+            reference (DocumentReference): The document to write.
+            data (Any): The data of the document.
+            **kwargs: Additional fields of the document.
+
+        Returns:
+            WriteBatch: The batch, to allow chaining.
+        """
+        pass
+
+    @abc.abstractmethod
+    def update(self, reference: DocumentReference, data: Any = None, **kwargs) -> WriteBatch:
+        """Add a write updating some fields of a document.
+
+        Args:
+            reference (DocumentReference): The document to update.
+            data (Any, optional): The fields to update. Defaults to None.
+            **kwargs: Additional fields to update.
+
+        Returns:
+            WriteBatch: The batch, to allow chaining.
+        """
+        pass
+
+    @abc.abstractmethod
+    def delete(self, reference: DocumentReference) -> WriteBatch:
+        """Add a write deleting a document.
+
+        Args:
+            reference (DocumentReference): The document to delete.
+
+        Returns:
+            WriteBatch: The batch, to allow chaining.
+        """
+        pass
+
+    @abc.abstractmethod
+    def commit(self) -> None:
+        """Apply all the writes of the batch."""
+        pass
+
+    def __enter__(self) -> WriteBatch:
+        """Use the batch as a context manager.
+
+        Returns:
+            WriteBatch: The batch.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Commit the batch when the context manager exits without error."""
+        if exc_type is None:
+            self.commit()
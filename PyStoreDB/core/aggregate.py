@@ -1,7 +1,36 @@
+from __future__ import annotations
+
 import abc
-import statistics
+import heapq
+import json
+import math
+from typing import Any, Callable, Iterable
 
+from PyStoreDB.constants import Json
 from PyStoreDB.core import FieldPath, QueryDocumentSnapshot
+from PyStoreDB.core.ordering import Descending, KIND_RANKS, value_kind
+from PyStoreDB.core.sketches import HyperLogLog, KLLSketch
+
+__all__ = [
+    'Aggregation',
+    'Count',
+    'Sum',
+    'Min',
+    'Max',
+    'Mode',
+    'Variance',
+    'Median',
+    'StdDev',
+    'Avg',
+    'ApproxCountDistinct',
+    'ApproxQuantile',
+    'ApproxMedian',
+    'accumulate',
+    'accumulate_groups',
+    'order_groups',
+]
+
+NUMERIC_TYPES = (int, float)
 
 
 class Aggregation(abc.ABC):
@@ -11,26 +40,127 @@ class Aggregation(abc.ABC):
     This class serves as a blueprint for implementing specific aggregation
     strategies. It requires a field name to operate upon, which can either
     be a `FieldPath` object or a string representing the field name. Subclasses
-    must provide an implementation for the `apply` method, which defines how
-    the aggregation is performed on a given set of documents.
+    describe the aggregation as an accumulator: `init` creates its state, `step`
+    adds the field value of a document to it and `finalize` turns it into the
+    result, so that an engine computes all the aggregations of a query in a
+    single scan of the documents. States are mergeable, the partial states of
+    several parts of the documents (e.g. shards or worker processes) are
+    combined with `merge`.
 
     Attributes:
-      field_name (FieldPath): The field name on which the aggregation operates.
+      field_name (FieldPath | None): The field name on which the aggregation operates.
     """
 
-    def __init__(self, field_name: FieldPath | str):
+    def __init__(self, field_name: FieldPath | str | None):
         """
         Initializes the Aggregation with a field name.
 
         Args:
-            field_name (FieldPath | str): The field name on which the aggregation operates.
+            field_name (FieldPath | str | None): The field name on which the aggregation operates.
+        """
+        if field_name is None or isinstance(field_name, FieldPath):
+            self.field_name = field_name
+        else:
+            self.field_name = FieldPath(field_name)
+
+    @abc.abstractmethod
+    def init(self) -> Any:
+        """
+        Creates the state of the aggregation before any document is seen.
+
+        Returns:
+            Any: The initial state.
+        """
+        pass
+
+    @abc.abstractmethod
+    def step(self, state: Any, value: Any) -> Any:
+        """
+        Adds the field value of a document to the state.
+
+        Args:
+            state (Any): The current state.
+            value (Any): The value of the field in the document, None if the document doesn't have it.
+
+        Returns:
+            Any: The new state.
+        """
+        pass
+
+    @abc.abstractmethod
+    def finalize(self, state: Any) -> Any:
+        """
+        Computes the result of the aggregation from its state.
+
+        Args:
+            state (Any): The state once every document is added.
+
+        Returns:
+            Any: The result of the aggregation.
         """
-        self.field_name = field_name if isinstance(field_name, FieldPath) else FieldPath(field_name)
+        pass
 
     @abc.abstractmethod
-    def apply(self, docs: list[QueryDocumentSnapshot]) -> int | float | None:
+    def merge(self, state: Any, other: Any) -> Any:
+        """
+        Combines the states of two disjoint parts of the documents.
+
+        Args:
+            state (Any): The state of a part of the documents.
+            other (Any): The state of the other part, at the same pass.
+
+        Returns:
+            Any: The state of all the documents.
+        """
         pass
 
+    def next_pass(self, state: Any) -> Any:
+        """
+        Get the state of another pass over the documents, for the aggregations needing more than one.
+
+        Args:
+            state (Any): The state at the end of a pass.
+
+        Returns:
+            Any: The state of the next pass, None once the state can be finalized.
+        """
+        return None
+
+    def extract(self, doc_id: str, data: Json) -> Any:
+        """
+        Get the value of the field in the decoded data of a document.
+
+        Args:
+            doc_id (str): The id of the document.
+            data (Json): The data of the document.
+
+        Returns:
+            Any: The value of the field, the id of the document if the aggregation has no field.
+        """
+        if self.field_name is None or self.field_name == FieldPath.document_id:
+            return doc_id
+        return data.get(self.field_name.path)
+
+    def apply(self, docs: list[QueryDocumentSnapshot]) -> Any:
+        """
+        Computes the aggregation over document snapshots.
+
+        Args:
+            docs (list[QueryDocumentSnapshot]): The documents to aggregate.
+
+        Returns:
+            Any: The result of the aggregation.
+        """
+        values = [doc.id if self.field_name is None else doc.get(self.field_name) for doc in docs]
+        state = self.init()
+        while True:
+            for value in values:
+                state = self.step(state, value)
+            next_state = self.next_pass(state)
+            if next_state is None:
+                return self.finalize(state)
+            state = next_state
+
     def get_numeric_values(self, docs: list[QueryDocumentSnapshot]) -> list[int | float]:
         """
         Get numeric values from the specified field in the documents.
@@ -41,7 +171,8 @@ class Aggregation(abc.ABC):
         Returns:
             list[int | float]: A list of numeric values from the specified field.
         """
-        return [doc.get(self.field_name) for doc in docs if isinstance(doc.get(self.field_name), (int, float))]
+        values = (doc.get(self.field_name) for doc in docs)
+        return [value for value in values if isinstance(value, NUMERIC_TYPES)]
 
 
 class Count(Aggregation):
@@ -68,9 +199,22 @@ class Count(Aggregation):
         super().__init__(field_name)
         self.distinct = distinct
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        cls = set if self.distinct else list
-        return len(cls(doc.get(self.field_name) for doc in docs if doc.get(self.field_name) is not None))
+    def init(self):
+        return set() if self.distinct else 0
+
+    def step(self, state, value):
+        if value is None:
+            return state
+        if self.distinct:
+            state.add(value)
+            return state
+        return state + 1
+
+    def merge(self, state, other):
+        return state | other if self.distinct else state + other
+
+    def finalize(self, state):
+        return len(state) if self.distinct else state
 
 
 class Sum(Aggregation):
@@ -84,8 +228,17 @@ class Sum(Aggregation):
     in the summation process by filtering out non-numeric values beforehand.
     """
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        return sum(self.get_numeric_values(docs))
+    def init(self):
+        return 0
+
+    def step(self, state, value):
+        return state + value if isinstance(value, NUMERIC_TYPES) else state
+
+    def merge(self, state, other):
+        return state + other
+
+    def finalize(self, state):
+        return state
 
 
 class Min(Aggregation):
@@ -94,8 +247,19 @@ class Min(Aggregation):
     of a specified numeric field.
     """
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        return min(self.get_numeric_values(docs), default=None)
+    def init(self):
+        return None
+
+    def step(self, state, value):
+        if isinstance(value, NUMERIC_TYPES) and (state is None or value < state):
+            return value
+        return state
+
+    def merge(self, state, other):
+        return self.step(state, other)
+
+    def finalize(self, state):
+        return state
 
 
 class Max(Aggregation):
@@ -104,8 +268,19 @@ class Max(Aggregation):
     of a specified numeric field.
     """
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        return max(self.get_numeric_values(docs), default=None)
+    def init(self):
+        return None
+
+    def step(self, state, value):
+        if isinstance(value, NUMERIC_TYPES) and (state is None or value > state):
+            return value
+        return state
+
+    def merge(self, state, other):
+        return self.step(state, other)
+
+    def finalize(self, state):
+        return state
 
 
 class Mode(Aggregation):
@@ -116,61 +291,552 @@ class Mode(Aggregation):
         if all values are unique, the first value is returned
     """
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        values = self.get_numeric_values(docs)
-        if len(values) == 0:
-            return None
-        return statistics.mode(self.get_numeric_values(docs))
+    def init(self):
+        return {}
+
+    def step(self, state, value):
+        if isinstance(value, NUMERIC_TYPES):
+            state[value] = state.get(value, 0) + 1
+        return state
+
+    def merge(self, state, other):
+        for value, count in other.items():
+            state[value] = state.get(value, 0) + count
+        return state
 
+    def finalize(self, state):
+        # the counts keep the order in which the values were first seen, max returns the first most common
+        return max(state, key=state.__getitem__) if state else None
 
-class Variance(Aggregation):
+
+class Welford(Aggregation, abc.ABC):
+    """
+    Base class of the aggregations computed from the ``(count, mean, m2)`` state of the
+    Welford algorithm, m2 being the sum of the squared differences to the mean. The state
+    has a constant size and its update doesn't lose precision when the values are large
+    compared to their spread.
+    """
+
+    def init(self):
+        return 0, 0.0, 0.0
+
+    def step(self, state, value):
+        if not isinstance(value, NUMERIC_TYPES):
+            return state
+        n, mean, m2 = state
+        n += 1
+        delta = value - mean
+        mean += delta / n
+        return n, mean, m2 + delta * (value - mean)
+
+    def merge(self, state, other):
+        # Chan et al. parallel variance
+        n_a, mean_a, m2_a = state
+        n_b, mean_b, m2_b = other
+        n = n_a + n_b
+        if n == 0:
+            return state
+        delta = mean_b - mean_a
+        return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+class Variance(Welford):
     """
     Represents an aggregation operation to calculate the variance
     of numeric values for a certain field.
     """
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        valid_values = self.get_numeric_values(docs)
-        n = len(valid_values)
-        if n < 2:
-            return None
-        return statistics.variance(valid_values)
+    def finalize(self, state):
+        n, _, m2 = state
+        return m2 / (n - 1) if n >= 2 else None
+
+
+class StdDev(Welford):
+    """
+    Represents an aggregation operation to calculate the standard deviation
+    of numeric values for a certain field.
+    """
+
+    def finalize(self, state):
+        n, _, m2 = state
+        return math.sqrt(m2 / (n - 1)) if n >= 2 else None
+
+
+class Avg(Welford):
+    """
+    Represents an aggregation operation to calculate the average
+    (mean) value of numeric values for a certain field.
+    """
+
+    def finalize(self, state):
+        n, mean, _ = state
+        return mean if n else None
+
+
+class MedianState:
+    """
+    State of a pass of the `Median` selection.
+
+    The values of the ``[low, high]`` range are kept while they fit in the memory budget of the
+    median, past it they are only counted in buckets splitting the range. The values below and
+    above the range are counted as well, with their bounds, so that the ranks of the median tell
+    which values are the median or in which narrower range the next pass looks for them.
+
+    Attributes:
+        low (int | float | None): The lowest value of the range, None before the first pass overflows.
+        high (int | float | None): The highest value of the range.
+        bounded (bool): Whether the range was given by a previous pass.
+        values (list | None): The values of the range, None once they are counted in buckets.
+        buckets (list[list] | None): The ``[count, min, max]`` of the buckets of the range, None if the
+            values of the range are located by the next pass.
+        inside (list): The count, min and max of the values of the range.
+        below (list): The count, min and max of the values below the range.
+        above (list): The count, min and max of the values above the range.
+        median (int | float | None): The median once it is known without selecting it from values.
+    """
+    __slots__ = ('low', 'high', 'bounded', 'values', 'buckets', 'inside', 'below', 'above', 'median')
+
+    def __init__(self, low=None, high=None):
+        self.low = low
+        self.high = high
+        self.bounded = low is not None
+        self.values = []
+        self.buckets = None
+        self.inside = [0, None, None]
+        self.below = [0, None, None]
+        self.above = [0, None, None]
+        self.median = None
+
+    @property
+    def count(self) -> int:
+        return self.inside[0] + self.below[0] + self.above[0]
 
 
 class Median(Aggregation):
     """
     Represents an aggregation operation to calculate the median
     of numeric values for a certain field.
+
+    The median is exact. When the values don't fit in ``max_values`` they are selected in
+    several passes over the documents, each pass narrowing the range of values holding the
+    median, the memory used stays proportional to ``max_values``. With ``max_values=None``
+    every value is kept and a single pass is made.
     """
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        valid_values = sorted(self.get_numeric_values(docs))
-        n = len(valid_values)
-        if n == 0:
+    def __init__(self, field_name: FieldPath | str, max_values: int | None = 10_000):
+        """
+        Initializes the Median aggregation with a field name and a memory budget.
+
+        Args:
+            field_name (FieldPath | str): The name of the field.
+            max_values (int | None): The number of values kept in memory, None to keep them all.
+        """
+        super().__init__(field_name)
+        assert max_values is None or max_values >= 2, 'max_values must be at least 2'
+        self.max_values = max_values
+
+    def init(self):
+        return MedianState()
+
+    def step(self, state: MedianState, value):
+        if not isinstance(value, NUMERIC_TYPES):
+            return state
+        if state.low is not None and value < state.low:
+            self._add(state.below, value)
+        elif state.high is not None and value > state.high:
+            self._add(state.above, value)
+        else:
+            self._add(state.inside, value)
+            if state.values is not None:
+                state.values.append(value)
+                if self.max_values is not None and len(state.values) > self.max_values:
+                    self._overflow(state)
+            elif state.buckets is not None:
+                self._add(state.buckets[self._bucket(state, value)], value)
+        return state
+
+    def merge(self, state: MedianState, other: MedianState):
+        if (state.low, state.high) != (other.low, other.high):
+            assert not state.bounded and not other.bounded, 'Median states of different passes can not be merged'
+            # first passes, a state which kept all its values adds them to the other one
+            if other.low is None:
+                return self._step_values(state, other.values)
+            if state.low is None:
+                return self._step_values(other, state.values)
+            # the ranges of the first passes overflowed differently, the next pass locates the values
+            for counts in (state.below, other.inside, other.below, other.above):
+                self._combine(state.inside, counts)
+            state.below, state.above = [0, None, None], [0, None, None]
+            state.low = state.high = state.values = state.buckets = None
+            return state
+        for counts, other_counts in ((state.inside, other.inside), (state.below, other.below),
+                                     (state.above, other.above)):
+            self._combine(counts, other_counts)
+        if state.values is not None and other.values is not None:
+            state.values.extend(other.values)
+            if self.max_values is not None and len(state.values) > self.max_values:
+                self._overflow(state)
+        elif state.buckets is not None and other.values is not None:
+            for value in other.values:
+                self._add(state.buckets[self._bucket(state, value)], value)
+        elif other.buckets is not None and state.values is not None:
+            for value in state.values:
+                self._add(other.buckets[self._bucket(other, value)], value)
+            state.values, state.buckets = None, other.buckets
+        elif state.buckets is not None and other.buckets is not None:
+            for bucket, other_bucket in zip(state.buckets, other.buckets):
+                self._combine(bucket, other_bucket)
+        else:
+            state.values = state.buckets = None
+        return state
+
+    def next_pass(self, state: MedianState):
+        n = state.count
+        if n == 0 or state.median is not None:
+            return None
+        ranks = ((n - 1) // 2, n // 2)
+        below = state.below[0]
+        if state.values is not None and below <= ranks[0] and ranks[1] < below + len(state.values):
+            return None
+        (first, low, high), (second, second_low, _) = self._locate(state, ranks[0]), self._locate(state, ranks[1])
+        if first != second:
+            # the ranks end and start two slices of the sorted values
+            state.median = (high + second_low) / 2
+            return None
+        if low == high:
+            state.median = low
             return None
-        return statistics.median(valid_values)
+        return MedianState(low, high)
 
+    def finalize(self, state: MedianState):
+        if state.median is not None:
+            return state.median
+        if state.count == 0:
+            return None
+        n = state.count
+        values = sorted(state.values)
+        low = values[(n - 1) // 2 - state.below[0]]
+        high = values[n // 2 - state.below[0]]
+        return low if n % 2 else (low + high) / 2
+
+    def _step_values(self, state: MedianState, values: list) -> MedianState:
+        for value in values:
+            state = self.step(state, value)
+        return state
+
+    @staticmethod
+    def _add(counts: list, value):
+        counts[0] += 1
+        if counts[1] is None or value < counts[1]:
+            counts[1] = value
+        if counts[2] is None or value > counts[2]:
+            counts[2] = value
+
+    @staticmethod
+    def _combine(counts: list, other: list):
+        if other[0]:
+            Median._add(counts, other[1])
+            Median._add(counts, other[2])
+            counts[0] += other[0] - 2
+
+    def _overflow(self, state: MedianState):
+        """Counts the values of the range in buckets once they don't fit in memory anymore."""
+        values, state.values = state.values, None
+        if state.low is None:
+            # first pass, the range is the one of the values seen so far
+            state.low, state.high = state.inside[1], state.inside[2]
+        state.buckets = [[0, None, None] for _ in range(self.max_values)]
+        for value in values:
+            self._add(state.buckets[self._bucket(state, value)], value)
+
+    def _bucket(self, state: MedianState, value) -> int:
+        if state.high == state.low:
+            return 0
+        # monotonic in value, the buckets split the sorted values of the range in contiguous slices
+        return min(int((value - state.low) / (state.high - state.low) * len(state.buckets)), len(state.buckets) - 1)
+
+    @staticmethod
+    def _locate(state: MedianState, rank: int) -> tuple[int, Any, Any]:
+        """Returns the position, lowest and highest values of the slice of the sorted values holding rank."""
+        if rank < state.below[0]:
+            return -1, state.below[1], state.below[2]
+        rank -= state.below[0]
+        if rank >= state.inside[0]:
+            return len(state.buckets) if state.buckets is not None else 1, state.above[1], state.above[2]
+        if state.buckets is not None:
+            for i, (count, low, high) in enumerate(state.buckets):
+                if rank < count:
+                    return i, low, high
+                rank -= count
+        return 0, state.inside[1], state.inside[2]
+
+
+class ApproxCountDistinct(Aggregation):
+    """
+    Represents an aggregation estimating the number of distinct values of a
+    field with a HyperLogLog sketch, in constant memory.
 
-class StdDev(Aggregation):
+    Attributes:
+        error (float): The relative standard error of the estimate.
+        sketch (bool): Whether the result is the sketch itself, to be merged or saved, instead of its estimate.
     """
-    Represents an aggregation operation to calculate the standard deviation
-    of numeric values for a certain field.
+
+    def __init__(self, field_name: FieldPath | str, error: float = 0.01, sketch: bool = False):
+        """
+        Initializes the aggregation with a field name and an error bound.
+
+        Args:
+            field_name (FieldPath | str): The name of the field.
+            error (float): The relative standard error of the estimate, 1% by default.
+            sketch (bool): Whether the result is the sketch itself instead of its estimate.
+        """
+        super().__init__(field_name)
+        self.error = error
+        self.sketch = sketch
+
+    def init(self):
+        return HyperLogLog.for_error(self.error)
+
+    def step(self, state: HyperLogLog, value):
+        if value is not None:
+            state.add(value)
+        return state
+
+    def merge(self, state: HyperLogLog, other: HyperLogLog):
+        return state.merge(other)
+
+    def finalize(self, state: HyperLogLog):
+        return state if self.sketch else state.estimate()
+
+
+class ApproxQuantile(Aggregation):
     """
+    Represents an aggregation estimating a quantile of the numeric values
+    of a field with a KLL sketch, in constant memory.
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        valid_values = self.get_numeric_values(docs)
-        n = len(valid_values)
-        if n < 2:
-            return None
-        return statistics.stdev(valid_values)
+    Attributes:
+        q (float): The quantile, between 0 and 1.
+        error (float): The rank error of the estimate as a fraction of the values.
+        sketch (bool): Whether the result is the sketch itself, to be merged or saved, instead of the quantile.
+    """
+
+    def __init__(self, field_name: FieldPath | str, q: float, error: float = 0.01, sketch: bool = False):
+        """
+        Initializes the aggregation with a field name, a quantile and an error bound.
+
+        Args:
+            field_name (FieldPath | str): The name of the field.
+            q (float): The quantile, between 0 and 1.
+            error (float): The rank error of the estimate as a fraction of the values, 1% by default.
+            sketch (bool): Whether the result is the sketch itself instead of the quantile.
+        """
+        super().__init__(field_name)
+        assert 0 <= q <= 1, 'q must be between 0 and 1'
+        self.q = q
+        self.error = error
+        self.sketch = sketch
+
+    def init(self):
+        # a fixed seed makes the results of a query reproducible
+        return KLLSketch.for_error(self.error, seed=0)
+
+    def step(self, state: KLLSketch, value):
+        if isinstance(value, NUMERIC_TYPES):
+            state.add(value)
+        return state
+
+    def merge(self, state: KLLSketch, other: KLLSketch):
+        return state.merge(other)
 
+    def finalize(self, state: KLLSketch):
+        return state if self.sketch else state.quantile(self.q)
 
-class Avg(Aggregation):
+
+class ApproxMedian(ApproxQuantile):
     """
-    Represents an aggregation operation to calculate the average
-    (mean) value of numeric values for a certain field.
+    Represents an aggregation estimating the median of the numeric values
+    of a field with a KLL sketch, in constant memory.
     """
 
-    def apply(self, docs: list[QueryDocumentSnapshot]):
-        valid_values = self.get_numeric_values(docs)
-        return statistics.mean(valid_values) if valid_values else None
+    def __init__(self, field_name: FieldPath | str, error: float = 0.01, sketch: bool = False):
+        """
+        Initializes the aggregation with a field name and an error bound.
+
+        Args:
+            field_name (FieldPath | str): The name of the field.
+            error (float): The rank error of the estimate as a fraction of the values, 1% by default.
+            sketch (bool): Whether the result is the sketch itself instead of the median.
+        """
+        super().__init__(field_name, 0.5, error, sketch)
+
+
+def accumulate(scan: Callable[[], Iterable[tuple[str, Json]]], aggregations: dict[str, Aggregation]) -> dict[str, Any]:
+    """
+    Computes aggregations in a single pass over the decoded documents of a query, the
+    aggregations needing more passes get the documents again.
+
+    Args:
+        scan (Callable[[], Iterable[tuple[str, Json]]]): Returns the ``(id, data)`` of the documents.
+        aggregations (dict[str, Aggregation]): The aggregations by result key.
+
+    Returns:
+        dict[str, Any]: The results of the aggregations by key.
+    """
+    states = {key: aggregation.init() for key, aggregation in aggregations.items()}
+    pending = list(aggregations)
+    while pending:
+        extracts = [aggregations[key].extract for key in pending]
+        steps = [aggregations[key].step for key in pending]
+        current = [states[key] for key in pending]
+        accumulators = range(len(pending))
+        for doc_id, data in scan():
+            for i in accumulators:
+                current[i] = steps[i](current[i], extracts[i](doc_id, data))
+        remaining = []
+        for key, state in zip(pending, current):
+            states[key] = state
+            next_state = aggregations[key].next_pass(state)
+            if next_state is not None:
+                states[key] = next_state
+                remaining.append(key)
+        pending = remaining
+    return {key: aggregation.finalize(states[key]) for key, aggregation in aggregations.items()}
+
+
+def _group_value(field: FieldPath) -> Callable[[str, Json], Any]:
+    """Get the function extracting the value of a group field from the id and data of a document."""
+    if field == FieldPath.document_id:
+        return lambda doc_id, data: doc_id
+    path = field.path
+    return lambda doc_id, data: data.get(path)
+
+
+def _group_key(value) -> Any:
+    """Get a hashable key of a group value, dicts and lists are keyed by their JSON."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, default=str)
+    return value
+
+
+def accumulate_groups(
+        scan: Callable[[], Iterable[tuple[str, Json]]],
+        fields: list[FieldPath],
+        aggregations: dict[str, Aggregation],
+) -> list[dict[str, Any]]:
+    """
+    Computes aggregations per group of documents in a single pass over the decoded documents of a
+    query, the documents are hashed to the states of their group by the values of the group fields.
+    The groups whose aggregations need more passes get the documents again, the others skip them.
+
+    Args:
+        scan (Callable[[], Iterable[tuple[str, Json]]]): Returns the ``(id, data)`` of the documents.
+        fields (list[FieldPath]): The fields grouping the documents, a missing field groups as None.
+        aggregations (dict[str, Aggregation]): The aggregations by result key.
+
+    Returns:
+        list[dict[str, Any]]: A row per group in the order the groups are first seen, with the values
+        of the group fields by field path and the results of the aggregations by key.
+    """
+    keys = list(aggregations)
+    getters = [_group_value(field) for field in fields]
+    inits = [aggregations[key].init for key in keys]
+    extracts = [aggregations[key].extract for key in keys]
+    steps = [aggregations[key].step for key in keys]
+    accumulators = range(len(keys))
+    # group key -> (values of the group fields, states of the aggregations)
+    groups: dict[tuple, tuple[list, list]] = {}
+    for doc_id, data in scan():
+        values = [get(doc_id, data) for get in getters]
+        group_key = tuple(_group_key(value) for value in values)
+        group = groups.get(group_key)
+        if group is None:
+            group = groups[group_key] = (values, [init() for init in inits])
+        states = group[1]
+        for i in accumulators:
+            states[i] = steps[i](states[i], extracts[i](doc_id, data))
+
+    # group key -> indexes of the aggregations needing another pass
+    pending = {}
+    for group_key, (_, states) in groups.items():
+        remaining = _next_passes(aggregations, keys, states)
+        if remaining:
+            pending[group_key] = remaining
+    while pending:
+        for doc_id, data in scan():
+            group_key = tuple(_group_key(get(doc_id, data)) for get in getters)
+            remaining = pending.get(group_key)
+            if remaining:
+                states = groups[group_key][1]
+                for i in remaining:
+                    states[i] = steps[i](states[i], extracts[i](doc_id, data))
+        pending = {
+            group_key: next_remaining
+            for group_key, remaining in pending.items()
+            if (next_remaining := _next_passes(aggregations, keys, groups[group_key][1], remaining))
+        }
+
+    rows = []
+    for values, states in groups.values():
+        row = {str(field): value for field, value in zip(fields, values)}
+        for key, state in zip(keys, states):
+            row[key] = aggregations[key].finalize(state)
+        rows.append(row)
+    return rows
+
+
+def order_groups(groups: list[dict[str, Any]], order_by: list[tuple[FieldPath, bool]] = None,
+                 limit: int = None) -> list[dict[str, Any]]:
+    """
+    Orders and limits the rows of `accumulate_groups` by their group fields or aggregation results,
+    with a bounded heap when they are limited.
+
+    Args:
+        groups (list[dict[str, Any]]): The rows of the groups.
+        order_by (list[tuple[FieldPath, bool]]): The ``(field, descending)`` the rows are sorted by.
+        limit (int): The maximum number of rows returned.
+
+    Returns:
+        list[dict[str, Any]]: The first rows in the order, in the order the groups are first seen
+        without order_by.
+    """
+    if not order_by:
+        return groups if limit is None else groups[:limit]
+    key = _group_sort_key(order_by)
+    if limit is None:
+        return sorted(groups, key=key)
+    return heapq.nsmallest(limit, groups, key=key)
+
+
+def _group_sort_component(value) -> tuple:
+    """Get the sort key component of a group value, the values are ranked by kind like in the indexes then
+    compared, dicts, lists and NaN have no order and are sorted after the other values by their JSON."""
+    kind = value_kind(value)
+    if kind is None:
+        return len(KIND_RANKS), json.dumps(value, sort_keys=True, default=str)
+    return KIND_RANKS[kind], value
+
+
+def _group_sort_key(order_by: list[tuple[FieldPath, bool]]) -> Callable[[dict[str, Any]], Any]:
+    """Get the sort key of group rows, unlike documents they may hold values of any kind or None for a group
+    field or an aggregation result, None sorts before the other values and after them when descending."""
+    orders = [(str(field), descending) for field, descending in order_by]
+
+    def key_func(group):
+        key = []
+        for field, descending in orders:
+            component = _group_sort_component(group[field])
+            key.append(Descending(component) if descending else component)
+        return tuple(key)
+
+    return key_func
+
+
+def _next_passes(aggregations: dict[str, Aggregation], keys: list[str], states: list, indexes=None) -> list[int]:
+    """Moves the states of a group needing another pass to it and get their indexes."""
+    remaining = []
+    for i in range(len(keys)) if indexes is None else indexes:
+        next_state = aggregations[keys[i]].next_pass(states[i])
+        if next_state is not None:
+            states[i] = next_state
+            remaining.append(i)
+    return remaining
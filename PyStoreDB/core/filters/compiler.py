@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from PyStoreDB.constants import Json, LOOKUP_SEP
+from PyStoreDB.core.filters.lookups import lookup_registry
+from PyStoreDB.core.filters.utils import Q, F
+
+__all__ = ['Predicate', 'compile_filters', 'referenced_fields']
+
+Predicate = Callable[[Json], bool]
+
+
+def compile_filters(filters: list[Q]) -> Predicate:
+    """Compiles the filters of a query into a single predicate on its documents.
+
+    The keywords are parsed once, the lookups are resolved once per field type and the
+    connectors stop evaluating their children as soon as the result is known.
+
+    Args:
+        filters (list[Q]): The filters to compile, a document must match all of them.
+
+    Returns:
+        Predicate: The predicate.
+
+    Raises:
+        ValueError: If a keyword can not be parsed or a connector is unknown.
+    """
+    predicates = [compile_q(q) for q in filters]
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def match(document: Json) -> bool:
+        for predicate in predicates:
+            if not predicate(document):
+                return False
+        return True
+
+    return match
+
+
+def compile_q(q: Q) -> Predicate:
+    """Compiles a Q object into a predicate.
+
+    Args:
+        q (Q): The Q object containing the filter conditions.
+
+    Returns:
+        Predicate: The predicate.
+    """
+    children = [compile_q(child) if isinstance(child, Q) else compile_condition(*child) for child in q.children]
+    negated = q.negated
+    if q.connector == Q.AND:
+        def match(document: Json) -> bool:
+            for child in children:
+                if not child(document):
+                    return negated
+            return not negated
+    elif q.connector == Q.OR:
+        def match(document: Json) -> bool:
+            for child in children:
+                if child(document):
+                    return not negated
+            return negated
+    elif q.connector == Q.XOR:
+        def match(document: Json) -> bool:
+            matched = False
+            for child in children:
+                if child(document):
+                    if matched:
+                        return negated
+                    matched = True
+            return matched != negated
+    else:
+        raise ValueError(f'Unknown connector {q.connector}')
+    return match
+
+
+def compile_condition(arg: str, value) -> Predicate:
+    """Compiles a ``field__lookup=value`` condition into a predicate.
+
+    The lookup is compiled the first time a field value of a type is met, conditions comparing
+    with F expressions build their lookup for each document.
+
+    Args:
+        arg (str): The keyword of the condition.
+        value: The value of the condition.
+
+    Returns:
+        Predicate: The predicate.
+
+    Raises:
+        ValueError: If the keyword can not be parsed.
+    """
+    if not arg:
+        raise ValueError('Cannot parse query keyword {}'.format(arg))
+    field, _, lookup_name = arg.partition(LOOKUP_SEP)
+    lookup_name = lookup_name or 'exact'
+
+    def missing():
+        return ValueError(f'Field {field} not found in document')
+
+    def not_found():
+        return ValueError(f'Lookup "{lookup_name}" not found for field "{field}"')
+
+    if has_expressions(value):
+        def match(document: Json) -> bool:
+            if field not in document:
+                raise missing()
+            db_value = document[field]
+            lookup = lookup_registry.get_lookup(type(db_value), lookup_name, db_value, resolve(value, document))
+            if lookup is None:
+                raise not_found()
+            return lookup.as_bool
+
+        return match
+
+    value = resolve(value, None)
+    lookups: dict[type, Callable[[Any], bool]] = {}
+
+    def match(document: Json) -> bool:
+        if field not in document:
+            raise missing()
+        db_value = document[field]
+        field_type = type(db_value)
+        lookup = lookups.get(field_type)
+        if lookup is None:
+            lookup = lookup_registry.compile_lookup(field_type, lookup_name, value)
+            if lookup is None:
+                raise not_found()
+            lookups[field_type] = lookup
+        return lookup(db_value)
+
+    return match
+
+
+def referenced_fields(filters: list[Q]) -> set[str]:
+    """Collects the fields read by filters, by their conditions and by the F expressions they compare with.
+
+    Args:
+        filters (list[Q]): The filters of a query.
+
+    Returns:
+        set[str]: The names of the fields.
+    """
+    fields = set()
+    for q in filters:
+        for child in q.children:
+            if isinstance(child, Q):
+                fields |= referenced_fields([child])
+            else:
+                arg, value = child
+                fields.add(arg.partition(LOOKUP_SEP)[0])
+                fields |= _expression_fields(value)
+    return fields
+
+
+def _expression_fields(value) -> set[str]:
+    if isinstance(value, F):
+        return {value.field}
+    if isinstance(value, (list, tuple)):
+        return set().union(*(_expression_fields(v) for v in value))
+    return set()
+
+
+def has_expressions(value) -> bool:
+    """Checks whether a value holds F expressions."""
+    if isinstance(value, F):
+        return True
+    if isinstance(value, (list, tuple)):
+        return any(has_expressions(v) for v in value)
+    return False
+
+
+def resolve(value, document: Json | None):
+    """Resolves the F expressions of a value on a document, lists and tuples become lists."""
+    if isinstance(value, F):
+        return value.resolve(document)
+    elif isinstance(value, (list, tuple)):
+        return [resolve(v, document) for v in value]
+    return value
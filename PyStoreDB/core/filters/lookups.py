@@ -1,7 +1,8 @@
 import abc
+import functools
 import operator
 import re
-from typing import Type
+from typing import Any, Callable, Optional, Type
 
 from PyStoreDB.constants import supported_types
 
@@ -17,6 +18,7 @@ class __LookupRegistry:
     def __init__(self):
         """Initializes the lookup registry."""
         self.__registry: dict[type, dict[str, Type[Lookup]]] = {}
+        self.__resolved: dict[tuple[type, str], Optional[tuple[Type[Lookup], bool]]] = {}
 
     def register(self, *field_types):
         """Decorator to register a lookup class. If no type is provided, it is generic.
@@ -49,29 +51,67 @@ class __LookupRegistry:
             lookup_cls: The lookup class to add.
         """
         self.__registry.setdefault(field_type, {})[lookup_cls.lookup_name] = lookup_cls
+        self.__resolved.clear()
 
-    def get_lookup(self, field_type, lookup_name, field_value, lookup_value):
-        """Retrieves the lookup considering the 'i' prefix for strings.
+    def resolve(self, field_type, lookup_name) -> Optional[tuple[Type['Lookup'], bool]]:
+        """Resolves a lookup name for a field type considering the 'i' prefix for strings.
+
+        The resolutions are cached until a new lookup is registered.
 
         Args:
-            field_type: The field type to retrieve the lookup for.
+            field_type: The field type to resolve the lookup for.
             lookup_name: The name of the lookup.
-            field_value: The value of the field.
-            lookup_value: The value to lookup.
 
         Returns:
-            Lookup: The lookup instance or None if not found.
+            tuple[Type[Lookup], bool]: The lookup class and whether it is case sensitive, or None if not found.
         """
+        key = (field_type, lookup_name)
+        if key in self.__resolved:
+            return self.__resolved[key]
         case_sensitive = True
         if (lookup_name.startswith("i") and len(lookup_name[1:]) > 1 and
                 field_type == str and lookup_name[1:] in self.__registry.get(str, {})):
             lookup_name = lookup_name[1:]  # Remove the 'i'
             case_sensitive = False
         lookup_cls = self.__registry.get(field_type, dict()).get(lookup_name, None)
-        if lookup_cls:
+        resolved = self.__resolved[key] = (lookup_cls, case_sensitive) if lookup_cls else None
+        return resolved
+
+    def get_lookup(self, field_type, lookup_name, field_value, lookup_value):
+        """Retrieves the lookup considering the 'i' prefix for strings.
+
+        Args:
+            field_type: The field type to retrieve the lookup for.
+            lookup_name: The name of the lookup.
+            field_value: The value of the field.
+            lookup_value: The value to lookup.
+
+        Returns:
+            Lookup: The lookup instance or None if not found.
+        """
+        resolved = self.resolve(field_type, lookup_name)
+        if resolved:
+            lookup_cls, case_sensitive = resolved
             return lookup_cls(field_value, lookup_value, case_sensitive)
         return None  # Lookup not found
 
+    def compile_lookup(self, field_type, lookup_name, lookup_value) -> Optional[Callable[[Any], bool]]:
+        """Compiles the lookup against a value into a predicate on the field values of a type.
+
+        Args:
+            field_type: The field type to compile the lookup for.
+            lookup_name: The name of the lookup.
+            lookup_value: The value to lookup.
+
+        Returns:
+            Callable[[Any], bool]: The predicate or None if the lookup is not found.
+        """
+        resolved = self.resolve(field_type, lookup_name)
+        if resolved:
+            lookup_cls, case_sensitive = resolved
+            return lookup_cls.compile(lookup_value, case_sensitive)
+        return None  # Lookup not found
+
 
 class Lookup(abc.ABC):
     """Abstract base class for lookups."""
@@ -95,6 +135,22 @@ class Lookup(abc.ABC):
         if self.lookup_name is None:
             raise ValueError('lookup_name attribute must be set')
 
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup against a value into a predicate on the database values.
+
+        By default a lookup is built for each database value. Lookups override it to prepare the value
+        once per query, a subclass changing how such a lookup is evaluated should override it as well.
+
+        Args:
+            value: The value to lookup.
+            case_sensitive (bool): Whether the lookup is case sensitive. Defaults to True.
+
+        Returns:
+            Callable[[Any], bool]: The predicate.
+        """
+        return lambda db_value: cls(db_value, value, case_sensitive).as_bool
+
     def prepare_lookup(self):
         """Prepares the lookup. Can be overridden by subclasses."""
         pass
@@ -148,6 +204,18 @@ class BuiltinLookup(Lookup):
 
     _op = None
 
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup into a call of its operator.
+
+        Raises:
+            NotImplementedError: If the operator is not implemented.
+        """
+        op = cls._op or getattr(operator, cls.lookup_name, None)
+        if op is None:
+            raise NotImplementedError(f"Operator {cls.lookup_name} not implemented")
+        return lambda db_value: op(db_value, value)
+
     @property
     def as_bool(self):
         """Evaluates the lookup using the operator.
@@ -226,6 +294,14 @@ class Exact(StrPrepareMixin, BuiltinLookup):
     _op = operator.eq
     lookup_name = 'exact'
 
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup, the value is lowered once for case-insensitive lookups."""
+        if case_sensitive:
+            return super().compile(value)
+        value = value.lower() if isinstance(value, str) else value
+        return lambda db_value: (db_value.lower() if isinstance(db_value, str) else db_value) == value
+
 
 class PrepareListValueMixin(StrPrepareMixin):
     """Mixin class for preparing list values."""
@@ -245,6 +321,15 @@ class In(PrepareListValueMixin, BuiltinLookup):
     """Lookup class for 'in' comparison."""
     lookup_name = 'in'
 
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup, the values are prepared once."""
+        if case_sensitive:
+            values = list(value)
+            return lambda db_value: db_value in values
+        values = [v.lower() if isinstance(v, str) else v for v in value]
+        return lambda db_value: (db_value.lower() if isinstance(db_value, str) else db_value) in values
+
     @property
     def as_bool(self):
         """Evaluates the lookup using 'in' comparison.
@@ -260,6 +345,19 @@ class IsNull(BuiltinLookup):
     """Lookup class for 'is null' comparison."""
     lookup_name = 'isnull'
 
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup.
+
+        Raises:
+            ValueError: If the value is not a boolean.
+        """
+        if not isinstance(value, bool):
+            raise ValueError('Value must be a boolean')
+        if value:
+            return lambda db_value: db_value is None
+        return lambda db_value: db_value is not None
+
     @property
     def as_bool(self):
         """Evaluates the lookup using 'is null' comparison.
@@ -275,10 +373,36 @@ class IsNull(BuiltinLookup):
         return self.db_value is None if self.value else self.db_value is not None
 
 
+@functools.lru_cache(maxsize=256)
+def compile_pattern(pattern: str, flags: int = 0) -> re.Pattern[str]:
+    """Compiles a pattern, the compiled patterns are shared by the queries.
+
+    Args:
+        pattern (str): The pattern to compile.
+        flags (int): The flags of the pattern.
+
+    Returns:
+        re.Pattern[str]: The compiled pattern.
+    """
+    return re.compile(pattern, flags)
+
+
 class PatternLookup(Lookup):
     """Abstract base class for pattern-based lookups."""
 
-    pattern: str | re.Pattern[str] = None
+    pattern: str = None
+
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup, the pattern is compiled once.
+
+        Raises:
+            ValueError: If the pattern is not specified.
+        """
+        if cls.pattern is None:
+            raise ValueError('pattern attribute must be specified')
+        regex = compile_pattern(cls.pattern % (re.escape(str(value)),), 0 if case_sensitive else re.IGNORECASE)
+        return lambda db_value: regex.search(str(db_value)) is not None
 
     def prepare_lookup(self):
         """Prepares the lookup by converting values to strings."""
@@ -291,38 +415,60 @@ class PatternLookup(Lookup):
 
         Returns:
             bool: The result of the lookup.
+        """
+        return self.compile(self.value, self.case_sensitive)(self.db_value)
 
-        Raises:
-            ValueError: If the pattern is not specified.
+
+class StrMethodLookup(PatternLookup):
+    """Abstract base class for pattern lookups answered by a str method instead of a regex."""
+
+    @staticmethod
+    @abc.abstractmethod
+    def test(db_value: str, value: str) -> bool:
+        """Tests a database value against the lookup value.
+
+        Args:
+            db_value (str): The value from the database.
+            value (str): The value to lookup.
+
+        Returns:
+            bool: The result of the lookup.
         """
-        if self.pattern is None:
-            raise ValueError('pattern attribute must be specified')
-        flag = 0 if self.case_sensitive else re.IGNORECASE
-        pattern = self.pattern if isinstance(self.pattern, re.Pattern) else re.compile(
-            self.pattern % (re.escape(self.value),)
-        )
-        return bool(re.search(pattern, self.db_value, flags=flag))
+        pass
+
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup, case-insensitive lookups compare casefolded strings."""
+        test = cls.test
+        value = str(value)
+        if case_sensitive:
+            return lambda db_value: test(str(db_value), value)
+        value = value.casefold()
+        return lambda db_value: test(str(db_value).casefold(), value)
 
 
 @lookup_registry.register
-class StartsWith(PatternLookup):
+class StartsWith(StrMethodLookup):
     """Lookup class for 'starts with' comparison."""
     lookup_name = "startswith"
     pattern = '^%s'
+    test = staticmethod(str.startswith)
 
 
 @lookup_registry.register
-class EndsWith(PatternLookup):
+class EndsWith(StrMethodLookup):
     """Lookup class for 'ends with' comparison."""
     lookup_name = "endswith"
     pattern = '%s$'
+    test = staticmethod(str.endswith)
 
 
 @lookup_registry.register
-class Contains(PatternLookup):
+class Contains(StrMethodLookup):
     """Lookup class for 'contains' comparison."""
     lookup_name = "contains"
     pattern = '%s'
+    test = staticmethod(operator.contains)
 
 
 @lookup_registry.register
@@ -330,6 +476,22 @@ class Regex(PatternLookup):
     """Lookup class for regex comparison."""
     lookup_name = 'regex'
 
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup, the pattern is compiled once.
+
+        Raises:
+            AssertionError: If the value is not a string or regex pattern.
+        """
+        assert isinstance(value, (str, re.Pattern)), f'{value} must be str or Pattern'
+        pattern, flags = (value.pattern, value.flags) if isinstance(value, re.Pattern) else (value, 0)
+        regex = compile_pattern(pattern, flags if case_sensitive else flags | re.IGNORECASE)
+        return lambda db_value: regex.search(str(db_value)) is not None
+
+    def prepare_lookup(self):
+        """Prepares the lookup by converting the database value to a string."""
+        self.db_value = str(self.db_value)
+
     def prepare_value(self, value):
         """Prepares the lookup value.
 
@@ -343,25 +505,47 @@ class Regex(PatternLookup):
             AssertionError: If the value is not a string or regex pattern.
         """
         assert isinstance(value, (str, re.Pattern)), f'{value} must be str or Pattern'
-        self.pattern = value if isinstance(value, re.Pattern) else re.compile(value)
         return super().prepare_value(value)
 
 
 @lookup_registry.register
 class Range(Lookup, PrepareListValueMixin):
     """Lookup class for range comparison."""
+    lookup_name = 'range'
 
-    def prepare_value(self, value):
-        """Prepares the lookup value.
+    @staticmethod
+    def bounds(value) -> list:
+        """Gets the bounds of a range.
 
         Args:
             value: The value to lookup.
 
+        Returns:
+            list: The lower and upper bounds of the range.
+
         Raises:
             AssertionError: If the value is not a list, tuple, or set, or if its length is not 2.
         """
         assert isinstance(value, (list, tuple, set)), 'Value must be a list, tuple, or set'
         assert len(value) == 2, 'Value must contain exactly 2 elements'
+        return list(value)
+
+    @classmethod
+    def compile(cls, value, case_sensitive=True) -> Callable[[Any], bool]:
+        """Compiles the lookup, the bounds are checked once."""
+        low, high = cls.bounds(value)
+        return lambda db_value: low <= db_value <= high
+
+    def prepare_value(self, value):
+        """Prepares the lookup value.
+
+        Args:
+            value: The value to lookup.
+
+        Returns:
+            list: The lower and upper bounds of the range.
+        """
+        return self.bounds(value)
 
     @property
     def as_bool(self) -> bool:
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from typing import Optional
+
+__all__ = ['Descending', 'KIND_RANKS', 'value_kind']
+
+# values of different kinds can't be compared, the rank of their kind is compared first
+KIND_RANKS = {'null': 0, 'number': 1, 'str': 2, 'datetime': 3, 'aware-datetime': 4}
+
+
+def value_kind(value) -> Optional[str]:
+    """Returns the group of values value can be ordered with without raising, None if it can't be ordered."""
+    if value is None:
+        return 'null'
+    if isinstance(value, (bool, int)):
+        return 'number'
+    if isinstance(value, float):
+        return None if math.isnan(value) else 'number'
+    if isinstance(value, str):
+        return 'str'
+    if isinstance(value, datetime):
+        return 'datetime' if value.utcoffset() is None else 'aware-datetime'
+    return None
+
+
+class Descending:
+    """Reverses the ordering of a sort key component."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, Descending) and self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import abc
-from typing import TypeVar, Generic, TYPE_CHECKING, Any, Callable
+from typing import TypeVar, Generic, TYPE_CHECKING, Any, Callable, Iterator
 
 from . import FieldPath
 
@@ -13,6 +13,7 @@ if TYPE_CHECKING:
 
 __all__ = [
     'Query',
+    'GroupedQuery',
     'QuerySnapshot',
 ]
 
@@ -92,6 +93,36 @@ class Query(abc.ABC, Generic[_T]):
         """
         pass
 
+    @abc.abstractmethod
+    def stream(self) -> Iterator[QueryDocumentSnapshot[_T]]:
+        """
+        Executes the query lazily and yields its results as they are produced.
+
+        Unlike get(), the matching documents are not collected first: without order_by the
+        collection is read as the results are consumed and a limit stops the reading.
+
+        Returns:
+            Iterator[QueryDocumentSnapshot[_T]]: The documents matching the query.
+        """
+        pass
+
+    @abc.abstractmethod
+    def explain(self, analyze: bool = False) -> dict[str, Any]:
+        """
+        Describes how the query is run without returning its results.
+
+        The plan tells how the documents are accessed (``scan``, ``index`` or ``index-range``), the
+        indexes and lookups pushed down to them, and the filter, sort, cursor and limit strategies.
+
+        Args:
+            analyze (bool): Whether to run the query and add the documents examined, decoded and
+                returned and the time spent in each stage under ``stats``.
+
+        Returns:
+            dict[str, Any]: The plan of the query.
+        """
+        pass
+
     @abc.abstractmethod
     def limit(self, limit: int) -> Query[_T]:
         """
@@ -222,6 +253,23 @@ class Query(abc.ABC, Generic[_T]):
         """
         pass
 
+    @abc.abstractmethod
+    def select(self, *fields: str | FieldPath) -> Query[_T]:
+        """
+        Projects the results of the query on some fields.
+
+        Only the selected fields, and the fields read by the filters and order_by clauses
+        of the query, are decoded by the engine. The snapshots of the results only hold
+        the selected fields.
+
+        Args:
+            *fields (str | FieldPath): The fields to select.
+
+        Returns:
+            Query[_T]: The query instance.
+        """
+        pass
+
     @abc.abstractmethod
     def aggregate(self, *args) -> dict[str, Any]:
         """
@@ -235,6 +283,20 @@ class Query(abc.ABC, Generic[_T]):
         """
         pass
 
+    @abc.abstractmethod
+    def group_by(self, *fields: str | FieldPath) -> GroupedQuery:
+        """
+        Groups the results of the query by the values of fields, to aggregate each group.
+
+        Args:
+            *fields (str | FieldPath): The fields grouping the documents, a document without
+                a field is grouped with the ones where it is None.
+
+        Returns:
+            GroupedQuery: The grouped query.
+        """
+        pass
+
     @abc.abstractmethod
     def with_converter(self, from_json: Callable[[_T], _U], to_json: Callable[[_U], _T]) -> Query[_U]:
         """
@@ -250,6 +312,58 @@ class Query(abc.ABC, Generic[_T]):
         pass
 
 
+class GroupedQuery(abc.ABC):
+    """
+    Represents the results of a query grouped by the values of some fields.
+
+    The aggregations of every group are computed in a single pass over the documents
+    of the query, which are hashed to their group, instead of a query per group. The
+    groups are returned as rows holding the values of the group fields and the results
+    of the aggregations, which can be ordered and limited like the documents of a query.
+    """
+
+    @abc.abstractmethod
+    def order_by(self, field: str | FieldPath, descending=False) -> GroupedQuery:
+        """
+        Orders the groups by a group field or the result of an aggregation.
+
+        Args:
+            field (str | FieldPath): The group field or the key of the aggregation.
+            descending (bool, optional): Whether to order the groups in descending order. Defaults to False.
+
+        Returns:
+            GroupedQuery: The grouped query instance.
+        """
+        pass
+
+    @abc.abstractmethod
+    def limit(self, limit: int) -> GroupedQuery:
+        """
+        Limits the number of groups returned.
+
+        Args:
+            limit (int): The maximum number of groups to return.
+
+        Returns:
+            GroupedQuery: The grouped query instance.
+        """
+        pass
+
+    @abc.abstractmethod
+    def aggregate(self, *args) -> list[dict[str, Any]]:
+        """
+        Aggregates the documents of every group.
+
+        Args:
+            *args: The aggregation operations to perform.
+
+        Returns:
+            list[dict[str, Any]]: A row per group with the values of the group fields and the
+            aggregated results.
+        """
+        pass
+
+
 class QuerySnapshot(abc.ABC, Generic[_T]):
     """Represents an abstract base class for a snapshot of a query.
 
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import math
+import random
+from datetime import datetime
+from typing import Any
+
+from PyStoreDB.constants import Json
+
+__all__ = ['HyperLogLog', 'KLLSketch']
+
+
+def hash_value(value) -> int:
+    """Returns a 64 bits hash of a field value, stable across processes unlike `hash`.
+
+    Values equal in Python (``1``, ``1.0`` and ``True``) have the same hash like in a set.
+    """
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        key = b'n' + repr(value).encode()
+    elif isinstance(value, str):
+        key = b's' + value.encode('utf-8', 'surrogatepass')
+    elif isinstance(value, datetime):
+        key = b'd' + value.isoformat().encode()
+    else:
+        key = b'j' + json.dumps(value, sort_keys=True, default=str).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """HyperLogLog sketch estimating the number of distinct values added to it.
+
+    The sketch has ``2 ** precision`` registers of one byte and the relative standard error of
+    its estimate is ``1.04 / sqrt(2 ** precision)``. Sketches of the same precision are merged
+    into the sketch of the union of their values.
+
+    Attributes:
+        precision (int): The number of bits of the hash selecting a register.
+        registers (bytearray): The longest run of leading zeros seen by each register, plus one.
+    """
+    MIN_PRECISION = 4
+    MAX_PRECISION = 18
+
+    def __init__(self, precision: int = 14):
+        """Initializes an empty sketch.
+
+        Args:
+            precision (int): The number of bits of the hash selecting a register, between 4 and 18.
+
+        Raises:
+            ValueError: If the precision is out of bounds.
+        """
+        if not self.MIN_PRECISION <= precision <= self.MAX_PRECISION:
+            raise ValueError(f'precision must be between {self.MIN_PRECISION} and {self.MAX_PRECISION}')
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @classmethod
+    def for_error(cls, error: float) -> HyperLogLog:
+        """Creates the smallest sketch whose relative standard error is at most error.
+
+        Args:
+            error (float): The relative standard error, e.g. ``0.01`` for 1%.
+
+        Returns:
+            HyperLogLog: The sketch.
+        """
+        if not 0 < error < 1:
+            raise ValueError('error must be between 0 and 1')
+        precision = math.ceil(2 * math.log2(1.04 / error))
+        return cls(min(max(precision, cls.MIN_PRECISION), cls.MAX_PRECISION))
+
+    def add(self, value):
+        """Adds a value to the sketch."""
+        h = hash_value(value)
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: HyperLogLog) -> HyperLogLog:
+        """Adds the values of another sketch of the same precision to this one.
+
+        Returns:
+            HyperLogLog: This sketch.
+        """
+        if other.precision != self.precision:
+            raise ValueError('HyperLogLog sketches of different precisions can not be merged')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self) -> int:
+        """Returns the estimated number of distinct values added to the sketch."""
+        m = len(self.registers)
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / math.fsum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # small cardinalities, linear counting of the empty registers is more accurate
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_dict(self) -> Json:
+        """Returns the sketch as JSON data, e.g. to be saved in a document."""
+        return {
+            'sketch': 'hyperloglog',
+            'precision': self.precision,
+            'registers': base64.b64encode(bytes(self.registers)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Json) -> HyperLogLog:
+        """Restores a sketch saved with `to_dict`."""
+        if data.get('sketch') != 'hyperloglog':
+            raise ValueError('data is not a HyperLogLog sketch')
+        sketch = cls(data['precision'])
+        registers = base64.b64decode(data['registers'])
+        if len(registers) != len(sketch.registers):
+            raise ValueError('HyperLogLog registers do not match the precision')
+        sketch.registers = bytearray(registers)
+        return sketch
+
+
+class KLLSketch:
+    """KLL sketch of the distribution of numeric values, answering approximate quantile queries.
+
+    Values are added to the first compactor, a full compactor sorts its values and promotes
+    every other one to the next compactor where it weighs twice as much. The capacities of
+    the compactors decrease geometrically from the top one, which holds k values, so the
+    sketch keeps ``O(k)`` values whatever their number and the rank error of a quantile is
+    about ``3.3 / k`` of the values (1.65% with k=200). Sketches of the same k are merged
+    into the sketch of the union of their values.
+
+    Attributes:
+        k (int): The capacity of the top compactor.
+        compactors (list[list]): The values of each level, a value of level h weighs ``2 ** h``.
+        count (int): The number of values added to the sketch.
+    """
+    C = 2 / 3
+
+    def __init__(self, k: int = 200, seed: int | None = None):
+        """Initializes an empty sketch.
+
+        Args:
+            k (int): The capacity of the top compactor, at least 8.
+            seed (int | None): The seed of the coin choosing the values promoted by a compaction.
+        """
+        if k < 8:
+            raise ValueError('k must be at least 8')
+        self.k = k
+        self.compactors: list[list] = [[]]
+        self.count = 0
+        self._random = random.Random(seed)
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    @classmethod
+    def for_error(cls, error: float, seed: int | None = None) -> KLLSketch:
+        """Creates the smallest sketch whose rank error is about error.
+
+        Args:
+            error (float): The rank error as a fraction of the values, e.g. ``0.01`` for 1%.
+            seed (int | None): The seed of the coin choosing the values promoted by a compaction.
+
+        Returns:
+            KLLSketch: The sketch.
+        """
+        if not 0 < error < 1:
+            raise ValueError('error must be between 0 and 1')
+        return cls(max(8, math.ceil(3.3 / error)), seed)
+
+    def _capacity(self, level: int) -> int:
+        height = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * self.C ** height)) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        for level, compactor in enumerate(self.compactors):
+            if len(compactor) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self._grow()
+                compactor.sort()
+                # an odd count leaves the largest value in the compactor
+                end = len(compactor) - len(compactor) % 2
+                self.compactors[level + 1].extend(compactor[self._random.randrange(2):end:2])
+                del compactor[:end]
+                self._size = sum(len(compactor) for compactor in self.compactors)
+                if self._size < self._max_size:
+                    break
+
+    def add(self, value: int | float):
+        """Adds a value to the sketch."""
+        self.compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: KLLSketch) -> KLLSketch:
+        """Adds the values of another sketch of the same k to this one.
+
+        Returns:
+            KLLSketch: This sketch.
+        """
+        if other.k != self.k:
+            raise ValueError('KLL sketches of different k can not be merged')
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for compactor, other_compactor in zip(self.compactors, other.compactors):
+            compactor.extend(other_compactor)
+        self.count += other.count
+        self._size = sum(len(compactor) for compactor in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def quantile(self, q: float) -> Any:
+        """Returns the approximate value of the quantile q of the values, None if the sketch is empty.
+
+        Args:
+            q (float): The quantile, between 0 and 1, 0.5 being the median.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError('q must be between 0 and 1')
+        weighted = sorted(
+            (value, 1 << level) for level, compactor in enumerate(self.compactors) for value in compactor
+        )
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return weighted[-1][0]
+
+    def to_dict(self) -> Json:
+        """Returns the sketch as JSON data, e.g. to be saved in a document."""
+        return {'sketch': 'kll', 'k': self.k, 'count': self.count, 'compactors': [list(c) for c in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, data: Json, seed: int | None = None) -> KLLSketch:
+        """Restores a sketch saved with `to_dict`."""
+        if data.get('sketch') != 'kll':
+            raise ValueError('data is not a KLL sketch')
+        sketch = cls(data['k'], seed)
+        for _ in data['compactors'][1:]:
+            sketch._grow()
+        sketch.compactors = [list(compactor) for compactor in data['compactors']]
+        sketch.count = data['count']
+        sketch._size = sum(len(compactor) for compactor in sketch.compactors)
+        return sketch
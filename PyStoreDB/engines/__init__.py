@@ -1,4 +1,19 @@
 from PyStoreDB.engines.base import PyStoreDBEngine
 from ._raw import PyStoreDBRawEngine
+from ._sharded import PyStoreDBShardedEngine
+from .kv import PyStoreDBKeyValueEngine
+from ._sqlite import PyStoreDBSQLiteEngine
+from ._bitcask import PyStoreDBBitcaskEngine
+from ._lsm import PyStoreDBLSMEngine
+from ._btree import PyStoreDBBTreeEngine
 
-__all__ = ['PyStoreDBRawEngine', 'PyStoreDBEngine']
+__all__ = [
+    'PyStoreDBRawEngine',
+    'PyStoreDBShardedEngine',
+    'PyStoreDBSQLiteEngine',
+    'PyStoreDBBitcaskEngine',
+    'PyStoreDBLSMEngine',
+    'PyStoreDBBTreeEngine',
+    'PyStoreDBKeyValueEngine',
+    'PyStoreDBEngine',
+]
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import BinaryIO, Iterable, Optional
+
+from PyStoreDB._utils import parent_path
+from PyStoreDB.constants import Json
+from PyStoreDB.engines._bitcask import records
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.engines.kv import PyStoreDBKeyValueEngine
+
+__all__ = ['PyStoreDBBitcaskEngine']
+
+DATA_EXTENSION = '.data'
+HINT_EXTENSION = '.hint'
+
+
+class PyStoreDBBitcaskEngine(PyStoreDBKeyValueEngine):
+    """Log-structured engine in the style of Bitcask.
+
+    Every write appends a record to the active data file of the ``{store_dir}/{store_name}.bitcask``
+    directory and an in-memory key directory maps each document path to the location of its
+    latest value, so a document read is a single seek and read. The active file is rotated
+    once it reaches ``max_file_size`` bytes.
+
+    Overwritten and deleted values stay in the data files until they are merged: `merge`
+    rewrites the live documents in a new data file along with a hint file holding their
+    locations, which is what the key directory is rebuilt from when the store is opened
+    instead of scanning the data. A merge runs automatically once the stale bytes reach both
+    ``merge_min_size`` and ``merge_ratio`` of the data files.
+    """
+
+    def __init__(self, store_name: str, max_file_size: int = 64 * 1024 * 1024, merge_ratio: float = 0.5,
+                 merge_min_size: int = 16 * 1024 * 1024, **kwargs):
+        super().__init__(store_name, **kwargs)
+        self.max_file_size = max_file_size
+        self.merge_ratio = merge_ratio
+        self.merge_min_size = merge_min_size
+        self._dir = None
+        # path -> (file id, value offset, value size), in insertion order like the raw engine dicts
+        self._keydir: dict[str, tuple[int, int, int]] = {}
+        self._collections: dict[str, dict[str, None]] = {}
+        self._readers: dict[int, BinaryIO] = {}
+        self._active: Optional[BinaryIO] = None
+        self._active_id = 0
+        self._active_size = 0
+        self._total_bytes = 0
+        self._dead_bytes = 0
+
+    def create_database_if_not_exists(self):
+        os.makedirs(self._dir, exist_ok=True)
+
+    def initialize(self):
+        if not self.in_memory:
+            self._dir = os.path.join(self.settings.store_dir, f'{self.store_name}.bitcask')
+            super().initialize()
+            self._load()
+            self._start_flusher()
+
+    def _file(self, file_id: int, extension: str = DATA_EXTENSION) -> str:
+        return os.path.join(self._dir, f'{file_id:09d}{extension}')
+
+    def _file_ids(self) -> list[int]:
+        return sorted(
+            int(file_name[:-len(DATA_EXTENSION)])
+            for file_name in os.listdir(self._dir)
+            if file_name.endswith(DATA_EXTENSION)
+        )
+
+    def _load(self):
+        """Rebuilds the key directory from the hint files, or the data files lacking one."""
+        file_ids = self._file_ids()
+        for file_id in file_ids:
+            if os.path.exists(self._file(file_id, HINT_EXTENSION)):
+                with open(self._file(file_id, HINT_EXTENSION), 'rb') as f:
+                    for key, value_offset, value_size in records.read_hints(f):
+                        self._index(key, (file_id, value_offset, value_size))
+                self._total_bytes += os.path.getsize(self._file(file_id))
+                continue
+            end = 0
+            with open(self._file(file_id), 'rb') as f:
+                for key, flags, value_offset, value_size, end in records.read_records(f):
+                    if flags == records.TOMBSTONE:
+                        self._unindex(key)
+                        self._dead_bytes += self._record_size(key, 0)
+                    else:
+                        self._index(key, (file_id, value_offset, value_size))
+            if end < os.path.getsize(self._file(file_id)):
+                # torn record written by a crash, drop it
+                os.truncate(self._file(file_id), end)
+            self._total_bytes += end
+        if file_ids and not os.path.exists(self._file(file_ids[-1], HINT_EXTENSION)) \
+                and os.path.getsize(self._file(file_ids[-1])) < self.max_file_size:
+            self._open_active(file_ids[-1])
+        else:
+            self._open_active(file_ids[-1] + 1 if file_ids else 1)
+
+    def _open_active(self, file_id: int):
+        self._active_id = file_id
+        self._active = open(self._file(file_id), 'ab')
+        self._active_size = self._active.tell()
+
+    @staticmethod
+    def _record_size(key: str, value_size: int) -> int:
+        return records.HEADER.size + len(key.encode()) + value_size
+
+    def _index(self, key: str, entry: tuple[int, int, int]):
+        old = self._keydir.get(key)
+        if old is not None:
+            self._dead_bytes += self._record_size(key, old[2])
+        self._keydir[key] = entry
+        self._collections.setdefault(parent_path(key), {})[key.rsplit('/', 1)[-1]] = None
+
+    def _unindex(self, key: str):
+        old = self._keydir.pop(key, None)
+        if old is not None:
+            self._dead_bytes += self._record_size(key, old[2])
+            children = self._collections[parent_path(key)]
+            children.pop(key.rsplit('/', 1)[-1])
+            if not children:
+                del self._collections[parent_path(key)]
+
+    def _append(self, key: str, value: Optional[bytes]) -> tuple[int, int, int]:
+        record = records.encode_record(key, value)
+        if self._active_size and self._active_size + len(record) > self.max_file_size:
+            self._active.close()
+            self._open_active(self._active_id + 1)
+        self._active.write(record)
+        entry = (self._active_id, self._active_size + len(record) - len(value or b''), len(value or b''))
+        self._active_size += len(record)
+        self._total_bytes += len(record)
+        return entry
+
+    def _read(self, file_id: int, value_offset: int, value_size: int) -> bytes:
+        with self._lock:
+            if file_id == self._active_id:
+                self._active.flush()
+            reader = self._readers.get(file_id)
+            if reader is None:
+                reader = self._readers[file_id] = open(self._file(file_id), 'rb', buffering=0)
+            reader.seek(value_offset)
+            return reader.read(value_size)
+
+    def doc_exists(self, path) -> bool:
+        return path in self._keydir
+
+    def _get(self, path: str) -> Optional[Json]:
+        with self._lock:
+            entry = self._keydir.get(path)
+            return None if entry is None else json.loads(self._read(*entry))
+
+    def _put(self, path: str, data: Json):
+        value = json.dumps(data, separators=(',', ':')).encode()
+        self._index(path, self._append(path, value))
+
+    def _remove(self, path: str):
+        if path in self._keydir:
+            self._append(path, None)
+            self._unindex(path)
+            # the tombstone is stale as soon as it is written
+            self._dead_bytes += self._record_size(path, 0)
+
+    def _children(self, path: str) -> Iterable[tuple[str, Json]]:
+        with self._lock:
+            return [(doc_id, self._get(f'{path}/{doc_id}')) for doc_id in self._collections.get(path, ())]
+
+    def _scan(self, path: str) -> Iterable[tuple[str, Json]]:
+        prefix = path.rstrip('/') + '/'
+        with self._lock:
+            return [
+                (key, self._get(key)) for key in self._keydir
+                if not path or key == path or key.startswith(prefix)
+            ]
+
+    def _has_descendants(self, path: str) -> bool:
+        prefix = path.rstrip('/') + '/'
+        with self._lock:
+            return any(collection == path or collection.startswith(prefix) for collection in self._collections)
+
+    def _drop(self):
+        self._close_files()
+        for file_name in os.listdir(self._dir):
+            if file_name.endswith((DATA_EXTENSION, HINT_EXTENSION)):
+                os.remove(os.path.join(self._dir, file_name))
+        self._keydir = {}
+        self._collections = {}
+        self._total_bytes = self._dead_bytes = 0
+        self._open_active(1)
+
+    def save(self):
+        super().save()
+        if self._dead_bytes >= self.merge_min_size and self._dead_bytes >= self.merge_ratio * self._total_bytes:
+            self.merge()
+
+    def flush(self):
+        """Writes the buffered records to the active data file."""
+        with self._lock:
+            if self._active is None:
+                return
+            if self.settings.fsync == 'always':
+                utils.fsync_file(self._active)
+            else:
+                self._active.flush()
+
+    def merge(self):
+        """Rewrites the live documents in a new data file with its hint file and removes the older files."""
+        with self._lock:
+            merged_id = self._active_id + 1
+            data_file, hint_file = self._file(merged_id), self._file(merged_id, HINT_EXTENSION)
+            keydir = {}
+            offset = 0
+            with open(data_file + '.tmp', 'wb') as data, open(hint_file + '.tmp', 'wb') as hint:
+                for key, entry in self._keydir.items():
+                    value = self._read(*entry)
+                    record = records.encode_record(key, value)
+                    data.write(record)
+                    keydir[key] = (merged_id, offset + len(record) - len(value), len(value))
+                    hint.write(records.encode_hint(key, *keydir[key][1:]))
+                    offset += len(record)
+                for f in (data, hint):
+                    if self.settings.fsync != 'never':
+                        utils.fsync_file(f)
+            os.replace(data_file + '.tmp', data_file)
+            os.replace(hint_file + '.tmp', hint_file)
+            if self.settings.fsync != 'never':
+                utils.fsync_directory(self._dir)
+            self._close_files()
+            for file_id in self._file_ids():
+                if file_id < merged_id:
+                    os.remove(self._file(file_id))
+                    if os.path.exists(self._file(file_id, HINT_EXTENSION)):
+                        os.remove(self._file(file_id, HINT_EXTENSION))
+            self._keydir = keydir
+            self._total_bytes, self._dead_bytes = offset, 0
+            self._open_active(merged_id + 1)
+
+    def _close_files(self):
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+        for reader in self._readers.values():
+            reader.close()
+        self._readers = {}
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._close_files()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import BinaryIO, Iterator, Optional
+
+__all__ = ['HEADER', 'HINT', 'PUT', 'TOMBSTONE', 'encode_record', 'read_records', 'encode_hint', 'read_hints']
+
+# crc32, flags, key size, value size
+HEADER = struct.Struct('>IBII')
+# value offset, value size, key size
+HINT = struct.Struct('>III')
+
+PUT = 0
+TOMBSTONE = 1
+
+
+def encode_record(key: str, value: Optional[bytes]) -> bytes:
+    """Encodes a data file record, a None value encodes a tombstone."""
+    key = key.encode()
+    flags, value = (TOMBSTONE, b'') if value is None else (PUT, value)
+    body = HEADER.pack(0, flags, len(key), len(value))[4:] + key + value
+    return struct.pack('>I', zlib.crc32(body)) + body
+
+
+def read_records(f: BinaryIO) -> Iterator[tuple[str, int, int, int, int]]:
+    """Yields the (key, flags, value offset, value size, record end) of the records of a data file.
+
+    Stops at the first torn or corrupted record, the end of the last record yielded is the
+    end of the valid part of the file.
+    """
+    offset = 0
+    while True:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        crc, flags, key_size, value_size = HEADER.unpack(header)
+        payload = f.read(key_size + value_size)
+        if len(payload) < key_size + value_size or zlib.crc32(header[4:] + payload) != crc:
+            return
+        value_offset = offset + HEADER.size + key_size
+        offset = value_offset + value_size
+        yield payload[:key_size].decode(), flags, value_offset, value_size, offset
+
+
+def encode_hint(key: str, value_offset: int, value_size: int) -> bytes:
+    key = key.encode()
+    return HINT.pack(value_offset, value_size, len(key)) + key
+
+
+def read_hints(f: BinaryIO) -> Iterator[tuple[str, int, int]]:
+    """Yields the (key, value offset, value size) entries of a hint file."""
+    while True:
+        entry = f.read(HINT.size)
+        if len(entry) < HINT.size:
+            return
+        value_offset, value_size, key_size = HINT.unpack(entry)
+        key = f.read(key_size)
+        if len(key) < key_size:
+            return
+        yield key.decode(), value_offset, value_size
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+from typing import Iterable, Iterator, Optional
+
+from PyStoreDB.constants import Json
+from PyStoreDB.engines._btree.pager import Pager
+from PyStoreDB.engines._btree.pages import Internal, Leaf, OverflowRef, Overflow, Value, OVERFLOW_HEADER
+from PyStoreDB.engines.kv import PyStoreDBKeyValueEngine
+
+__all__ = ['PyStoreDBBTreeEngine']
+
+
+class PyStoreDBBTreeEngine(PyStoreDBKeyValueEngine):
+    """On-disk B+tree engine for stores larger than the memory.
+
+    Documents are stored in the leaves of a B+tree keyed by their path in the
+    ``{store_dir}/{store_name}.btree`` file, so the documents of a collection are a contiguous
+    range of keys read by following the leaf chain. Pages of ``page_size`` bytes are read
+    through a memory map and at most ``cache_pages`` decoded pages are kept in memory, values
+    larger than a quarter of a page are stored in overflow pages.
+
+    Deletes don't rebalance the tree, emptied leaves stay in place and are reused by later
+    inserts in their key range. Every flush is atomic thanks to a rollback journal.
+    """
+
+    def __init__(self, store_name: str, page_size: int = 4096, cache_pages: int = 1024, **kwargs):
+        super().__init__(store_name, **kwargs)
+        self.page_size = page_size
+        self.cache_pages = cache_pages
+        self._pager: Optional[Pager] = None
+
+    def create_database_if_not_exists(self):
+        self._pager = Pager(
+            os.path.join(self.settings.store_dir, f'{self.store_name}.btree'), self.page_size, self.cache_pages,
+            fsync=self.settings.fsync != 'never'
+        )
+
+    def initialize(self):
+        if not self.in_memory:
+            super().initialize()
+            self._start_flusher()
+
+    def _find_leaf(self, key: str) -> tuple[list[int], Leaf]:
+        """Returns the page ids from the root to the leaf where key belongs, and that leaf."""
+        page_ids = [self._pager.header.root]
+        node = self._pager.get(page_ids[-1])
+        while isinstance(node, Internal):
+            page_ids.append(node.children[bisect.bisect_right(node.keys, key)])
+            node = self._pager.get(page_ids[-1])
+        return page_ids, node
+
+    def _write_node(self, page_ids: list[int], node: Leaf | Internal):
+        """Puts the node at the end of page_ids back, splitting it and its ancestors while they overflow a page."""
+        page_id = page_ids.pop()
+        while len(node.encode()) > self._pager.page_size:
+            parts = self._split_node(node)
+            ids = [page_id, *(self._pager.allocate() for _ in parts[1:])]
+            if isinstance(node, Leaf):
+                for (_, part), next_id in zip(parts, ids[1:]):
+                    part.next = next_id
+            for (_, part), part_id in zip(parts, ids):
+                self._pager.put(part_id, part)
+            if page_ids:
+                page_id = page_ids.pop()
+                node = self._pager.get(page_id)
+                for (separator, _), part_id in zip(parts[1:], ids[1:]):
+                    position = bisect.bisect_right(node.keys, separator)
+                    node.keys.insert(position, separator)
+                    node.children.insert(position + 1, part_id)
+            else:
+                node = Internal([separator for separator, _ in parts[1:]], ids)
+                page_id = self._pager.header.root = self._pager.allocate()
+        self._pager.put(page_id, node)
+
+    def _split_node(self, node: Leaf | Internal) -> list[tuple[Optional[str], Leaf | Internal]]:
+        """Splits a node until every part fits in a page, returns the parts in key order with the separator
+        before each of them (None for the first one)."""
+        if len(node.encode()) <= self._pager.page_size or len(node.keys) < (2 if isinstance(node, Leaf) else 3):
+            # a node that can't be split further is refused by the pager when it is flushed
+            return [(None, node)]
+        separator, right = node.split()
+        left_parts, right_parts = self._split_node(node), self._split_node(right)
+        right_parts[0] = (separator, right_parts[0][1])
+        return left_parts + right_parts
+
+    def _write_value(self, data: bytes) -> Value:
+        if len(data) <= self._pager.page_size // 4:
+            return data
+        chunk_size = self._pager.page_size - OVERFLOW_HEADER.size
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        page_ids = [self._pager.allocate() for _ in chunks]
+        for chunk, page_id, next_page in zip(chunks, page_ids, [*page_ids[1:], 0]):
+            self._pager.put(page_id, Overflow(chunk, next_page))
+        return OverflowRef(page_ids[0], len(data))
+
+    def _read_value(self, value: Value) -> bytes:
+        if not isinstance(value, OverflowRef):
+            return value
+        chunks, page_id = [], value.page
+        while page_id:
+            page = self._pager.get(page_id)
+            chunks.append(page.data)
+            page_id = page.next
+        return b''.join(chunks)
+
+    def _free_value(self, value: Value):
+        if isinstance(value, OverflowRef):
+            page_id = value.page
+            while page_id:
+                next_page = self._pager.get(page_id).next
+                self._pager.free(page_id)
+                page_id = next_page
+
+    def _lookup(self, path: str) -> tuple[list[int], Leaf, int, bool]:
+        page_ids, leaf = self._find_leaf(path)
+        position = bisect.bisect_left(leaf.keys, path)
+        return page_ids, leaf, position, position < len(leaf.keys) and leaf.keys[position] == path
+
+    def doc_exists(self, path) -> bool:
+        with self._lock:
+            return self._lookup(path)[3]
+
+    def _get(self, path: str) -> Optional[Json]:
+        with self._lock:
+            _, leaf, position, found = self._lookup(path)
+            return json.loads(self._read_value(leaf.values[position][1])) if found else None
+
+    def _put(self, path: str, data: Json):
+        value = json.dumps(data, separators=(',', ':')).encode()
+        page_ids, leaf, position, found = self._lookup(path)
+        if found:
+            # documents keep their insertion sequence, collections are listed in that order like the raw engine
+            seq, old = leaf.values[position]
+            self._free_value(old)
+            leaf.values[position] = (seq, self._write_value(value))
+        else:
+            seq = self._pager.header.next_seq
+            self._pager.header.next_seq += 1
+            self._pager.mark_header()
+            leaf.keys.insert(position, path)
+            leaf.values.insert(position, (seq, self._write_value(value)))
+        self._write_node(page_ids, leaf)
+
+    def _remove(self, path: str):
+        page_ids, leaf, position, found = self._lookup(path)
+        if found:
+            self._free_value(leaf.values[position][1])
+            del leaf.keys[position], leaf.values[position]
+            self._pager.put(page_ids[-1], leaf)
+
+    def _range(self, prefix: str) -> Iterator[tuple[str, int, Value]]:
+        """Yields the (key, seq, value) entries whose key starts with prefix, in key order."""
+        _, leaf = self._find_leaf(prefix)
+        position = bisect.bisect_left(leaf.keys, prefix)
+        while True:
+            for key, (seq, value) in zip(leaf.keys[position:], leaf.values[position:]):
+                if not key.startswith(prefix):
+                    return
+                yield key, seq, value
+            if not leaf.next:
+                return
+            leaf, position = self._pager.get(leaf.next), 0
+
+    def _children(self, path: str) -> Iterable[tuple[str, Json]]:
+        prefix = path.rstrip('/') + '/'
+        with self._lock:
+            children = sorted(
+                (seq, key[len(prefix):], value) for key, seq, value in self._range(prefix)
+                if '/' not in key[len(prefix):]
+            )
+            return [(doc_id, json.loads(self._read_value(value))) for _, doc_id, value in children]
+
+    def _scan(self, path: str) -> Iterable[tuple[str, Json]]:
+        prefix = path.rstrip('/') + '/'
+        with self._lock:
+            return [
+                (key, json.loads(self._read_value(value))) for key, _, value in self._range(path)
+                if not path or key == path or key.startswith(prefix)
+            ]
+
+    def _has_descendants(self, path: str) -> bool:
+        with self._lock:
+            return next(self._range(path.rstrip('/') + '/'), None) is not None
+
+    def _drop(self):
+        self._pager.reset()
+
+    def flush(self):
+        """Writes the modified pages."""
+        with self._lock:
+            if self._pager is not None:
+                self._pager.flush()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            if self._pager is not None:
+                self._pager.close()
+                self._pager = None
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from typing import Union
+
+from PyStoreDB.engines._btree.pages import Header, Leaf, Internal, Overflow, decode_page
+from PyStoreDB.engines._raw import utils
+
+__all__ = ['Pager']
+
+Page = Union[Leaf, Internal, Overflow]
+
+JOURNAL_ENTRY = struct.Struct('>I')
+
+
+class Pager:
+    """Page level access to a B+tree file.
+
+    Pages are read through a memory map of the file and decoded pages are kept in a LRU cache
+    of ``cache_pages`` pages, modified pages stay in memory until `flush` writes them.
+    A flush first saves the original content of the pages it overwrites in a rollback
+    journal, which is restored when the file is opened after an interrupted flush. With
+    ``fsync`` the journal is forced to the disk before the pages are written, and the pages
+    before the journal is removed.
+    """
+
+    def __init__(self, path: str, page_size: int = 4096, cache_pages: int = 1024, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self.journal_path = path + '-journal'
+        self.cache_pages = cache_pages
+        self._cache: OrderedDict[int, Page] = OrderedDict()
+        self._dirty: dict[int, Page] = {}
+        self._header_dirty = False
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(self._initial_content(page_size))
+        self._file = open(path, 'r+b')
+        self._rollback()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = Header.decode(self._mmap)
+        self.page_size = self.header.page_size
+
+    @staticmethod
+    def _initial_content(page_size: int) -> bytes:
+        return Header(page_size).encode().ljust(page_size, b'\0') + Leaf().encode().ljust(page_size, b'\0')
+
+    def _rollback(self):
+        if os.path.exists(self.journal_path + '.tmp'):
+            # the flush was interrupted before any page was written
+            os.remove(self.journal_path + '.tmp')
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'rb') as journal:
+            content = journal.read()
+        page_count, = JOURNAL_ENTRY.unpack_from(content)
+        page_size = Header.decode(content[JOURNAL_ENTRY.size * 2:]).page_size
+        offset = JOURNAL_ENTRY.size
+        while offset < len(content):
+            page_id, = JOURNAL_ENTRY.unpack_from(content, offset)
+            offset += JOURNAL_ENTRY.size
+            self._file.seek(page_id * page_size)
+            self._file.write(content[offset:offset + page_size])
+            offset += page_size
+        self._file.truncate(page_count * page_size)
+        self._file.flush()
+        os.remove(self.journal_path)
+
+    def get(self, page_id: int) -> Page:
+        page = self._dirty.get(page_id)
+        if page is not None:
+            return page
+        page = self._cache.get(page_id)
+        if page is not None:
+            self._cache.move_to_end(page_id)
+            return page
+        offset = page_id * self.page_size
+        page = decode_page(self._mmap[offset:offset + self.page_size])
+        self._cache_page(page_id, page)
+        return page
+
+    def _cache_page(self, page_id: int, page: Page):
+        self._cache[page_id] = page
+        self._cache.move_to_end(page_id)
+        while len(self._cache) > self.cache_pages:
+            self._cache.popitem(last=False)
+
+    def put(self, page_id: int, page: Page):
+        """Records a new or modified page, pages must be put back after every change."""
+        # modified pages are kept out of the cache until they are written
+        self._cache.pop(page_id, None)
+        self._dirty[page_id] = page
+
+    def mark_header(self):
+        self._header_dirty = True
+
+    def allocate(self) -> int:
+        if self.header.free_head:
+            page_id = self.header.free_head
+            self.header.free_head = self.get(page_id).next
+        else:
+            page_id = self.header.page_count
+            self.header.page_count += 1
+        self.mark_header()
+        return page_id
+
+    def free(self, page_id: int):
+        self.put(page_id, Overflow(b'', self.header.free_head))
+        self.header.free_head = page_id
+        self.mark_header()
+
+    def flush(self):
+        """Writes the modified pages, saving the pages they replace in the rollback journal first."""
+        if not self._dirty and not self._header_dirty:
+            return
+        pages = {page_id: page.encode() for page_id, page in self._dirty.items()}
+        pages[0] = self.header.encode()
+        for page_id, page in pages.items():
+            if len(page) > self.page_size:
+                # padding can't shrink it, the page would overwrite the next one
+                raise ValueError(f'Page {page_id} is {len(page)} bytes, larger than the {self.page_size} bytes pages')
+        file_pages = len(self._mmap) // self.page_size
+        with open(self.journal_path + '.tmp', 'wb') as journal:
+            journal.write(JOURNAL_ENTRY.pack(file_pages))
+            for page_id in sorted(pages):
+                if page_id < file_pages:
+                    offset = page_id * self.page_size
+                    journal.write(JOURNAL_ENTRY.pack(page_id) + self._mmap[offset:offset + self.page_size])
+            if self.fsync:
+                utils.fsync_file(journal)
+        os.replace(self.journal_path + '.tmp', self.journal_path)
+        if self.fsync:
+            utils.fsync_directory(os.path.dirname(self.path))
+        for page_id in sorted(pages):
+            self._file.seek(page_id * self.page_size)
+            self._file.write(pages[page_id].ljust(self.page_size, b'\0'))
+        if self.fsync:
+            utils.fsync_file(self._file)
+        else:
+            self._file.flush()
+        os.remove(self.journal_path)
+        for page_id, page in self._dirty.items():
+            self._cache_page(page_id, page)
+        self._dirty = {}
+        self._header_dirty = False
+        if self.header.page_count > file_pages:
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def reset(self):
+        """Drops every page, leaving an empty tree."""
+        self._cache.clear()
+        self._dirty = {}
+        self._header_dirty = False
+        self._mmap.close()
+        self._file.seek(0)
+        self._file.write(self._initial_content(self.page_size))
+        self._file.truncate()
+        self._file.flush()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = Header.decode(self._mmap)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
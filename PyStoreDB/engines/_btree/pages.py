@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import struct
+from dataclasses import dataclass, field
+from typing import Union
+
+__all__ = ['Header', 'Leaf', 'Internal', 'Overflow', 'Inline', 'OverflowRef', 'decode_page']
+
+MAGIC = b'PSDBTREE'
+HEADER = struct.Struct('>8sIIIIQ')  # magic, page size, root, page count, free list head, next seq
+
+LEAF = b'L'
+INTERNAL = b'I'
+OVERFLOW = b'O'
+NODE = struct.Struct('>cHI')  # type, entry count, next leaf or first child
+KEY_SIZE = struct.Struct('>H')
+LEAF_ENTRY = struct.Struct('>QBI')  # seq, overflow flag, value size or first overflow page
+OVERFLOW_REF = struct.Struct('>I')  # value size of an overflowed value
+CHILD = struct.Struct('>I')
+OVERFLOW_HEADER = struct.Struct('>cIH')  # type, next page, chunk size
+
+
+@dataclass
+class Header:
+    page_size: int
+    root: int = 1
+    page_count: int = 2
+    free_head: int = 0
+    next_seq: int = 0
+
+    def encode(self) -> bytes:
+        return HEADER.pack(MAGIC, self.page_size, self.root, self.page_count, self.free_head, self.next_seq)
+
+    @classmethod
+    def decode(cls, data: bytes) -> Header:
+        magic, *values = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('Not a PyStoreDB B+tree file')
+        return cls(*values)
+
+
+@dataclass(frozen=True)
+class OverflowRef:
+    """Value stored in a chain of overflow pages."""
+    page: int
+    size: int
+
+
+Inline = bytes
+Value = Union[Inline, OverflowRef]
+
+
+@dataclass
+class Leaf:
+    keys: list[str] = field(default_factory=list)
+    # (insertion sequence, value) of each key
+    values: list[tuple[int, Value]] = field(default_factory=list)
+    next: int = 0
+
+    def encode(self) -> bytes:
+        parts = [NODE.pack(LEAF, len(self.keys), self.next)]
+        parts.extend(self._encode_entry(key, seq, value) for key, (seq, value) in zip(self.keys, self.values))
+        return b''.join(parts)
+
+    @staticmethod
+    def _encode_entry(key: str, seq: int, value: Value) -> bytes:
+        key = key.encode()
+        if isinstance(value, OverflowRef):
+            return KEY_SIZE.pack(len(key)) + key + LEAF_ENTRY.pack(seq, 1, value.page) + OVERFLOW_REF.pack(value.size)
+        return KEY_SIZE.pack(len(key)) + key + LEAF_ENTRY.pack(seq, 0, len(value)) + value
+
+    def split(self) -> tuple[str, Leaf]:
+        """Moves the upper half of the entries, by encoded size, to a new leaf, returns the separator and the new leaf.
+
+        Entries differ in size, splitting them by count could leave a half larger than a page.
+        """
+        sizes = [len(self._encode_entry(key, seq, value)) for key, (seq, value) in zip(self.keys, self.values)]
+        half, total, middle = sum(sizes) / 2, 0, 0
+        while middle < len(sizes) - 1 and total + sizes[middle] / 2 < half:
+            total += sizes[middle]
+            middle += 1
+        middle = max(middle, 1)
+        right = Leaf(self.keys[middle:], self.values[middle:], self.next)
+        del self.keys[middle:], self.values[middle:]
+        return right.keys[0], right
+
+
+@dataclass
+class Internal:
+    keys: list[str] = field(default_factory=list)
+    children: list[int] = field(default_factory=list)
+
+    def encode(self) -> bytes:
+        parts = [NODE.pack(INTERNAL, len(self.keys), self.children[0])]
+        for key, child in zip(self.keys, self.children[1:]):
+            key = key.encode()
+            parts.append(KEY_SIZE.pack(len(key)) + key + CHILD.pack(child))
+        return b''.join(parts)
+
+    def split(self) -> tuple[str, Internal]:
+        middle = len(self.keys) // 2
+        separator = self.keys[middle]
+        right = Internal(self.keys[middle + 1:], self.children[middle + 1:])
+        del self.keys[middle:], self.children[middle + 1:]
+        return separator, right
+
+
+@dataclass
+class Overflow:
+    data: bytes
+    next: int = 0
+
+    def encode(self) -> bytes:
+        return OVERFLOW_HEADER.pack(OVERFLOW, self.next, len(self.data)) + self.data
+
+
+def _read_key(data, offset: int) -> tuple[str, int]:
+    size, = KEY_SIZE.unpack_from(data, offset)
+    offset += KEY_SIZE.size
+    return bytes(data[offset:offset + size]).decode(), offset + size
+
+
+def decode_page(data) -> Union[Leaf, Internal, Overflow]:
+    kind = bytes(data[:1])
+    if kind == OVERFLOW:
+        _, next_page, size = OVERFLOW_HEADER.unpack_from(data)
+        return Overflow(bytes(data[OVERFLOW_HEADER.size:OVERFLOW_HEADER.size + size]), next_page)
+    _, count, link = NODE.unpack_from(data)
+    offset = NODE.size
+    if kind == LEAF:
+        node = Leaf(next=link)
+        for _ in range(count):
+            key, offset = _read_key(data, offset)
+            seq, overflow, value = LEAF_ENTRY.unpack_from(data, offset)
+            offset += LEAF_ENTRY.size
+            if overflow:
+                size, = OVERFLOW_REF.unpack_from(data, offset)
+                offset += OVERFLOW_REF.size
+                value = OverflowRef(value, size)
+            else:
+                value, offset = bytes(data[offset:offset + value]), offset + value
+            node.keys.append(key)
+            node.values.append((seq, value))
+        return node
+    if kind == INTERNAL:
+        node = Internal(children=[link])
+        for _ in range(count):
+            key, offset = _read_key(data, offset)
+            child, = CHILD.unpack_from(data, offset)
+            offset += CHILD.size
+            node.keys.append(key)
+            node.children.append(child)
+        return node
+    raise ValueError(f'Unknown page type {kind!r}')
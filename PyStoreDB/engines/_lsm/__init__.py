@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import json
+import os
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from PyStoreDB.constants import Json
+from PyStoreDB.engines._bitcask import records
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.engines._lsm.segment import MISSING, Segment, write_segment
+from PyStoreDB.engines.kv import PyStoreDBKeyValueEngine
+
+__all__ = ['PyStoreDBLSMEngine']
+
+MANIFEST = 'MANIFEST'
+LOG = 'memtable.log'
+SEGMENT_EXTENSION = '.sst'
+
+
+class PyStoreDBLSMEngine(PyStoreDBKeyValueEngine):
+    """Log-structured merge tree engine for write-heavy stores.
+
+    Writes go to a memtable, backed by an append-only log, which is written as an immutable
+    sorted segment once it reaches ``memtable_size`` bytes. Segments are organised in levels
+    under ``{store_dir}/{store_name}.lsm``: flushed memtables land in level 0, which is merged
+    into level 1 once it holds ``level0_segments`` segments, and each level ``n >= 1`` is
+    compacted into the next one once it exceeds ``level_size * 10 ** (n - 1)`` bytes. Levels
+    above 0 hold non overlapping segments of at most ``segment_size`` bytes.
+
+    Point reads check the memtable then the segments from the newest, skipping the ones whose
+    bloom filter rules the key out. Collection reads are prefix scans merging the sorted
+    memtable and segments. The ``MANIFEST`` file lists the live segments of each level.
+    """
+
+    def __init__(self, store_name: str, memtable_size: int = 4 * 1024 * 1024, segment_size: int = 2 * 1024 * 1024,
+                 level0_segments: int = 4, level_size: int = 10 * 1024 * 1024, **kwargs):
+        super().__init__(store_name, **kwargs)
+        self.memtable_size = memtable_size
+        self.segment_size = segment_size
+        self.level0_segments = level0_segments
+        self.level_size = level_size
+        self._dir = None
+        self._memtable: dict[str, Optional[bytes]] = {}
+        self._memtable_keys: list[str] = []
+        self._memtable_bytes = 0
+        self._log: Optional[BinaryIO] = None
+        self._levels: list[list[Segment]] = [[]]
+        self._next_id = 1
+        self._next_seq = 0
+
+    def create_database_if_not_exists(self):
+        os.makedirs(self._dir, exist_ok=True)
+
+    def initialize(self):
+        if not self.in_memory:
+            self._dir = os.path.join(self.settings.store_dir, f'{self.store_name}.lsm')
+            super().initialize()
+            self._load()
+            self._start_flusher()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self._dir, name)
+
+    def _load(self):
+        if os.path.exists(self._file(MANIFEST)):
+            with open(self._file(MANIFEST)) as f:
+                manifest = json.load(f)
+            self._levels = [[Segment(self._file(name)) for name in level] for level in manifest['levels']]
+            self._next_id = manifest['next_id']
+            self._next_seq = manifest['next_seq']
+        live = {segment.name for level in self._levels for segment in level}
+        for file_name in os.listdir(self._dir):
+            # segments written by a flush or a compaction interrupted before the manifest was updated
+            if file_name.endswith((SEGMENT_EXTENSION, '.tmp')) and file_name not in live:
+                os.remove(self._file(file_name))
+        end = 0
+        if os.path.exists(self._file(LOG)):
+            with open(self._file(LOG), 'rb') as f:
+                for key, flags, value_offset, value_size, end in records.read_records(f):
+                    f.seek(value_offset)
+                    value = None if flags == records.TOMBSTONE else f.read(value_size)
+                    self._memtable_set(key, value)
+                    if value is not None:
+                        self._next_seq = max(self._next_seq, sequence(value) + 1)
+            if end < os.path.getsize(self._file(LOG)):
+                os.truncate(self._file(LOG), end)
+        self._log = open(self._file(LOG), 'ab')
+
+    def _write_manifest(self):
+        with open(self._file(MANIFEST + '.tmp'), 'w') as f:
+            json.dump({
+                'levels': [[segment.name for segment in level] for level in self._levels],
+                'next_id': self._next_id,
+                'next_seq': self._next_seq,
+            }, f)
+            if self.settings.fsync != 'never':
+                utils.fsync_file(f)
+        os.replace(self._file(MANIFEST + '.tmp'), self._file(MANIFEST))
+        if self.settings.fsync != 'never':
+            utils.fsync_directory(self._dir)
+
+    def _segments(self) -> Iterator[Segment]:
+        """Yields the segments from the newest to the oldest."""
+        for level in self._levels:
+            yield from level
+
+    def _lookup(self, path: str) -> Optional[bytes]:
+        """Returns the stored ``[insertion sequence, encoded data]`` value of the document at path or None."""
+        value = self._memtable.get(path, MISSING)
+        if value is MISSING:
+            for segment in self._segments():
+                value = segment.get(path)
+                if value is not MISSING:
+                    break
+        return None if value is MISSING else value
+
+    def _memtable_set(self, key: str, value: Optional[bytes]):
+        if key not in self._memtable:
+            bisect.insort(self._memtable_keys, key)
+        self._memtable[key] = value
+        self._memtable_bytes += len(key) + len(value or b'')
+
+    def _write(self, key: str, value: Optional[bytes]):
+        self._log.write(records.encode_record(key, value))
+        self._memtable_set(key, value)
+        if self._memtable_bytes >= self.memtable_size:
+            self._flush_memtable()
+
+    def _get(self, path: str) -> Optional[Json]:
+        with self._lock:
+            value = self._lookup(path)
+            return None if value is None else json.loads(value)[1]
+
+    def _put(self, path: str, data: Json):
+        # documents keep their insertion sequence, collections are listed in that order like the raw engine
+        value = self._lookup(path)
+        if value is None:
+            seq, self._next_seq = self._next_seq, self._next_seq + 1
+        else:
+            seq = sequence(value)
+        self._write(path, json.dumps([seq, data], separators=(',', ':')).encode())
+
+    def _remove(self, path: str):
+        self._write(path, None)
+
+    def _merged_scan(self, prefix: str) -> Iterator[tuple[str, bytes]]:
+        """Yields the sorted live (key, value) entries whose key starts with prefix."""
+        start = bisect.bisect_left(self._memtable_keys, prefix)
+        memtable = []
+        for key in self._memtable_keys[start:]:
+            if not key.startswith(prefix):
+                break
+            memtable.append((key, self._memtable[key]))
+        sources = [memtable, *(segment.scan(prefix) for segment in self._segments())]
+        last = None
+        for key, _, value in heapq.merge(*(ranked(source, rank) for rank, source in enumerate(sources))):
+            # the newest source of a key has the lowest rank and comes first
+            if key == last:
+                continue
+            last = key
+            if value is not None:
+                yield key, value
+
+    def _children(self, path: str) -> Iterable[tuple[str, Json]]:
+        prefix = path.rstrip('/') + '/'
+        with self._lock:
+            children = [
+                (key[len(prefix):], json.loads(value)) for key, value in self._merged_scan(prefix)
+                if '/' not in key[len(prefix):]
+            ]
+        return [(doc_id, data) for doc_id, (_, data) in sorted(children, key=lambda child: child[1][0])]
+
+    def _scan(self, path: str) -> Iterable[tuple[str, Json]]:
+        prefix = path.rstrip('/') + '/'
+        with self._lock:
+            return [
+                (key, json.loads(value)[1]) for key, value in self._merged_scan(path)
+                if not path or key == path or key.startswith(prefix)
+            ]
+
+    def _has_descendants(self, path: str) -> bool:
+        with self._lock:
+            return next(self._merged_scan(path.rstrip('/') + '/'), None) is not None
+
+    def _drop(self):
+        for segment in self._segments():
+            segment.close()
+            os.remove(segment.path)
+        self._levels = [[]]
+        self._memtable, self._memtable_keys, self._memtable_bytes = {}, [], 0
+        self._next_seq = 0
+        self._write_manifest()
+        self._reset_log()
+
+    def _reset_log(self):
+        self._log.close()
+        self._log = open(self._file(LOG), 'wb')
+
+    def flush(self):
+        """Writes the buffered log records."""
+        with self._lock:
+            if self._log is None:
+                return
+            if self.settings.fsync == 'always':
+                utils.fsync_file(self._log)
+            else:
+                self._log.flush()
+
+    def _new_segment_name(self) -> str:
+        name, self._next_id = f'{self._next_id:09d}{SEGMENT_EXTENSION}', self._next_id + 1
+        return name
+
+    def _flush_memtable(self):
+        """Writes the memtable as a new level 0 segment and compacts the levels if needed."""
+        if not self._memtable:
+            return
+        name = self._new_segment_name()
+        write_segment(
+            self._file(name), ((key, self._memtable[key]) for key in self._memtable_keys), len(self._memtable),
+            self.settings.fsync != 'never'
+        )
+        self._levels[0].insert(0, Segment(self._file(name)))
+        self._write_manifest()
+        self._memtable, self._memtable_keys, self._memtable_bytes = {}, [], 0
+        self._reset_log()
+        self._compact()
+
+    def _level_limit(self, level: int) -> int:
+        return self.level_size * 10 ** (level - 1)
+
+    def _compact(self):
+        while True:
+            if len(self._levels[0]) >= self.level0_segments:
+                level, inputs = 0, list(self._levels[0])
+            else:
+                level = next(
+                    (i for i in range(1, len(self._levels))
+                     if sum(segment.size for segment in self._levels[i]) > self._level_limit(i)),
+                    None
+                )
+                if level is None:
+                    return
+                inputs = [self._levels[level][0]]
+            self._compact_level(level, inputs)
+
+    def _compact_level(self, level: int, inputs: list[Segment]):
+        """Merges the inputs segments of level with the overlapping segments of the next level."""
+        if len(self._levels) == level + 1:
+            self._levels.append([])
+        target = self._levels[level + 1]
+        min_key = min(segment.min_key for segment in inputs)
+        max_key = max(segment.max_key for segment in inputs)
+        overlapping = [segment for segment in target if segment.overlaps(min_key, max_key)]
+        # tombstones can be dropped once no older level may hold the key
+        bottom = all(not self._levels[i] for i in range(level + 2, len(self._levels)))
+
+        sources = [*inputs, *overlapping]
+        merged = heapq.merge(*(ranked(segment.scan(), rank) for rank, segment in enumerate(sources)))
+        outputs, batch, batch_size, last = [], [], 0, None
+        for key, _, value in merged:
+            if key == last:
+                continue
+            last = key
+            if value is None and bottom:
+                continue
+            batch.append((key, value))
+            batch_size += len(key) + len(value or b'') + records.HEADER.size
+            if batch_size >= self.segment_size:
+                outputs.append(self._write_output(batch))
+                batch, batch_size = [], 0
+        if batch:
+            outputs.append(self._write_output(batch))
+
+        self._levels[level] = [segment for segment in self._levels[level] if segment not in inputs]
+        self._levels[level + 1] = sorted(
+            [segment for segment in target if segment not in overlapping] + outputs,
+            key=lambda segment: segment.min_key
+        )
+        self._write_manifest()
+        for segment in sources:
+            segment.close()
+            os.remove(segment.path)
+
+    def _write_output(self, batch: list[tuple[str, Optional[bytes]]]) -> Segment:
+        name = self._new_segment_name()
+        write_segment(self._file(name), batch, len(batch), self.settings.fsync != 'never')
+        return Segment(self._file(name))
+
+    def close(self):
+        super().close()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            for segment in self._segments():
+                segment.close()
+
+
+def sequence(value: bytes) -> int:
+    """Returns the insertion sequence of a stored value without decoding the data following it."""
+    return int(value[1:value.index(b',')])
+
+
+def ranked(entries: Iterable[tuple[str, Optional[bytes]]], rank: int) -> Iterator[tuple[str, int, Optional[bytes]]]:
+    for key, value in entries:
+        yield key, rank, value
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import math
+
+__all__ = ['BloomFilter']
+
+
+class BloomFilter:
+    """Bloom filter over string keys, using double hashing on a single blake2b digest."""
+
+    def __init__(self, size: int, hashes: int, bits: bytearray = None):
+        self.size = max(size, 8)
+        self.hashes = max(hashes, 1)
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01) -> BloomFilter:
+        capacity = max(capacity, 1)
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        return cls(size, round(size / capacity * math.log(2)))
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def to_dict(self) -> dict:
+        return {'size': self.size, 'hashes': self.hashes, 'bits': base64.b64encode(self.bits).decode()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> BloomFilter:
+        return cls(data['size'], data['hashes'], bytearray(base64.b64decode(data['bits'])))
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import struct
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from PyStoreDB.engines._bitcask import records
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.engines._lsm.bloom import BloomFilter
+
+__all__ = ['MISSING', 'Segment', 'write_segment']
+
+FOOTER_SIZE = struct.Struct('>Q')
+# one index entry every INDEX_INTERVAL records
+INDEX_INTERVAL = 16
+
+# returned by Segment.get when the segment doesn't hold the key (a tombstone is returned as None)
+MISSING = object()
+
+
+def write_segment(path: str, entries: Iterable[tuple[str, Optional[bytes]]], count: int, fsync: bool = True) -> int:
+    """Writes the sorted (key, value) entries to an immutable segment file and returns its size.
+
+    The records are followed by a json footer holding the sparse index, the bloom filter and
+    the key range of the segment, and by the size of that footer.
+    """
+    bloom = BloomFilter.for_capacity(count)
+    index = []
+    offset = 0
+    min_key = max_key = None
+    with open(path + '.tmp', 'wb') as f:
+        for i, (key, value) in enumerate(entries):
+            if i % INDEX_INTERVAL == 0:
+                index.append([key, offset])
+            bloom.add(key)
+            min_key = key if min_key is None else min_key
+            max_key = key
+            record = records.encode_record(key, value)
+            f.write(record)
+            offset += len(record)
+        footer = json.dumps({
+            'index': index,
+            'bloom': bloom.to_dict(),
+            'min_key': min_key,
+            'max_key': max_key,
+            'data_size': offset,
+        }, separators=(',', ':')).encode()
+        f.write(footer + FOOTER_SIZE.pack(len(footer)))
+        if fsync:
+            utils.fsync_file(f)
+    os.replace(path + '.tmp', path)
+    return offset + len(footer) + FOOTER_SIZE.size
+
+
+class Segment:
+    """Read access to a segment file, only its footer is kept in memory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = os.path.getsize(path)
+        self._file: Optional[BinaryIO] = open(path, 'rb')
+        self._file.seek(self.size - FOOTER_SIZE.size)
+        footer_size, = FOOTER_SIZE.unpack(self._file.read(FOOTER_SIZE.size))
+        self._file.seek(self.size - FOOTER_SIZE.size - footer_size)
+        footer = json.loads(self._file.read(footer_size))
+        self._index_keys = [key for key, _ in footer['index']]
+        self._index_offsets = [offset for _, offset in footer['index']]
+        self.bloom = BloomFilter.from_dict(footer['bloom'])
+        self.min_key = footer['min_key']
+        self.max_key = footer['max_key']
+        self.data_size = footer['data_size']
+
+    def overlaps(self, min_key: str, max_key: str) -> bool:
+        return self.min_key is not None and self.min_key <= max_key and min_key <= self.max_key
+
+    def _entries(self, offset: int) -> Iterator[tuple[str, Optional[bytes]]]:
+        while offset < self.data_size:
+            self._file.seek(offset)
+            header = self._file.read(records.HEADER.size)
+            _, flags, key_size, value_size = records.HEADER.unpack(header)
+            payload = self._file.read(key_size + value_size)
+            offset += records.HEADER.size + key_size + value_size
+            yield payload[:key_size].decode(), None if flags == records.TOMBSTONE else payload[key_size:]
+
+    def _floor_offset(self, key: str) -> int:
+        i = bisect.bisect_right(self._index_keys, key) - 1
+        return self._index_offsets[max(i, 0)] if self._index_offsets else self.data_size
+
+    def get(self, key: str):
+        """Returns the value of key, None for a tombstone or `MISSING`."""
+        if self.min_key is None or not self.min_key <= key <= self.max_key or key not in self.bloom:
+            return MISSING
+        for entry_key, value in self._entries(self._floor_offset(key)):
+            if entry_key == key:
+                return value
+            if entry_key > key:
+                break
+        return MISSING
+
+    def scan(self, prefix: str = '') -> Iterator[tuple[str, Optional[bytes]]]:
+        """Yields the sorted entries whose key starts with prefix, tombstones included."""
+        if self.min_key is None or self.max_key < prefix:
+            return
+        for key, value in self._entries(self._floor_offset(prefix)):
+            if key < prefix:
+                continue
+            if not key.startswith(prefix):
+                return
+            yield key, value
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
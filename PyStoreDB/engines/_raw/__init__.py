@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import os.path
-from typing import Any
+import threading
+from typing import Any, Iterator
 
-from PyStoreDB._utils import validate_data, validate_path, is_valid_document, is_valid_collection
+from PyStoreDB._utils import validate_data, validate_path, is_valid_document, is_valid_collection, path_segments
 from PyStoreDB.constants import Json
 from PyStoreDB.core import FieldPath
-from PyStoreDB.engines._raw import utils, query
+from PyStoreDB.core.filters import referenced_fields
+from PyStoreDB.engines._raw import utils, query, wal
+from PyStoreDB.engines._raw.counts import DocumentCounts
+from PyStoreDB.engines._raw.index import IndexManager
+from PyStoreDB.engines._raw.codecs import Codec, get_codec, codec_extensions
+from PyStoreDB.engines._raw.flusher import Flusher
 from PyStoreDB.engines.base import PyStoreDBEngine
-from PyStoreDB.errors import PyStoreDBPathError
+from PyStoreDB.engines.stats import QueryStats, stage
+from PyStoreDB.errors import PyStoreDBPathError, PyStoreDBError
 
 __all__ = ['PyStoreDBRawEngine']
 
@@ -19,32 +26,160 @@ class PyStoreDBRawEngine(PyStoreDBEngine):
         super().__init__(store_name, **kwargs)
         self._save_file = None
         self._raw_db = {}
+        self._wal = None
+        self._pending = []
+        self._flusher = None
+        self._lock = threading.RLock()
+        self._io_lock = threading.Lock()
         self.query_engine = query.PyStoreDBRawQuery()
+        self._indexes = IndexManager()
+        self._counts = DocumentCounts()
+
+    @property
+    def codec(self) -> Codec:
+        return get_codec(self.settings.codec)
 
     def create_database_if_not_exists(self):
-        utils.create_database(self._save_file)
+        if not os.path.exists(self._save_file):
+            for extension in codec_extensions() - {self.codec.extension}:
+                if os.path.exists(os.path.join(self.settings.store_dir, self.store_name + extension)):
+                    raise PyStoreDBError(
+                        f"Store {self.store_name} is saved as {self.store_name}{extension}, "
+                        f"migrate it to the '{self.codec.name}' codec with python -m PyStoreDB.migrate"
+                    )
+        utils.create_database(self._save_file, self.codec)
 
     def initialize(self):
         if not self.in_memory:
-            self._save_file = os.path.join(self.store.__class__.settings.store_dir, f'{self.store_name}.json')
+            self._save_file = os.path.join(self.settings.store_dir, f'{self.store_name}{self.codec.extension}')
             super().initialize()
-            self._raw_db = utils.load_db(self._save_file)
+            self._raw_db = utils.load_db(self._save_file, self.codec)
+            log = wal.WriteAheadLog(
+                os.path.join(self.settings.store_dir, f'{self.store_name}.wal'), fsync=self.settings.fsync == 'always'
+            )
+            self._raw_db = log.replay(self._raw_db)
+            self._load_indexes()
+            if self.settings.wal:
+                self._wal = log
+                if log.size >= self.settings.checkpoint_interval:
+                    self.checkpoint()
+            elif log.exists:
+                # the store was previously opened in WAL mode, fold the log into the snapshot
+                utils.save_database(self._save_file, self._raw_db, self.codec, self.settings.fsync != 'never')
+                log.remove()
+            self._start_flusher()
+
+    def _load_indexes(self):
+        self._indexes = IndexManager(
+            os.path.join(self.settings.store_dir, f'{self.store_name}.indexes'), self.settings.fsync != 'never'
+        )
+        self._indexes.load()
+
+    def _start_flusher(self):
+        if self.settings.durability != 'sync':
+            max_pending = self.settings.group_commit_size if self.settings.durability == 'group' else None
+            self._flusher = Flusher(self.flush, self.settings.flush_interval, max_pending)
+            self._flusher.start()
+
+    def _log(self, op: str, path: str = None, data: Json = None):
+        if self._wal is not None:
+            self._pending.append(wal.make_record(op, path, data))
 
     def delete(self, path: str):
-        utils.delete_document(path, self._raw_db)
+        with self._lock:
+            self._delete(path)
         self.save()
 
+    def _delete(self, path: str):
+        if utils.delete_document(path, self._raw_db):
+            self._counts.document_changed(path, -1)
+        self._log(wal.DELETE, path)
+        self._indexes.document_changed(path, None)
+
     def get_document(self, path: str) -> Json:
         data = utils.get_nested_doc_dict(path, self._raw_db)
         return utils.decode_document_data(data)
 
     def get_collection(self, path: str, **kwargs) -> dict[str, Json]:
+        return self._query(path, kwargs)
+
+    def stream_collection(self, path: str, **kwargs) -> Iterator[tuple[str, Json]]:
+        if 'order_by' in kwargs:
+            # ordered queries are sorted as a whole, or read in order from an index
+            yield from self.get_collection(path, **kwargs).items()
+            return
         try:
             data = utils.get_nested_dict(path, self._raw_db)
-            data = utils.decode_collection_docs(data)
-            return self.query_engine.apply_query_filters(data, **kwargs)
         except PyStoreDBPathError:
-            return {}
+            return
+        with self._lock:
+            ids = self._indexes.lookup(path, data, kwargs.get('filters', []))
+            # the ids are listed first, the documents written while streaming don't break the iteration
+            ids = list(data) if ids is None else ids
+        fields = self.query_engine.decoded_fields(**kwargs)
+        rows = (
+            (doc_id, utils.decode_document_data(data[doc_id], fields))
+            for doc_id in ids if utils.DATA_KEY in data.get(doc_id, {})
+        )
+        yield from self.query_engine.stream_query_filters(rows, **kwargs)
+
+    def count_collection(self, path: str, **kwargs) -> int:
+        if 'order_by' in kwargs:
+            return len(self.get_collection(path, **kwargs))
+        try:
+            data = utils.get_nested_dict(path, self._raw_db)
+        except PyStoreDBPathError:
+            return 0
+        with self._lock:
+            if not kwargs.get('filters'):
+                count = self._counts.count(path, data)
+                return min(count, kwargs['limit']) if 'limit' in kwargs else count
+            ids = self._indexes.lookup(path, data, kwargs['filters'])
+            ids = list(data) if ids is None else ids
+            # only the fields read by the filters are decoded
+            fields = sorted(referenced_fields(kwargs['filters']))
+            rows = (
+                (doc_id, utils.decode_document_data(data[doc_id], fields))
+                for doc_id in ids if utils.DATA_KEY in data.get(doc_id, {})
+            )
+            return self.query_engine.count_query_filters(rows, **kwargs)
+
+    def _query(self, path: str, kwargs: dict, plan: dict = None, stats: QueryStats = None, execute=True):
+        try:
+            data = utils.get_nested_dict(path, self._raw_db)
+        except PyStoreDBPathError:
+            data = {}
+        with self._lock:
+            with stage(stats, 'access'):
+                ordered = self._indexes.ordered_lookup(path, data, kwargs.get('filters'), kwargs.get('order_by'), plan)
+                if ordered is not None:
+                    ordered, remaining = self.query_engine.seek_cursors(ordered, kwargs)
+                    sought, kwargs = len(remaining) != len(kwargs), remaining
+                ids = None if ordered is not None else self._indexes.lookup(path, data, kwargs.get('filters', []), plan)
+            if plan is not None:
+                plan.update(self.query_engine.describe(presorted=ordered is not None, **kwargs))
+                if ordered is not None and sought:
+                    plan['cursor'] = plan['cursor'] or 'index-seek'
+            if not execute:
+                return None
+            fields = self.query_engine.decoded_fields(**kwargs)
+            if ordered is not None:
+                def load(doc_id: str) -> Json:
+                    if stats is not None:
+                        stats.examined += 1
+                        stats.decoded += 1
+                    return utils.decode_document_data(data[doc_id], fields)
+
+                return self.query_engine.apply_sorted_query_filters(ordered, load, stats=stats, **kwargs)
+            if ids is not None:
+                # only the candidates of the indexes are decoded, the filters are applied to them below
+                data = {doc_id: data[doc_id] for doc_id in ids}
+        with stage(stats, 'decode'):
+            docs = utils.decode_collection_docs(data, fields)
+        if stats is not None:
+            stats.examined += len(data)
+            stats.decoded += len(docs)
+        return self.query_engine.apply_query_filters(docs, stats=stats, **kwargs)
 
     def get_raw(self, path: str):
         if path == '':
@@ -57,17 +192,61 @@ class PyStoreDBRawEngine(PyStoreDBEngine):
 
     def set(self, path: str, data: Json):
         validate_data(data)
+        with self._lock:
+            self._set(path, data)
+        self.save()
+
+    def _set(self, path: str, data: Json):
+        self._record_new_nodes(path)
         item = utils.create_nested_dict(path, self._raw_db)
+        if utils.DATA_KEY not in item:
+            self._counts.document_changed(path, 1)
         item.clear()
         item.update(utils.encode_data(data))
-        self.save()
+        self._log(wal.SET, path, item[utils.DATA_KEY])
+        # the sub collections of the document were dropped with its node content
+        self._indexes.invalidate(path)
+        self._counts.invalidate(path)
+        self._indexes.document_changed(path, utils.decode_document_data(item))
+
+    def _record_new_nodes(self, path: str):
+        """Records the parent documents nodes created by writing the document at path."""
+        node = self._raw_db
+        segments = path_segments(path)
+        for i, segment in enumerate(segments[:-2]):
+            if segment not in node:
+                if i % 2 == 1:
+                    self._indexes.node_created('/' + '/'.join(segments[:i + 1]))
+                node = {}
+            else:
+                node = node[segment]
 
     def update(self, path: str, data: Json):
         validate_data(data)
+        with self._lock:
+            self._update(path, data)
+        self.save()
+
+    def _update(self, path: str, data: Json):
         item = utils.get_nested_doc_dict(path, self._raw_db)
         utils.update_data(item, data)
+        self._log(wal.UPDATE, path, {key: item[utils.DATA_KEY][key] for key in data})
+        self._indexes.document_changed(path, utils.decode_document_data(item))
+
+    def commit(self, writes: list[tuple[str, str, Json | None]]):
+        with self._lock:
+            self._commit(writes)
         self.save()
 
+    def _commit(self, writes: list[tuple[str, str, Json | None]]):
+        for op, path, data in self._plan_writes(writes):
+            if op == self.SET:
+                self._set(path, data)
+            elif op == self.UPDATE:
+                self._update(path, data)
+            else:
+                self._delete(path)
+
     def path_exists(self, path: str) -> bool:
         try:
             utils.get_nested_dict(path, self._raw_db)
@@ -89,10 +268,70 @@ class PyStoreDBRawEngine(PyStoreDBEngine):
             return path.split('/')[-1]
         return self.get_document(path).get(field if isinstance(field, str) else field.path, default)
 
+    def create_index(self, path: str, fields: list[tuple[str, bool]]):
+        with self._lock:
+            self._indexes.create(path, tuple(fields))
+
+    def drop_index(self, path: str, fields: list[tuple[str, bool]]):
+        with self._lock:
+            self._indexes.drop(path, tuple(fields))
+
+    def get_indexes(self, path: str) -> list[list[tuple[str, bool]]]:
+        return [list(definition) for definition in self._indexes.definitions(path)]
+
     def clear(self):
-        self._raw_db = {}
+        with self._lock:
+            self._raw_db = {}
+            self._log(wal.CLEAR)
+            self._indexes.invalidate()
+            self._counts.invalidate()
         self.save()
 
     def save(self):
-        if not self.in_memory:
-            utils.save_database(self._save_file, self._raw_db)
+        if self.in_memory:
+            return
+        if self._flusher is None:
+            self.flush()
+        else:
+            self._flusher.mark_dirty()
+
+    def flush(self):
+        """Persists the changes made since the last flush.
+
+        In WAL mode the pending records are appended to the log, unless the log is due for a
+        checkpoint in which case a full snapshot is written instead.
+        """
+        if self.in_memory:
+            return
+        with self._io_lock:
+            with self._lock:
+                if self._wal is not None and self._wal.size + len(self._pending) < self.settings.checkpoint_interval:
+                    snapshot = None
+                    records, count = self._wal.encode(self._pending), len(self._pending)
+                else:
+                    snapshot = utils.dump_database(self._raw_db, self.codec)
+                self._pending = []
+            if snapshot is None:
+                self._wal.write(records, count)
+            else:
+                self._write_snapshot(snapshot)
+
+    def checkpoint(self):
+        """Writes a full snapshot of the store and truncates the write-ahead log."""
+        if self.in_memory:
+            return
+        with self._io_lock:
+            with self._lock:
+                snapshot = utils.dump_database(self._raw_db, self.codec)
+                self._pending = []
+            self._write_snapshot(snapshot)
+
+    def _write_snapshot(self, snapshot: bytes):
+        utils.write_database(self._save_file, snapshot, self.settings.fsync != 'never')
+        if self._wal is not None:
+            self._wal.reset()
+
+    def close(self):
+        if self._flusher is not None:
+            flusher, self._flusher = self._flusher, None
+            flusher.stop()
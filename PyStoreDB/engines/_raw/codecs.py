@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import abc
+import functools
+import json
+import lzma
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from PyStoreDB.constants import Json
+from PyStoreDB.engines._raw import utils
+
+__all__ = ['Codec', 'JsonCodec', 'BinaryCodec', 'CompressedCodec', 'get_codec', 'codec_extensions', 'CODECS']
+
+U32 = struct.Struct('>I')
+I64 = struct.Struct('>q')
+F64 = struct.Struct('>d')
+TZ_OFFSET = struct.Struct('>i')
+
+EPOCH = datetime(1, 1, 1)
+
+
+class Codec(abc.ABC):
+    """Converts the raw database, ``__meta__`` envelopes included, to the content of a store file and back."""
+    name: str
+    extension: str
+
+    @abc.abstractmethod
+    def encode(self, data: Json) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def decode(self, content: bytes) -> Json:
+        pass
+
+
+class JsonCodec(Codec):
+    extension = '.json'
+
+    def __init__(self, name: str, indent: int | None = None):
+        self.name = name
+        self.indent = indent
+
+    def encode(self, data: Json) -> bytes:
+        if self.indent is None:
+            return json.dumps(data, separators=(',', ':')).encode()
+        return json.dumps(data, indent=self.indent).encode()
+
+    def decode(self, content: bytes) -> Json:
+        return json.loads(content)
+
+
+class BinaryCodec(Codec):
+    """Length-prefixed binary format.
+
+    Every value starts with a one byte tag, strings, lists and maps are prefixed by their size.
+    Dict and datetime fields get their own tags instead of the ``__meta__`` envelopes, datetimes
+    are stored as microseconds since 0001-01-01 (wall time) followed by the UTC offset in
+    seconds for aware ones.
+    """
+    name = 'binary'
+    extension = '.psdb'
+    MAGIC = b'PSDB\x01'
+
+    def encode(self, data: Json) -> bytes:
+        out = [self.MAGIC]
+        self._encode(data, out)
+        return b''.join(out)
+
+    def _encode(self, value: Any, out: list[bytes]):
+        if value is None:
+            out.append(b'N')
+        elif value is True:
+            out.append(b'T')
+        elif value is False:
+            out.append(b'F')
+        elif isinstance(value, int):
+            if -2 ** 63 <= value < 2 ** 63:
+                out.append(b'i' + I64.pack(value))
+            else:
+                out.append(b'I')
+                self._encode_str(str(value), out)
+        elif isinstance(value, float):
+            out.append(b'f' + F64.pack(value))
+        elif isinstance(value, str):
+            out.append(b's')
+            self._encode_str(value, out)
+        elif isinstance(value, list):
+            out.append(b'l' + U32.pack(len(value)))
+            for item in value:
+                self._encode(item, out)
+        elif isinstance(value, dict):
+            meta = value.get(utils.META_KEY) if len(value) == 1 else None
+            if isinstance(meta, dict) and meta.get(utils.META_TYPE_KEY) == utils.DICT_META_KEY:
+                out.append(b'D')
+                self._encode(meta[utils.META_TYPE_VALUE_KEY], out)
+            elif isinstance(meta, dict) and meta.get(utils.META_TYPE_KEY) == utils.DATETIME_META_KEY:
+                self._encode_datetime(datetime.fromisoformat(meta[utils.META_TYPE_VALUE_KEY]), out)
+            else:
+                out.append(b'm' + U32.pack(len(value)))
+                for key, item in value.items():
+                    self._encode_str(key, out)
+                    self._encode(item, out)
+        else:
+            raise TypeError(f'{type(value).__name__} values can\'t be encoded')
+
+    @staticmethod
+    def _encode_str(value: str, out: list[bytes]):
+        value = value.encode()
+        out.append(U32.pack(len(value)) + value)
+
+    @staticmethod
+    def _encode_datetime(value: datetime, out: list[bytes]):
+        micros = (value.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+        offset = value.utcoffset()
+        if offset is None:
+            out.append(b't' + I64.pack(micros))
+        else:
+            out.append(b'z' + I64.pack(micros) + TZ_OFFSET.pack(offset // timedelta(seconds=1)))
+
+    def decode(self, content: bytes) -> Json:
+        if not content.startswith(self.MAGIC):
+            raise ValueError('Not a PyStoreDB binary file')
+        value, _ = self._decode(memoryview(content), len(self.MAGIC))
+        return value
+
+    def _decode(self, data: memoryview, offset: int) -> tuple[Any, int]:
+        tag = data[offset:offset + 1].tobytes()
+        offset += 1
+        if tag == b'N':
+            return None, offset
+        if tag == b'T':
+            return True, offset
+        if tag == b'F':
+            return False, offset
+        if tag == b'i':
+            return I64.unpack_from(data, offset)[0], offset + I64.size
+        if tag == b'I':
+            value, offset = self._decode_str(data, offset)
+            return int(value), offset
+        if tag == b'f':
+            return F64.unpack_from(data, offset)[0], offset + F64.size
+        if tag == b's':
+            return self._decode_str(data, offset)
+        if tag == b'l':
+            count, = U32.unpack_from(data, offset)
+            offset += U32.size
+            items = []
+            for _ in range(count):
+                item, offset = self._decode(data, offset)
+                items.append(item)
+            return items, offset
+        if tag == b'm':
+            count, = U32.unpack_from(data, offset)
+            offset += U32.size
+            items = {}
+            for _ in range(count):
+                key, offset = self._decode_str(data, offset)
+                items[key], offset = self._decode(data, offset)
+            return items, offset
+        if tag == b'D':
+            value, offset = self._decode(data, offset)
+            return utils.encode_value_metadata(value), offset
+        if tag in (b't', b'z'):
+            micros, = I64.unpack_from(data, offset)
+            offset += I64.size
+            value = EPOCH + timedelta(microseconds=micros)
+            if tag == b'z':
+                seconds, = TZ_OFFSET.unpack_from(data, offset)
+                offset += TZ_OFFSET.size
+                value = value.replace(tzinfo=timezone(timedelta(seconds=seconds)))
+            return utils.encode_value_metadata(value), offset
+        raise ValueError(f'Unknown tag {tag!r} at offset {offset - 1}')
+
+    @staticmethod
+    def _decode_str(data: memoryview, offset: int) -> tuple[str, int]:
+        size, = U32.unpack_from(data, offset)
+        offset += U32.size
+        return data[offset:offset + size].tobytes().decode(), offset + size
+
+
+class CompressedCodec(Codec):
+    """Compresses the content produced by another codec."""
+
+    def __init__(self, codec: Codec, compression: str):
+        self.codec = codec
+        self.module, extension = COMPRESSIONS[compression]
+        self.name = f'{codec.name}+{compression}'
+        self.extension = codec.extension + extension
+
+    def encode(self, data: Json) -> bytes:
+        return self.module.compress(self.codec.encode(data))
+
+    def decode(self, content: bytes) -> Json:
+        return self.codec.decode(self.module.decompress(content))
+
+
+CODECS = {
+    'json': JsonCodec('json', indent=4),
+    'compact-json': JsonCodec('compact-json'),
+    'binary': BinaryCodec(),
+}
+
+COMPRESSIONS = {
+    'zlib': (zlib, '.z'),
+    'lzma': (lzma, '.xz'),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_codec(name: str) -> Codec:
+    """Returns the codec named ``{format}`` or ``{format}+{compression}``, e.g. ``binary+zlib``.
+
+    Raises:
+        ValueError: If the format or the compression is unknown.
+    """
+    codec_name, *compressions = name.split('+')
+    if codec_name not in CODECS:
+        raise ValueError(f"Unknown codec {codec_name}, available codecs: {', '.join(CODECS)}")
+    codec = CODECS[codec_name]
+    for compression in compressions:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression}, available compressions: {', '.join(COMPRESSIONS)}")
+        codec = CompressedCodec(codec, compression)
+    return codec
+
+
+def codec_extensions() -> set[str]:
+    """Returns the file extensions of the codecs with at most one compression."""
+    return {
+        codec.extension + extension
+        for codec in CODECS.values()
+        for extension in ('', *(extension for _, extension in COMPRESSIONS.values()))
+    }
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from PyStoreDB.constants import Json
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.engines._raw.index import normalize_collection
+
+__all__ = ['DocumentCounts']
+
+
+class DocumentCounts:
+    """Number of documents of the collections of a raw engine store.
+
+    The documents of a collection are counted the first time its count is asked, the count is
+    then kept up to date by the writes so that counting the collection again is O(1).
+    """
+
+    def __init__(self):
+        self._counts: dict[str, int] = {}
+
+    def count(self, collection: str, nodes: dict[str, Json]) -> int:
+        """Returns the number of documents of the collection, nodes are its document nodes."""
+        collection = normalize_collection(collection)
+        count = self._counts.get(collection)
+        if count is None:
+            # nodes without data are deleted documents or only hold sub collections
+            count = self._counts[collection] = sum(1 for node in nodes.values() if utils.DATA_KEY in node)
+        return count
+
+    def document_changed(self, path: str, delta: int):
+        """Adds delta to the count of the collection of the document at path, if it is counted."""
+        collection = normalize_collection(path.rpartition('/')[0])
+        if collection in self._counts:
+            self._counts[collection] += delta
+
+    def invalidate(self, prefix: str = ''):
+        """Drops the counts of the collections below prefix, they are counted again on next use."""
+        if not prefix:
+            self._counts.clear()
+            return
+        prefix = normalize_collection(prefix) + '/'
+        for collection in [collection for collection in self._counts if collection.startswith(prefix)]:
+            del self._counts[collection]
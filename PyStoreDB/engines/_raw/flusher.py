@@ -0,0 +1,93 @@
+import atexit
+import threading
+import time
+from typing import Callable, Optional
+
+__all__ = ['Flusher']
+
+
+class Flusher(threading.Thread):
+    """Background thread owning the I/O of an engine.
+
+    Writers only mark the store dirty, the flusher coalesces every write made within
+    `interval` milliseconds into a single flush. When `max_pending` is set (group commit),
+    a writer reaching that number of unflushed writes waits for them to be flushed, which
+    bounds the durability window both in time and in number of writes.
+    """
+
+    def __init__(self, flush: Callable[[], None], interval: float, max_pending: Optional[int] = None):
+        super().__init__(name='PyStoreDBFlusher', daemon=True)
+        self._flush = flush
+        self._interval = interval / 1000
+        self._max_pending = max_pending
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._dirty_since = None
+        self._generation = 0
+        self._flushed_generation = 0
+        self._stopped = False
+        self._error = None
+
+    def mark_dirty(self):
+        with self._condition:
+            self._raise_error()
+            self._pending += 1
+            self._generation += 1
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            self._condition.notify_all()
+            if self._max_pending is not None and self._pending >= self._max_pending:
+                generation = self._generation
+                while self._flushed_generation < generation and self._error is None and self.is_alive():
+                    self._condition.wait()
+                self._raise_error()
+
+    def start(self):
+        super().start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Flush the pending writes and stop the thread."""
+        atexit.unregister(self.stop)
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self.is_alive():
+            self.join()
+        with self._condition:
+            self._raise_error()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._dirty_since is None and not self._stopped:
+                    self._condition.wait()
+                if self._dirty_since is None:
+                    return
+                deadline = self._dirty_since + self._interval
+                while not self._stopped and not self._is_full():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                generation = self._generation
+                self._pending = 0
+                self._dirty_since = None
+            try:
+                self._flush()
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            with self._condition:
+                self._error = self._error or error
+                self._flushed_generation = generation
+                self._condition.notify_all()
+
+    def _is_full(self):
+        return self._max_pending is not None and self._pending >= self._max_pending
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+import bisect
+import json
+import operator
+import os
+from typing import Any, Callable, Iterator, Optional
+
+from PyStoreDB.constants import Json, LOOKUP_SEP
+from PyStoreDB.core import FieldPath
+from PyStoreDB.core.filters import Q, F
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.core.ordering import Descending, KIND_RANKS, value_kind
+from PyStoreDB.engines._raw.query import MIRRORED_OPS
+
+__all__ = ['SecondaryIndex', 'CompositeIndex', 'IndexRange', 'IndexManager']
+
+RANGE_LOOKUPS = ('lt', 'lte', 'gt', 'gte', 'range')
+
+
+def normalize_collection(path: str) -> str:
+    return '/' + path.strip('/')
+
+
+class SecondaryIndex:
+    """Index of a field of the documents of a collection.
+
+    Values are kept in a hash map for equality lookups and in one sorted run per kind of value
+    (numbers, strings, naive and aware datetimes) for comparisons. Documents missing the field
+    or holding a value that can't be indexed (dict, list) are tracked as well: a query over a
+    collection where some documents lack the field must raise like the full scan does.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.values: dict[str, Any] = {}
+        self.missing: set[str] = set()
+        self.unindexable: set[str] = set()
+        self._by_value: dict[Any, set[str]] = {}
+        self._runs: dict[str, tuple[list, list[str]]] = {}
+
+    def add(self, doc_id: str, data: Json):
+        if self.field not in data:
+            self.missing.add(doc_id)
+            return
+        value = data[self.field]
+        kind = value_kind(value)
+        if kind is None:
+            self.unindexable.add(doc_id)
+            return
+        self.values[doc_id] = value
+        self._by_value.setdefault(value, set()).add(doc_id)
+        keys, ids = self._runs.setdefault(kind, ([], []))
+        i = bisect.bisect_right(keys, value)
+        keys.insert(i, value)
+        ids.insert(i, doc_id)
+
+    def remove(self, doc_id: str):
+        self.missing.discard(doc_id)
+        self.unindexable.discard(doc_id)
+        if doc_id not in self.values:
+            return
+        value = self.values.pop(doc_id)
+        ids = self._by_value[value]
+        ids.discard(doc_id)
+        if not ids:
+            del self._by_value[value]
+        kind = value_kind(value)
+        keys, run_ids = self._runs[kind]
+        i = bisect.bisect_left(keys, value)
+        while run_ids[i] != doc_id:
+            i += 1
+        del keys[i], run_ids[i]
+        if not keys:
+            del self._runs[kind]
+
+    def lookup(self, lookup_name: str, value) -> Optional[set[str]]:
+        """Returns the ids of the documents matching the lookup or None if the index can't answer it.
+
+        The index only answers when the full scan would give the same result without raising.
+        """
+        if self.missing:
+            return None
+        if lookup_name == 'exact':
+            return self._equal([value])
+        if lookup_name == 'in':
+            return self._equal(value) if isinstance(value, (list, tuple)) else None
+        if lookup_name == 'isnull':
+            if not isinstance(value, bool):
+                return None
+            nulls = self._by_value.get(None, set())
+            if value:
+                return set(nulls)
+            return (self.values.keys() - nulls) | self.unindexable
+        if lookup_name in RANGE_LOOKUPS:
+            return self._compare(lookup_name, value)
+        return None
+
+    def _equal(self, values) -> Optional[set[str]]:
+        ids = set()
+        for value in values:
+            if isinstance(value, F) or value_kind(value) is None:
+                return None
+            ids |= self._by_value.get(value, set())
+        return ids
+
+    def _compare(self, lookup_name: str, value) -> Optional[set[str]]:
+        bounds = value if lookup_name == 'range' else [value]
+        if lookup_name == 'range' and (not isinstance(value, (list, tuple)) or len(value) != 2):
+            return None
+        kinds = {value_kind(bound) if not isinstance(bound, F) else None for bound in bounds}
+        # ordering values of different kinds raises in the full scan
+        if self.unindexable or len(kinds) != 1 or set(self._runs) - kinds:
+            return None
+        kind = kinds.pop()
+        if kind is None or kind == 'null':
+            return None
+        if kind not in self._runs:
+            return set()
+        keys, ids = self._runs[kind]
+        if lookup_name == 'lt':
+            start, end = 0, bisect.bisect_left(keys, value)
+        elif lookup_name == 'lte':
+            start, end = 0, bisect.bisect_right(keys, value)
+        elif lookup_name == 'gt':
+            start, end = bisect.bisect_right(keys, value), len(keys)
+        elif lookup_name == 'gte':
+            start, end = bisect.bisect_left(keys, value), len(keys)
+        else:
+            start, end = bisect.bisect_left(keys, value[0]), bisect.bisect_right(keys, value[1])
+        return set(ids[start:end])
+
+
+class _Max:
+    """Sorts after every index key component, used to bound a key prefix."""
+
+    def __eq__(self, other):
+        return False
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+MAX = _Max()
+
+
+def key_component(value, descending: bool):
+    # values of different kinds can't be compared, the rank of their kind is compared first
+    component = (KIND_RANKS[value_kind(value)], value)
+    return Descending(component) if descending else component
+
+
+class IndexRange:
+    """The ids of a contiguous range of a `CompositeIndex`, iterated in the index order or reversed."""
+
+    def __init__(self, ids: list[str], start: int, end: int, index: CompositeIndex = None, prefix: tuple = ()):
+        self._ids = ids
+        self.start = start
+        self.end = end
+        self._index = index
+        self._prefix = prefix
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.start, self.end):
+            yield self._ids[i]
+
+    def __reversed__(self) -> Iterator[str]:
+        for i in range(self.end - 1, self.start - 1, -1):
+            yield self._ids[i]
+
+    def seek(self, op: Callable[[Any, Any], bool], value) -> Optional[IndexRange]:
+        """Narrows the range to the documents whose first field after the prefix compares with op to value.
+
+        op is one of ``operator.ge``, ``gt``, ``le`` or ``lt``. None is returned when the values of the
+        field are not all of the kind of value.
+        """
+        index, depth = self._index, len(self._prefix)
+        if index is None or depth == len(index.definition) or set(index.kinds[depth]) != {value_kind(value)}:
+            return None
+        descending = index.definition[depth][1]
+        component = key_component(value, descending)
+        low = bisect.bisect_left(index.keys, (*self._prefix, component), self.start, self.end)
+        high = bisect.bisect_right(index.keys, (*self._prefix, component, MAX), self.start, self.end)
+        # [start, low) sorts before value, [low, high) equals it and [high, end) sorts after it
+        if descending:
+            op = MIRRORED_OPS[op]
+        if op == operator.ge:
+            return IndexRange(self._ids, low, self.end, index, self._prefix)
+        elif op == operator.gt:
+            return IndexRange(self._ids, high, self.end, index, self._prefix)
+        elif op == operator.le:
+            return IndexRange(self._ids, self.start, high, index, self._prefix)
+        return IndexRange(self._ids, self.start, low, index, self._prefix)
+
+
+class CompositeIndex:
+    """Ordered index over several fields, each ascending or descending.
+
+    Documents are sorted by the values of the fields then by their position in the collection,
+    which is the order the stable sorts of the query engine give to equal values. A range of
+    documents sharing the values of the leading fields is thus already sorted by the others.
+    """
+
+    def __init__(self, definition: tuple[tuple[str, bool], ...]):
+        self.definition = definition
+        self.keys: list[tuple] = []
+        self.ids: list[str] = []
+        self.entries: dict[str, tuple] = {}
+        # documents missing a field or holding a value that can't be ordered
+        self.invalid: set[str] = set()
+        self.kinds: list[dict[str, int]] = [{} for _ in definition]
+
+    def add(self, doc_id: str, position: int, data: Json):
+        values = []
+        for field, _ in self.definition:
+            if field not in data or value_kind(data[field]) is None:
+                self.invalid.add(doc_id)
+                return
+            values.append(data[field])
+        for kinds, value in zip(self.kinds, values):
+            kind = value_kind(value)
+            kinds[kind] = kinds.get(kind, 0) + 1
+        key = (*(key_component(value, descending) for value, (_, descending) in zip(values, self.definition)), position)
+        self.entries[doc_id] = key
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.ids.insert(i, doc_id)
+
+    def remove(self, doc_id: str):
+        self.invalid.discard(doc_id)
+        if doc_id not in self.entries:
+            return
+        key = self.entries.pop(doc_id)
+        i = bisect.bisect_left(self.keys, key)
+        del self.keys[i], self.ids[i]
+        for kinds, (_, descending), component in zip(self.kinds, self.definition, key):
+            kind = value_kind((component.value if descending else component)[1])
+            kinds[kind] -= 1
+            if not kinds[kind]:
+                del kinds[kind]
+
+    def range(self, equals: list) -> Optional[IndexRange]:
+        """Returns the documents whose leading fields equal the values of equals or None.
+
+        None is returned when the query engine would have raised ordering the documents by
+        the other fields: a document misses a field or a field holds values of several kinds.
+        """
+        if self.invalid:
+            return None
+        for kinds in self.kinds[len(equals):]:
+            if len(kinds) > 1 or 'null' in kinds:
+                return None
+        prefix = tuple(key_component(value, descending) for value, (_, descending) in zip(equals, self.definition))
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_right(self.keys, (*prefix, MAX))
+        return IndexRange(self.ids, start, end, self, prefix)
+
+
+class CollectionIndexes:
+    """The indexes of a collection, built from the collection on first use.
+
+    A single field index answers the lookups on its field, every index can also serve the
+    ordered queries whose equality filters and order_by clauses match its fields.
+    """
+
+    def __init__(self):
+        self.definitions: list[tuple[tuple[str, bool], ...]] = []
+        self.lookups: dict[str, SecondaryIndex] = {}
+        self.ordered: dict[tuple[tuple[str, bool], ...], CompositeIndex] = {}
+        # position of every document node in the collection, query results keep the collection order
+        self.positions: Optional[dict[str, int]] = None
+
+    @property
+    def fields(self) -> list[str]:
+        return [definition[0][0] for definition in self.definitions if len(definition) == 1]
+
+    def reset(self):
+        self.lookups = {}
+        self.ordered = {}
+        self.positions = None
+
+    def drop(self, definition: tuple[tuple[str, bool], ...]):
+        self.definitions.remove(definition)
+        self.ordered.pop(definition, None)
+        if len(definition) == 1 and definition[0][0] not in self.fields:
+            self.lookups.pop(definition[0][0], None)
+
+    def _build_positions(self, nodes: dict):
+        if self.positions is None:
+            self.positions = {doc_id: position for position, doc_id in enumerate(nodes)}
+
+    def lookup_index(self, field: str, nodes: dict) -> SecondaryIndex:
+        self._build_positions(nodes)
+        if field not in self.lookups:
+            index = SecondaryIndex(field)
+            for doc_id, data in self._documents(nodes):
+                index.add(doc_id, data)
+            self.lookups[field] = index
+        return self.lookups[field]
+
+    def ordered_index(self, definition: tuple[tuple[str, bool], ...], nodes: dict) -> CompositeIndex:
+        self._build_positions(nodes)
+        if definition not in self.ordered:
+            index = CompositeIndex(definition)
+            for doc_id, data in self._documents(nodes):
+                index.add(doc_id, self.positions[doc_id], data)
+            self.ordered[definition] = index
+        return self.ordered[definition]
+
+    @staticmethod
+    def _documents(nodes: dict) -> Iterator[tuple[str, Json]]:
+        for doc_id, node in nodes.items():
+            if utils.DATA_KEY in node:
+                yield doc_id, utils.decode_document_data(node)
+
+    def add_node(self, doc_id: str):
+        if self.positions is not None and doc_id not in self.positions:
+            self.positions[doc_id] = len(self.positions)
+
+    def document_changed(self, doc_id: str, data: Optional[Json]):
+        if self.positions is None:
+            return
+        self.add_node(doc_id)
+        for index in self.lookups.values():
+            index.remove(doc_id)
+            if data is not None:
+                index.add(doc_id, data)
+        for index in self.ordered.values():
+            index.remove(doc_id)
+            if data is not None:
+                index.add(doc_id, self.positions[doc_id], data)
+
+
+class IndexManager:
+    """Secondary indexes of a raw engine store.
+
+    An index is defined by a list of ``(field, descending)`` pairs. Index definitions are saved
+    to ``path`` (if any), the indexes themselves live in memory: they are built from the
+    documents of their collection the first time a query uses them and kept up to date by the
+    writes afterwards.
+    """
+
+    def __init__(self, path: str = None, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self._collections: dict[str, CollectionIndexes] = {}
+
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for collection, definitions in json.load(f).items():
+                entry = self._collections.setdefault(collection, CollectionIndexes())
+                entry.definitions = [
+                    tuple((field, descending) for field, descending in definition) for definition in definitions
+                ]
+
+    def _save(self):
+        if self.path is None:
+            return
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump({
+                collection: [[list(pair) for pair in definition] for definition in entry.definitions]
+                for collection, entry in self._collections.items() if entry.definitions
+            }, f)
+            if self.fsync:
+                utils.fsync_file(f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def definitions(self, collection: str) -> list[tuple[tuple[str, bool], ...]]:
+        entry = self._collections.get(normalize_collection(collection))
+        return list(entry.definitions) if entry is not None else []
+
+    def create(self, collection: str, definition: tuple[tuple[str, bool], ...]):
+        entry = self._collections.setdefault(normalize_collection(collection), CollectionIndexes())
+        if definition not in entry.definitions:
+            entry.definitions.append(definition)
+            self._save()
+
+    def drop(self, collection: str, definition: tuple[tuple[str, bool], ...]):
+        entry = self._collections.get(normalize_collection(collection))
+        if entry is not None and definition in entry.definitions:
+            entry.drop(definition)
+            self._save()
+
+    def lookup(self, collection: str, nodes: dict, filters: list[Q], plan: dict = None) -> Optional[list[str]]:
+        """Returns the ids of the candidate documents of a query in collection order, None for a full scan.
+
+        Every indexed lookup of the conjunctive part of the filters narrows the candidates, the
+        filters are still evaluated on the candidates afterwards. The indexes and lookups used
+        are recorded in plan.
+        """
+        entry = self._collections.get(normalize_collection(collection))
+        if entry is None or not filters:
+            return None
+        fields = entry.fields
+        candidates = None
+        used, pushdown = [], []
+        for field, lookup_name, value in conjunctive_lookups(filters):
+            if field not in fields:
+                continue
+            ids = entry.lookup_index(field, nodes).lookup(lookup_name, value)
+            if ids is not None:
+                candidates = ids if candidates is None else candidates & ids
+                if [(field, False)] not in used:
+                    used.append([(field, False)])
+                pushdown.append(lookup_label(field, lookup_name))
+        if candidates is None:
+            return None
+        if plan is not None:
+            plan.update(access='index', index=used, pushdown=pushdown)
+        return sorted(candidates, key=entry.positions.__getitem__)
+
+    def ordered_lookup(self, collection: str, nodes: dict, filters: list[Q],
+                       orders: list[tuple[FieldPath, bool]], plan: dict = None) -> Optional[IndexRange]:
+        """Returns the ids of the candidate documents of an ordered query already sorted, None for a full scan.
+
+        An index serves the query when its fields are some fields compared with ``exact`` in
+        the conjunctive part of the filters followed by the order_by fields, with the same
+        directions. The filters are still evaluated on the candidates afterwards. The index
+        used is recorded in plan.
+        """
+        entry = self._collections.get(normalize_collection(collection))
+        if entry is None or not orders or any(field == FieldPath.document_id for field, _ in orders):
+            return None
+        orders = tuple((str(field), descending) for field, descending in orders)
+        equals = {}
+        for field, lookup_name, value in conjunctive_lookups(filters or []):
+            if lookup_name == 'exact' and value_kind(value) is not None:
+                equals.setdefault(field, value)
+        for definition in entry.definitions:
+            prefix, suffix = definition[:len(definition) - len(orders)], definition[len(definition) - len(orders):]
+            if suffix != orders or not all(field in equals for field, _ in prefix):
+                continue
+            ids = entry.ordered_index(definition, nodes).range([equals[field] for field, _ in prefix])
+            if ids is not None:
+                if plan is not None:
+                    plan.update(
+                        access='index-range', index=[list(definition)],
+                        pushdown=[lookup_label(field, 'exact') for field, _ in prefix]
+                    )
+                return ids
+        return None
+
+    def document_changed(self, path: str, data: Optional[Json]):
+        """Updates the indexes of the collection of the document at path, data is None once deleted."""
+        collection, _, doc_id = path.rpartition('/')
+        entry = self._collections.get(normalize_collection(collection))
+        if entry is not None:
+            entry.document_changed(doc_id, data)
+
+    def node_created(self, path: str):
+        """Records a document node created without data, e.g. by a write to one of its sub collections."""
+        collection, _, doc_id = path.rpartition('/')
+        entry = self._collections.get(normalize_collection(collection))
+        if entry is not None:
+            entry.add_node(doc_id)
+
+    def invalidate(self, prefix: str = ''):
+        """Drops the built indexes of the collections below prefix, they are rebuilt on next use."""
+        prefix = normalize_collection(prefix) if prefix else ''
+        for collection, entry in self._collections.items():
+            if not prefix or collection.startswith(prefix + '/'):
+                entry.reset()
+
+
+def lookup_label(field: str, lookup_name: str) -> str:
+    return field if lookup_name == 'exact' else f'{field}{LOOKUP_SEP}{lookup_name}'
+
+
+def conjunctive_lookups(filters: list[Q]) -> Iterator[tuple[str, str, Any]]:
+    """Yields the (field, lookup name, value) of the lookups every matching document satisfies."""
+    for q in filters:
+        # a lone condition behaves the same with every connector
+        if q.negated or (q.connector != Q.AND and len(q.children) > 1):
+            continue
+        for child in q.children:
+            if isinstance(child, Q):
+                yield from conjunctive_lookups([child])
+                continue
+            arg, value = child
+            if isinstance(value, F):
+                continue
+            field, _, lookup_name = arg.partition(LOOKUP_SEP)
+            yield field, lookup_name or 'exact', value
@@ -1,65 +1,275 @@
+import bisect
+import collections
+import heapq
+import itertools
 import operator
 from operator import itemgetter
-from typing import Callable, Any
+from typing import Callable, Any, Iterable, Iterator, Reversible, Optional
 
 from PyStoreDB.constants import Json
 from PyStoreDB.core import FieldPath
-from PyStoreDB.core.filters import FilteredQuery
+from PyStoreDB.core.filters import FilteredQuery, referenced_fields
+from PyStoreDB.core.ordering import Descending, value_kind
+from PyStoreDB.engines.stats import QueryStats, stage
 
 __all__ = ['PyStoreDBRawQuery']
 
 
+CURSORS = ('start_at', 'start_after', 'end_at', 'end_before')
+
+CURSOR_OPS = (
+    ('start_at', operator.ge), ('start_after', operator.gt), ('end_at', operator.le), ('end_before', operator.lt),
+)
+
+# the comparison of values of a descending field is the one of their reversed order
+MIRRORED_OPS = {operator.ge: operator.le, operator.gt: operator.lt, operator.le: operator.ge, operator.lt: operator.gt}
+
+
+class SortKeys:
+    """The sort keys of sorted rows, computed when accessed so that bisecting only extracts a few of them."""
+
+    def __init__(self, rows: list[tuple[str, Json]], key: Callable[[tuple[str, Json]], Any]):
+        self.rows = rows
+        self.key = key
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.key(self.rows[index])
+
+
 class PyStoreDBRawQuery:
 
-    def apply_query_filters(self, data: dict[str, Json], **kwargs):
+    @staticmethod
+    def describe(presorted=False, **kwargs) -> dict[str, Any]:
+        """Describes how the filters, order, cursors and limit of a query are applied in memory."""
+        has_cursor = any(cursor in kwargs for cursor in CURSORS)
+        has_limit = 'limit' in kwargs or 'limit_to_last' in kwargs
+        if 'order_by' not in kwargs:
+            sort = None
+        elif presorted:
+            sort = 'index'
+        else:
+            sort = 'top-k' if has_limit and not has_cursor else 'in-memory'
+        if not has_cursor:
+            cursor = None
+        else:
+            cursor = 'document-bisect' if kwargs.get('is_doc_cursor') else 'bisect'
+        if not has_limit:
+            limit = None
+        else:
+            limit = 'early-stop' if presorted and not has_cursor else 'slice'
+        return {
+            'filter': 'in-memory' if kwargs.get('filters') else None,
+            'sort': sort,
+            'cursor': cursor,
+            'limit': limit,
+            'projection': list(kwargs['select']) if 'select' in kwargs else None,
+        }
+
+    @staticmethod
+    def decoded_fields(**kwargs) -> Optional[list[str]]:
+        """Get the fields of the documents a query reads, None if it doesn't select fields.
+
+        A query selecting fields only needs them and the fields read by its filters and order_by decoded.
+        """
+        if 'select' not in kwargs:
+            return None
+        fields = dict.fromkeys(PyStoreDBRawQuery.projected_fields(**kwargs))
+        fields.update(dict.fromkeys(sorted(referenced_fields(kwargs.get('filters', [])))))
+        return list(fields)
+
+    @staticmethod
+    def projected_fields(**kwargs) -> list[str]:
+        """Get the fields of the documents returned by a query selecting fields.
+
+        The order_by fields are returned with the selected ones, the snapshots keep them to position cursors.
+        """
+        fields = dict.fromkeys(kwargs['select'])
+        fields.update((str(field), None) for field, _ in kwargs.get('order_by', []) if field != FieldPath.document_id)
+        return list(fields)
+
+    @staticmethod
+    def project(rows: Iterable[tuple[str, Json]], fields: list[str]) -> Iterator[tuple[str, Json]]:
+        """Keeps the projected fields of the rows, in the order of the projection."""
+        for doc_id, document in rows:
+            yield doc_id, {field: document[field] for field in fields if field in document}
+
+    def apply_query_filters(self, data: dict[str, Json], presorted=False, stats: QueryStats = None, **kwargs):
         if 'filters' in kwargs:
-            data = self._filter(data, kwargs.pop('filters'))
-        if 'order_by' in kwargs:
-            data = self._order_by(data, kwargs['order_by'])
-        if 'start_at' in kwargs:
-            data = self._by_cursor_value(
-                data, kwargs['order_by'], kwargs.pop('start_at'),
-                operator.ge, kwargs.pop('is_doc_cursor')
-            )
-        if 'start_after' in kwargs:
-            data = self._by_cursor_value(
-                data, kwargs['order_by'], kwargs.pop('start_after'),
-                operator.gt, kwargs.pop('is_doc_cursor')
-            )
-        if 'end_at' in kwargs:
-            data = self._by_cursor_value(
-                data, kwargs['order_by'], kwargs.pop('end_at'),
-                operator.le, kwargs.pop('is_doc_cursor')
-            )
-        if 'end_before' in kwargs:
-            data = self._by_cursor_value(
-                data, kwargs['order_by'], kwargs.pop('end_before'),
-                operator.lt, kwargs.pop('is_doc_cursor')
-            )
+            with stage(stats, 'filter'):
+                data = self._filter(data, kwargs.pop('filters'))
+        if 'order_by' in kwargs and not presorted:
+            with stage(stats, 'sort'):
+                if 'limit' in kwargs and not any(cursor in kwargs for cursor in CURSORS):
+                    data = self._top(data.items(), kwargs['order_by'], kwargs['limit'])
+                elif 'limit_to_last' in kwargs and not any(cursor in kwargs for cursor in CURSORS):
+                    data = self._top(data.items(), kwargs['order_by'], kwargs['limit_to_last'], last=True)
+                else:
+                    data = self._order_by(data, kwargs['order_by'])
+        if any(cursor in kwargs for cursor in CURSORS):
+            with stage(stats, 'cursor'):
+                data = self._apply_cursors(data, kwargs)
         if 'limit' in kwargs:
-            data = dict(list(data.items())[:kwargs.pop('limit')])
+            with stage(stats, 'limit'):
+                data = dict(list(data.items())[:kwargs.pop('limit')])
         elif 'limit_to_last' in kwargs:
-            data = dict(list(data.items())[-kwargs.pop('limit_to_last'):])
+            with stage(stats, 'limit'):
+                data = dict(list(data.items())[-kwargs.pop('limit_to_last'):])
+        if 'select' in kwargs:
+            data = dict(self.project(data.items(), self.projected_fields(**kwargs)))
 
         return data
 
+    def count_query_filters(self, rows: Iterable[tuple[str, Json]], **kwargs) -> int:
+        """Counts the rows matching a query without keeping them.
+
+        Unordered queries only evaluate their filters on the rows, ordered ones are run as a whole.
+        """
+        if 'order_by' in kwargs:
+            return len(self.apply_query_filters(dict(rows), **kwargs))
+        if kwargs.get('filters'):
+            rows = filter(FilteredQuery([], kwargs['filters']).match, rows)
+        if 'limit' in kwargs:
+            rows = itertools.islice(rows, kwargs['limit'])
+        return sum(1 for _ in rows)
+
+    def stream_query_filters(self, rows: Iterable[tuple[str, Json]], **kwargs) -> Iterator[tuple[str, Json]]:
+        """Applies a query to rows lazily, the rows are read as the results are consumed.
+
+        Without order_by the reading stops once the limit is reached, ordered queries read every row but only
+        keep the matching ones, or the limit of them, to sort them.
+        """
+        if 'select' in kwargs:
+            fields = self.projected_fields(**kwargs)
+            del kwargs['select']
+            yield from self.project(self.stream_query_filters(rows, **kwargs), fields)
+            return
+        if 'filters' in kwargs:
+            rows = filter(FilteredQuery([], kwargs.pop('filters')).match, rows)
+        if 'order_by' in kwargs:
+            if not any(cursor in kwargs for cursor in CURSORS):
+                if 'limit' in kwargs:
+                    yield from self._top(rows, kwargs['order_by'], kwargs['limit']).items()
+                    return
+                if 'limit_to_last' in kwargs:
+                    yield from self._top(rows, kwargs['order_by'], kwargs['limit_to_last'], last=True).items()
+                    return
+            yield from self.apply_query_filters(dict(rows), **kwargs).items()
+            return
+        if 'limit' in kwargs:
+            rows = itertools.islice(rows, kwargs['limit'])
+        elif 'limit_to_last' in kwargs:
+            rows = collections.deque(rows, maxlen=kwargs['limit_to_last'])
+        yield from rows
+
+    def _apply_cursors(self, data, kwargs):
+        is_doc = kwargs.pop('is_doc_cursor', False)
+        rows = self.to_data_list(data)
+        for cursor, op in CURSOR_OPS:
+            if cursor in kwargs:
+                rows = self._by_cursor_value(rows, kwargs['order_by'], kwargs.pop(cursor), op, is_doc)
+        return dict(rows)
+
+    @staticmethod
+    def seek_cursors(ids: Reversible[str], kwargs: dict) -> tuple[Reversible[str], dict]:
+        """Positions the value cursors holding one value on ids when they are an index range.
+
+        The cursors answered by the index are removed from the returned query kwargs.
+        """
+        if kwargs.get('is_doc_cursor') or not hasattr(ids, 'seek'):
+            return ids, kwargs
+        for cursor, op in CURSOR_OPS:
+            values = kwargs.get(cursor)
+            if values is not None and len(values) == 1:
+                sought = ids.seek(op, values[0])
+                if sought is not None:
+                    ids = sought
+                    kwargs = {key: value for key, value in kwargs.items() if key != cursor}
+        return ids, kwargs
+
+    def apply_sorted_query_filters(self, ids: Reversible[str], load: Callable[[str], Json], stats: QueryStats = None,
+                                   **kwargs):
+        """Applies a query to the ids of documents already sorted by its order_by clauses.
+
+        Documents are loaded with load as they are read and the reading stops once the limit is reached.
+        """
+        fields = self.projected_fields(**kwargs) if 'select' in kwargs else None
+        kwargs.pop('select', None)
+        with stage(stats, 'read'):
+            data = self._apply_sorted_query_filters(ids, load, stats, **kwargs)
+        return data if fields is None else dict(self.project(data.items(), fields))
+
+    def _apply_sorted_query_filters(self, ids: Reversible[str], load: Callable[[str], Json], stats, **kwargs):
+        has_cursor = any(cursor in kwargs for cursor in CURSORS)
+        # the last documents are read from the end when no cursor can drop them
+        backward = 'limit_to_last' in kwargs and not has_cursor
+        rows: Iterable[tuple[str, Json]] = ((doc_id, load(doc_id)) for doc_id in (reversed(ids) if backward else ids))
+        if 'filters' in kwargs:
+            rows = filter(FilteredQuery([], kwargs.pop('filters')).match, rows)
+        if has_cursor:
+            return self.apply_query_filters(dict(rows), presorted=True, stats=stats, **kwargs)
+        if 'limit' in kwargs:
+            return dict(itertools.islice(rows, kwargs['limit']))
+        if backward:
+            return dict(list(itertools.islice(rows, kwargs['limit_to_last']))[::-1])
+        return dict(rows)
+
     def _order_by(self, data, orders: list[tuple[FieldPath, bool]]):
-        data = self.to_data_list(data)
-        for (_, item) in data:
-            assert all([
-                str(order[0]) in item
-                for order in orders
-                if order[0] != FieldPath.document_id]), 'order_by field must be present in all documents'
-            assert all([not isinstance(item[str(order[0])], (dict, list)) for order in orders
-                        if order[0] != FieldPath.document_id]), 'order_by fields value must not be a dict or list'
-
-        for field, descending in orders[::-1]:
-            data = sorted(
-                data,
-                key=self._get_field_value(field),
-                reverse=descending
-            )
-        return dict(data)
+        key, reverse = self._sort_key(orders)
+        return dict(sorted(data.items(), key=key, reverse=reverse))
+
+    def _top(self, rows: Iterable[tuple[str, Json]], orders: list[tuple[FieldPath, bool]], k: int, last=False):
+        """Selects the first (or last) k rows of the order with a bounded heap instead of sorting them all."""
+        key, reverse = self._sort_key(orders)
+        if not last:
+            # nsmallest and nlargest are stable, ties keep the collection order like sorted()
+            return dict((heapq.nlargest if reverse else heapq.nsmallest)(k, rows, key=key))
+        # the position breaks the ties so the last k of the stable order are selected
+        if reverse:
+            top = heapq.nsmallest(k, enumerate(rows), key=lambda entry: (key(entry[1]), -entry[0]))
+        else:
+            top = heapq.nlargest(k, enumerate(rows), key=lambda entry: (key(entry[1]), entry[0]))
+        return dict(row for _, row in reversed(top))
+
+    @staticmethod
+    def _sort_key(orders: list[tuple[FieldPath, bool]]) -> tuple[Callable[[tuple[str, Json]], Any], bool]:
+        """Builds the key of a single sort by the order and whether the sort is reversed.
+
+        The key is extracted once per document and checks the order_by fields. When all the fields are
+        descending the sort is reversed, otherwise the components of the descending fields are reversed,
+        by negation for numbers.
+        """
+        reverse = all(descending for _, descending in orders)
+        getters = [
+            PyStoreDBRawQuery._sort_key_component(field, descending != reverse)
+            for field, descending in orders
+        ]
+        if len(getters) == 1:
+            return getters[0], reverse
+
+        def key_func(item):
+            return tuple([get(item) for get in getters])
+
+        return key_func, reverse
+
+    @staticmethod
+    def _sort_key_component(field: FieldPath, flip: bool) -> Callable[[tuple[str, Json]], Any]:
+        if field == FieldPath.document_id:
+            return (lambda item: Descending(item[0])) if flip else itemgetter(0)
+        field = str(field)
+
+        def key_func(item):
+            document = item[1]
+            assert field in document, 'order_by field must be present in all documents'
+            value = document[field]
+            assert not isinstance(value, (dict, list)), 'order_by fields value must not be a dict or list'
+            if flip:
+                return -value if isinstance(value, (int, float)) else Descending(value)
+            return value
+
+        return key_func
 
     @staticmethod
     def to_data_list(data: dict):
@@ -76,40 +286,86 @@ class PyStoreDBRawQuery:
 
     @staticmethod
     def _filter_by_key_value_func(field: FieldPath, op: Callable, value):
+        get = PyStoreDBRawQuery._checked_cursor_value(field, value)
+
+        def key_func(item):
+            return op(get(item), value)
+
+        return key_func
+
+    @staticmethod
+    def _checked_cursor_value(field: FieldPath, value) -> Callable[[tuple[str, Json]], Any]:
+        get = PyStoreDBRawQuery._get_field_value(field)
+        kind = value_kind(value)
+
         def key_func(item):
-            db_value = PyStoreDBRawQuery._get_field_value(field)(item)
-            assert type(db_value) is type(value), ('value type of fields in order_by clauses must match in order '
-                                                   'values in start_after(), start_at(), end_before(), end_at()')
-            return op(db_value, value)
+            db_value = get(item)
+            # ints and floats are ordered together, as they are in the indexes
+            assert type(db_value) is type(value) or (kind is not None and value_kind(db_value) == kind), (
+                'value type of fields in order_by clauses must match in order '
+                'values in start_after(), start_at(), end_before(), end_at()')
+            return db_value
 
         return key_func
 
     def _by_cursor_value(self, data, orders, values, op: Callable[[Any, Any], bool], is_doc: bool):
-        keypair = list(zip(map(itemgetter(0), orders), list(values)))
-        data = self.to_data_list(data)
+        """Keeps the sorted rows after or before a cursor, positioned by bisection."""
+        values = list(values)
         if is_doc:
-            return self._by_document_cursor(keypair, data, op)
-        for field, value in keypair:
-            data = list(
-                filter(self._filter_by_key_value_func(field, op, value), data)
-            )
-        return dict(data)
+            return self._by_document_cursor(data, orders, values, op)
+        if not values:
+            return data
+        # the rows are sorted by the first order_by field, the rows matching its value are contiguous
+        (field, descending), value = orders[0], values[0]
+        get = self._checked_cursor_value(field, value)
+        if descending:
+            keys = SortKeys(data, lambda item: Descending(get(item)))
+            low, high = bisect.bisect_left(keys, Descending(value)), bisect.bisect_right(keys, Descending(value))
+        else:
+            keys = SortKeys(data, get)
+            low, high = bisect.bisect_left(keys, value), bisect.bisect_right(keys, value)
+        # data[:low] sorts before value, data[low:high] equals it and data[high:] sorts after it
+        sort_op = MIRRORED_OPS[op] if descending else op
+        if sort_op == operator.ge:
+            data = data[low:]
+        elif sort_op == operator.gt:
+            data = data[high:]
+        elif sort_op == operator.le:
+            data = data[:high]
+        else:
+            data = data[:low]
+        # the rows matching the values of the other fields are not contiguous, they are filtered
+        for (field, _), value in zip(orders[1:], values[1:]):
+            data = list(filter(self._filter_by_key_value_func(field, op, value), data))
+        return data
 
-    def _by_document_cursor(self, keypair: list[tuple[FieldPath, Any]], data: list[tuple[str, Any]],
+    def _by_document_cursor(self, data: list[tuple[str, Json]], orders: list[tuple[FieldPath, bool]], values: list,
                             op: Callable[[Any, Any], bool]):
-
-        for index, item in enumerate(data):
-            if all([self._get_field_value(field)(item) == value for field, value in keypair]):
-                if op == operator.gt:
-                    return dict(data[index + 1:])
-                elif op == operator.ge:
-                    return dict(data[index:])
-                elif op == operator.lt:
-                    return dict(data[:index])
-                elif op == operator.le:
-                    return dict(data[:index + 1])
-                break
-        return dict(data)
+        """Keeps the sorted rows after or before the document of a cursor, found by bisection on the sort key."""
+        key, reverse = self._sort_key(orders)
+        document = (None, {})
+        for (field, _), value in zip(orders, values):
+            if field == FieldPath.document_id:
+                document = (value, document[1])
+            else:
+                document[1][str(field)] = value
+        target = key(document)
+        if reverse:
+            keys, target = SortKeys(data, lambda item: Descending(key(item))), Descending(target)
+        else:
+            keys = SortKeys(data, key)
+        index = bisect.bisect_left(keys, target)
+        if index == len(data) or not all(
+                self._get_field_value(field)(data[index]) == value for (field, _), value in zip(orders, values)
+        ):
+            return data
+        if op == operator.gt:
+            return data[index + 1:]
+        elif op == operator.ge:
+            return data[index:]
+        elif op == operator.lt:
+            return data[:index]
+        return data[:index + 1]
 
     def _filter(self, data, filters):
         data = self.to_data_list(data)
@@ -1,12 +1,14 @@
-import json
 import os
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable, TYPE_CHECKING
 
 from PyStoreDB._utils import path_segments
 from PyStoreDB.constants import Json, supported_types
 from PyStoreDB.errors import PyStoreDBPathError
 
+if TYPE_CHECKING:
+    from PyStoreDB.engines._raw.codecs import Codec
+
 """""
 {
     collection_xxxx: {
@@ -38,17 +40,52 @@ DICT_META_KEY = 'dict'
 DATETIME_META_KEY = 'datetime'
 
 
-def create_database(path: str):
+def create_database(path: str, codec: 'Codec'):
     if not os.path.exists(path):
-        with open(path, 'w+') as f:
-            f.write(json.dumps({}, indent=4))
+        with open(path, 'wb') as f:
+            f.write(codec.encode({}))
 
 
-def save_database(path: str, data: Json):
+def dump_database(data: Json, codec: 'Codec') -> bytes:
     # TODO encrypt
+    return codec.encode(data)
+
+
+def fsync_file(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def fsync_directory(path: str):
+    """Persists the entries of a directory, so a file renamed in it survives a crash (POSIX only)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_database(path: str, content: bytes, fsync: bool = True):
+    # the content is written next to the store file then renamed over it, a crash leaves either
+    # the previous or the new version of the store, never a truncated one
     if os.path.exists(path):
-        with open(path, 'w') as f:
-            f.write(json.dumps(data, indent=4))
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+            if fsync:
+                fsync_file(f)
+        os.replace(temp_path, path)
+        if fsync:
+            fsync_directory(os.path.dirname(path))
+
+
+def save_database(path: str, data: Json, codec: 'Codec', fsync: bool = True):
+    write_database(path, dump_database(data, codec), fsync)
 
 
 def create_nested_dict(path: str, data: dict):
@@ -80,9 +117,9 @@ def get_nested_doc_dict(path: str, data: dict):
     return {}
 
 
-def load_db(path: str) -> Json:
-    with open(path) as f:
-        data = json.load(f)
+def load_db(path: str, codec: 'Codec') -> Json:
+    with open(path, 'rb') as f:
+        data = codec.decode(f.read())
     return data
 
 
@@ -131,14 +168,21 @@ def update_data(data: Json, new_data: Json):
     return data
 
 
-def decode_document_data(data: Json) -> Json:
+def decode_document_data(data: Json, fields: Iterable[str] | None = None) -> Json:
+    """Decodes the data of a document, only its fields in fields when given."""
     _data = {}
-    for key, value in data[DATA_KEY].items():
-        _data[key] = parse_value_metadata(value)
+    if fields is None:
+        for key, value in data[DATA_KEY].items():
+            _data[key] = parse_value_metadata(value)
+        return _data
+    document = data[DATA_KEY]
+    for key in fields:
+        if key in document:
+            _data[key] = parse_value_metadata(document[key])
     return _data
 
 
-def delete_document(path: str, data: Json):
+def delete_document(path: str, data: Json) -> bool:
     *paths, _id = path_segments(path)
     for key in paths:
         if key not in data:
@@ -148,12 +192,16 @@ def delete_document(path: str, data: Json):
         raise PyStoreDBPathError(path, segment=_id)
     elif DATA_KEY in data[_id]:
         del data[_id][DATA_KEY]
+        return True
+    return False
 
 
-def decode_collection_docs(data):
+def decode_collection_docs(data, fields: Iterable[str] | None = None):
     decoded = {}
     for key, value in data.items():
-        decoded[key] = decode_document_data(value)
+        # deleted documents and documents holding only sub collections have no data
+        if DATA_KEY in value:
+            decoded[key] = decode_document_data(value, fields)
     return decoded
 
 
@@ -0,0 +1,112 @@
+import json
+import os
+
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.errors import PyStoreDBPathError
+
+__all__ = ['WriteAheadLog', 'SET', 'UPDATE', 'DELETE', 'CLEAR']
+
+SET = 'set'
+UPDATE = 'update'
+DELETE = 'delete'
+CLEAR = 'clear'
+
+OP_KEY = 'op'
+PATH_KEY = 'path'
+DATA_KEY = 'data'
+
+
+def make_record(op: str, path: str = None, data: dict = None) -> dict:
+    record = {OP_KEY: op}
+    if path is not None:
+        record[PATH_KEY] = path
+    if data is not None:
+        record[DATA_KEY] = data
+    return record
+
+
+def apply_record(record: dict, raw_db: dict) -> dict:
+    """Applies a single log record to the raw database and returns the (possibly new) root."""
+    op = record[OP_KEY]
+    if op == SET:
+        item = utils.create_nested_dict(record[PATH_KEY], raw_db)
+        item.clear()
+        item[utils.DATA_KEY] = record[DATA_KEY]
+    elif op == UPDATE:
+        item = utils.create_nested_dict(record[PATH_KEY], raw_db)
+        item.setdefault(utils.DATA_KEY, {}).update(record[DATA_KEY])
+    elif op == DELETE:
+        try:
+            utils.delete_document(record[PATH_KEY], raw_db)
+        except PyStoreDBPathError:
+            pass
+    elif op == CLEAR:
+        raw_db = {}
+    else:
+        raise ValueError(f'Unknown log record operation {op}')
+    return raw_db
+
+
+class WriteAheadLog:
+    """Append-only log of raw database mutations.
+
+    Every record is a single compact JSON line, so the cost of persisting a write
+    is proportional to the size of the change instead of the size of the store.
+    The log is replayed on top of the latest snapshot when the store is loaded and
+    truncated each time a new snapshot (checkpoint) is written. With ``fsync`` every append
+    is forced to the disk before returning.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.size = 0
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @staticmethod
+    def encode(records: list[dict]) -> str:
+        return ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+
+    def write(self, payload: str, count: int):
+        if not count:
+            return
+        with open(self.path, 'a') as f:
+            f.write(payload)
+            if self.fsync:
+                utils.fsync_file(f)
+        self.size += count
+
+    def append(self, records: list[dict]):
+        self.write(self.encode(records), len(records))
+
+    def replay(self, raw_db: dict) -> dict:
+        if not self.exists:
+            return raw_db
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a torn write at the tail of the log, everything after it is discarded
+                    break
+                raw_db = apply_record(record, raw_db)
+                valid_size += len(line)
+                self.size += 1
+        if valid_size != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+        return raw_db
+
+    def reset(self):
+        with open(self.path, 'w'):
+            pass
+        self.size = 0
+
+    def remove(self):
+        if self.exists:
+            os.remove(self.path)
+        self.size = 0
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Iterator
+
+from PyStoreDB._utils import path_segments
+from PyStoreDB.constants import Json
+from PyStoreDB.core import FieldPath
+from PyStoreDB.engines._raw import PyStoreDBRawEngine, utils
+from PyStoreDB.engines._raw.codecs import codec_extensions
+from PyStoreDB.engines.base import PyStoreDBEngine
+from PyStoreDB.errors import PyStoreDBPathError, PyStoreDBError
+
+__all__ = ['PyStoreDBShardedEngine']
+
+
+class PyStoreDBShardedEngine(PyStoreDBRawEngine):
+    """Raw engine storing each collection in its own file.
+
+    The store is a directory named after the store holding one shard file per top-level
+    collection (``users.json``, ``orders.json``...). With ``shard_subcollections`` enabled,
+    every sub collection gets its own shard as well (``users.u1.posts.json``) and the
+    shard of its parent only keeps the documents data. Shards are written with the codec
+    of the store, which sets their extension.
+
+    Shards are loaded on first access and only the shards modified since the last flush
+    are written, so the I/O of a write is bounded by the size of its collection.
+    Shards are written directly, the write-ahead log of the raw engine is not used.
+    """
+
+    def __init__(self, store_name: str, shard_subcollections: bool = False, **kwargs):
+        super().__init__(store_name, **kwargs)
+        self.shard_subcollections = shard_subcollections
+        self._shard_dir = None
+        self._known_shards: set[str] = set()
+        self._loaded_shards: set[str] = set()
+        self._dirty_shards: set[str] = set()
+
+    def create_database_if_not_exists(self):
+        os.makedirs(self._shard_dir, exist_ok=True)
+        extensions = codec_extensions() - {self.codec.extension}
+        for file_name in os.listdir(self._shard_dir):
+            if file_name.endswith(self.codec.extension):
+                continue
+            extension = next((extension for extension in extensions if file_name.endswith(extension)), None)
+            if extension is not None:
+                raise PyStoreDBError(
+                    f"Shard {file_name} of store {self.store_name} is saved with the {extension} extension, "
+                    f"open the store with the codec it was written with instead of '{self.codec.name}'"
+                )
+
+    def initialize(self):
+        if not self.in_memory:
+            self._shard_dir = os.path.join(self.settings.store_dir, self.store_name)
+            PyStoreDBEngine.initialize(self)
+            self._known_shards = {
+                self._shard_id(file_name)
+                for file_name in os.listdir(self._shard_dir)
+                if file_name.endswith(self.codec.extension)
+            }
+            self._load_indexes()
+            self._start_flusher()
+
+    def _shard_file(self, shard: str) -> str:
+        return os.path.join(self._shard_dir, '.'.join(path_segments(shard)) + self.codec.extension)
+
+    def _shard_id(self, file_name: str) -> str:
+        return '/' + file_name[:-len(self.codec.extension)].replace('.', '/')
+
+    def _shard_of(self, path: str) -> str:
+        """Returns the shard holding the document or collection at path."""
+        segments = path_segments(path)
+        if not self.shard_subcollections:
+            return '/' + segments[0]
+        if len(segments) % 2 == 0:
+            segments = segments[:-1]
+        return '/' + '/'.join(segments)
+
+    def _require(self, path: str, descendants=False):
+        """Loads the shards needed to access path, descendants loads the shards below it as well."""
+        if self.in_memory:
+            return
+        with self._lock:
+            unloaded = self._known_shards - self._loaded_shards
+            if not unloaded:
+                return
+            if not path:
+                shards = unloaded
+            elif not self.shard_subcollections:
+                shards = {self._shard_of(path)} & unloaded
+            else:
+                path = '/' + path.strip('/')
+                shards = {
+                    shard for shard in unloaded
+                    if path == shard or path.startswith(shard + '/') or (descendants and shard.startswith(path + '/'))
+                }
+            for shard in sorted(shards, key=len):
+                self._load_shard(shard)
+
+    def _load_shard(self, shard: str):
+        if shard in self._loaded_shards:
+            return
+        content = utils.load_db(self._shard_file(shard), self.codec)
+        collection = utils.create_nested_dict(shard, self._raw_db)
+        for doc_id, doc in content.items():
+            collection.setdefault(doc_id, {}).update(doc)
+        self._loaded_shards.add(shard)
+
+    def _dump_shard(self, shard: str) -> bytes | None:
+        try:
+            collection = utils.get_nested_dict(shard, self._raw_db)
+        except PyStoreDBPathError:
+            return None
+        if self.shard_subcollections:
+            collection = {
+                doc_id: {utils.DATA_KEY: doc[utils.DATA_KEY]} if utils.DATA_KEY in doc else {}
+                for doc_id, doc in collection.items()
+            }
+        return utils.dump_database(collection, self.codec)
+
+    def _mark_dirty(self, path: str, descendants=False):
+        self._dirty_shards.add(self._shard_of(path))
+        if descendants and self.shard_subcollections:
+            prefix = '/' + path.strip('/') + '/'
+            self._dirty_shards.update(shard for shard in self._loaded_shards if shard.startswith(prefix))
+
+    def get_document(self, path: str) -> Json:
+        self._require(path)
+        return super().get_document(path)
+
+    def _query(self, path: str, kwargs: dict, plan: dict = None, stats=None, execute=True):
+        self._require(path)
+        return super()._query(path, kwargs, plan, stats, execute)
+
+    def count_collection(self, path: str, **kwargs) -> int:
+        self._require(path)
+        return super().count_collection(path, **kwargs)
+
+    def stream_collection(self, path: str, **kwargs) -> Iterator[tuple[str, Json]]:
+        self._require(path)
+        return super().stream_collection(path, **kwargs)
+
+    def get_raw(self, path: str):
+        self._require(path, descendants=True)
+        return super().get_raw(path)
+
+    def get_field(self, path: str, field: str | FieldPath, default=None) -> Any:
+        self._require(path)
+        return super().get_field(path, field, default)
+
+    def path_exists(self, path: str) -> bool:
+        self._require(path, descendants=True)
+        return super().path_exists(path)
+
+    def doc_exists(self, path):
+        self._require(path)
+        return super().doc_exists(path)
+
+    def _set(self, path: str, data: Json):
+        # setting a document replaces its whole node, sub collections included
+        self._require(path, descendants=True)
+        super()._set(path, data)
+        self._mark_dirty(path, descendants=True)
+
+    def _update(self, path: str, data: Json):
+        self._require(path)
+        super()._update(path, data)
+        self._mark_dirty(path)
+
+    def _delete(self, path: str):
+        self._require(path)
+        super()._delete(path)
+        self._mark_dirty(path)
+
+    def clear(self):
+        with self._lock:
+            self._raw_db = {}
+            self._indexes.invalidate()
+            self._counts.invalidate()
+            self._dirty_shards |= self._known_shards | self._loaded_shards
+            self._loaded_shards = set(self._known_shards)
+        self.save()
+
+    def flush(self):
+        """Writes the shards modified since the last flush."""
+        if self.in_memory:
+            return
+        with self._io_lock:
+            with self._lock:
+                shards = {shard: self._dump_shard(shard) for shard in self._dirty_shards}
+                self._dirty_shards = set()
+            for shard, content in shards.items():
+                self._write_shard(shard, content)
+
+    def checkpoint(self):
+        """Writes every loaded shard."""
+        with self._lock:
+            self._dirty_shards |= self._loaded_shards
+        self.flush()
+
+    def _write_shard(self, shard: str, content: bytes | None):
+        file_name = self._shard_file(shard)
+        if content is None:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+            with self._lock:
+                self._known_shards.discard(shard)
+                self._loaded_shards.discard(shard)
+            return
+        if not os.path.exists(file_name):
+            utils.create_database(file_name, self.codec)
+        utils.write_database(file_name, content, self.settings.fsync != 'never')
+        with self._lock:
+            self._known_shards.add(shard)
+            self._loaded_shards.add(shard)
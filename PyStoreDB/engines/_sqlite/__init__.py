@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sqlite3
+from typing import Iterable, Iterator, Optional
+
+from PyStoreDB._utils import parent_path
+from PyStoreDB.constants import Json
+from PyStoreDB.core import FieldPath
+from PyStoreDB.core.filters import referenced_fields
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.engines.stats import QueryStats, stage
+from PyStoreDB.engines._sqlite.query import SQLiteQueryCompiler, NUMERIC_TYPES, TEXT_TYPES
+from PyStoreDB.engines.kv import PyStoreDBKeyValueEngine
+
+__all__ = ['PyStoreDBSQLiteEngine']
+
+SYNCHRONOUS = {
+    'sync': 'FULL',
+    'group': 'NORMAL',
+    'async': 'OFF',
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_parent ON documents (parent);
+'''
+
+
+def prefix_bounds(path: str) -> tuple[str, str]:
+    """Returns the bounds of the paths strictly below path ('/' < '0' in the ascii table)."""
+    path = path.rstrip('/')
+    return path + '/', path + '0'
+
+
+class PyStoreDBSQLiteEngine(PyStoreDBKeyValueEngine):
+    """Engine storing each document as a row of a SQLite database keyed by its path.
+
+    The database lives in ``{store_dir}/{store_name}.sqlite3`` and uses WAL journaling, so
+    reads and writes only touch the pages they need and the file can be shared between
+    processes. The ``synchronous`` pragma follows the ``durability`` setting, it is turned off
+    when the ``fsync`` setting is 'never'.
+    Simple ``where``, ``order_by`` and ``limit`` clauses are pushed down to SQL.
+    """
+
+    def __init__(self, store_name: str, **kwargs):
+        super().__init__(store_name, **kwargs)
+        self._db_file = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self.compiler = SQLiteQueryCompiler()
+
+    def create_database_if_not_exists(self):
+        self._connection = sqlite3.connect(self._db_file, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        synchronous = 'OFF' if self.settings.fsync == 'never' else SYNCHRONOUS[self.settings.durability]
+        self._connection.execute(f'PRAGMA synchronous={synchronous}')
+        self._connection.executescript(SCHEMA)
+
+    def initialize(self):
+        if not self.in_memory:
+            self._db_file = os.path.join(self.settings.store_dir, f'{self.store_name}.sqlite3')
+        super().initialize()
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _execute(self, sql: str, params: Iterable = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._connection.execute(sql, tuple(params))
+
+    def _get(self, path: str) -> Optional[Json]:
+        row = self._execute('SELECT data FROM documents WHERE path = ?', (path,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _put(self, path: str, data: Json):
+        self._execute(
+            'INSERT INTO documents (path, parent, id, data) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (path) DO UPDATE SET data = excluded.data',
+            (path, parent_path(path), path.split('/')[-1], json.dumps(data, separators=(',', ':')))
+        )
+
+    def _remove(self, path: str):
+        self._execute('DELETE FROM documents WHERE path = ?', (path,))
+
+    def _children(self, path: str) -> Iterable[tuple[str, Json]]:
+        rows = self._execute('SELECT id, data FROM documents WHERE parent = ? ORDER BY rowid', (path,))
+        return [(doc_id, json.loads(data)) for doc_id, data in rows]
+
+    def _scan(self, path: str) -> Iterable[tuple[str, Json]]:
+        if not path:
+            rows = self._execute('SELECT path, data FROM documents ORDER BY path')
+        else:
+            rows = self._execute(
+                'SELECT path, data FROM documents WHERE path = ? OR (path > ? AND path < ?) ORDER BY path',
+                (path, *prefix_bounds(path))
+            )
+        return [(doc_path, json.loads(data)) for doc_path, data in rows]
+
+    def _has_descendants(self, path: str) -> bool:
+        row = self._execute(
+            'SELECT 1 FROM documents WHERE path > ? AND path < ? LIMIT 1', prefix_bounds(path)
+        ).fetchone()
+        return row is not None
+
+    def _drop(self):
+        self._execute('DELETE FROM documents')
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._execute('BEGIN')
+            try:
+                yield
+            except BaseException:
+                self._execute('ROLLBACK')
+                raise
+            else:
+                self._execute('COMMIT')
+
+    def save(self):
+        # every statement is committed by sqlite, batches are committed by _transaction
+        pass
+
+    def _where(self, path: str, filters) -> tuple[list[str], list, list[str]]:
+        """Returns the clauses and parameters selecting the documents of the collection at path and the filters pushed down."""
+        clauses, params = ['parent = ?'], [path]
+        where, where_params = self.compiler.where(filters)
+        clauses.extend(where)
+        params.extend(where_params)
+        return clauses, params, where
+
+    def stream_collection(self, path: str, **kwargs) -> Iterator[tuple[str, Json]]:
+        if 'order_by' in kwargs:
+            return iter(self.get_collection(path, **kwargs).items())
+        clauses, params, _ = self._where(path, kwargs.get('filters', []))
+        rows = self._execute(f"SELECT id, data FROM documents WHERE {' AND '.join(clauses)} ORDER BY rowid", params)
+        # the rows are fetched from sqlite as the results are consumed
+        fields = self.query_engine.decoded_fields(**kwargs)
+        rows = (
+            (doc_id, utils.decode_document_data({utils.DATA_KEY: json.loads(doc)}, fields)) for doc_id, doc in rows
+        )
+        return self.query_engine.stream_query_filters(rows, **kwargs)
+
+    def count_collection(self, path: str, **kwargs) -> int:
+        if 'order_by' in kwargs:
+            return super().count_collection(path, **kwargs)
+        clauses, params, _ = self._where(path, kwargs.get('filters', []))
+        if not kwargs.get('filters'):
+            count = self._execute(f"SELECT COUNT(*) FROM documents WHERE {' AND '.join(clauses)}", params).fetchone()[0]
+            return min(count, kwargs['limit']) if 'limit' in kwargs else count
+        # the rows selected by the pushed down filters are checked against every filter
+        rows = self._execute(f"SELECT id, data FROM documents WHERE {' AND '.join(clauses)}", params)
+        fields = sorted(referenced_fields(kwargs['filters']))
+        rows = (
+            (doc_id, utils.decode_document_data({utils.DATA_KEY: json.loads(doc)}, fields)) for doc_id, doc in rows
+        )
+        return self.query_engine.count_query_filters(rows, **kwargs)
+
+    def _query(self, path: str, kwargs: dict, plan: dict = None, stats: QueryStats = None, execute=True):
+        clauses, params, where = self._where(path, kwargs.get('filters', []))
+        order, limit = self._pushdown_order(path, **kwargs)
+        sql = f"SELECT id, data FROM documents WHERE {' AND '.join(clauses)}"
+        if order is not None:
+            order_sql, order_params = order
+            sql += f' ORDER BY {order_sql} LIMIT ?'
+            params.extend([*order_params, limit])
+        else:
+            sql += ' ORDER BY rowid'
+        if plan is not None:
+            plan.update(self.query_engine.describe(**kwargs), pushdown=where, sql=sql)
+            if order is not None:
+                plan.update(sort='sql', limit='sql')
+        if not execute:
+            return None
+        with stage(stats, 'read'):
+            rows = self._execute(sql, params).fetchall()
+        if 'limit_to_last' in kwargs and order is not None:
+            rows.reverse()
+        fields = self.query_engine.decoded_fields(**kwargs)
+        with stage(stats, 'decode'):
+            data = {
+                doc_id: utils.decode_document_data({utils.DATA_KEY: json.loads(doc)}, fields) for doc_id, doc in rows
+            }
+        if stats is not None:
+            stats.examined += len(rows)
+            stats.decoded += len(rows)
+        return self.query_engine.apply_query_filters(data, stats=stats, **kwargs)
+
+    def _pushdown_order(self, path: str, **kwargs) -> tuple[Optional[tuple[str, list]], Optional[int]]:
+        """Returns the ORDER BY clause and limit of an unfiltered order_by + limit query, if it can be pushed down."""
+        limit = kwargs.get('limit', kwargs.get('limit_to_last'))
+        orders = kwargs.get('order_by')
+        if limit is None or not orders or kwargs.get('filters'):
+            return None, None
+        if any(cursor in kwargs for cursor in ('start_at', 'start_after', 'end_at', 'end_before')):
+            return None, None
+        last = 'limit_to_last' in kwargs
+        terms, params = [], []
+        for field, descending in orders:
+            if field != FieldPath.document_id:
+                sql, check_params = self.compiler.order_types_check(field)
+                types = {row[0] for row in self._execute(sql, [*check_params, path])}
+                if not (types <= set(NUMERIC_TYPES) or types <= set(TEXT_TYPES)):
+                    return None, None
+            key, key_params = self.compiler.order_key(field)
+            terms.append(f"{key} {'ASC' if descending == last else 'DESC'}")
+            params.extend(key_params)
+        # ties keep the insertion order, like the stable sort of the raw query engine
+        terms.append('rowid DESC' if last else 'rowid ASC')
+        return (', '.join(terms), params), limit
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Optional
+
+from PyStoreDB.constants import LOOKUP_SEP
+from PyStoreDB.core import FieldPath
+from PyStoreDB.core.filters import Q, F
+
+__all__ = ['SQLiteQueryCompiler']
+
+NUMERIC_TYPES = ('integer', 'real')
+TEXT_TYPES = ('text',)
+
+COMPARISONS = {
+    'exact': '=',
+    'lt': '<',
+    'lte': '<=',
+    'gt': '>',
+    'gte': '>=',
+}
+
+
+def json_path(field: str) -> str:
+    return '$.' + json.dumps(field)
+
+
+def value_types(value) -> Optional[tuple[str, ...]]:
+    """Returns the json types a lookup value compares with in the same way in Python and SQLite."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return NUMERIC_TYPES
+    if isinstance(value, str):
+        return TEXT_TYPES
+    return None
+
+
+class SQLiteQueryCompiler:
+    """Pushes the simple parts of a query down to SQL.
+
+    Filters are translated into conservative SQL pre-filters: a document is only dropped by
+    SQL when the Python query engine would have rejected it without raising, documents missing
+    the field or holding a value of another type are kept so the Python filters keep their
+    exact semantics (and errors). Ordering and limits are only pushed down for unfiltered
+    queries over fields holding a single kind of scalar values.
+    """
+
+    def __init__(self, column: str = 'data'):
+        self.column = column
+
+    def where(self, filters: list[Q]) -> tuple[list[str], list[Any]]:
+        clauses, params = [], []
+        for q in filters:
+            if q.negated or q.connector != Q.AND:
+                continue
+            for child in q.children:
+                if isinstance(child, Q):
+                    continue
+                compiled = self._compile_lookup(*child)
+                if compiled is not None:
+                    clauses.append(compiled[0])
+                    params.extend(compiled[1])
+        return clauses, params
+
+    def _compile_lookup(self, arg: str, value) -> Optional[tuple[str, list]]:
+        field, _, lookup_name = arg.partition(LOOKUP_SEP)
+        lookup_name = lookup_name or 'exact'
+        if not field or isinstance(value, F):
+            return None
+        path = json_path(field)
+        json_type = f'json_type({self.column}, ?)'
+        if lookup_name == 'isnull':
+            if not isinstance(value, bool):
+                return None
+            op = '=' if value else '!='
+            return f"({json_type} IS NULL OR {json_type} {op} 'null')", [path, path]
+        if lookup_name in COMPARISONS:
+            types = value_types(value)
+            if types is None:
+                return None
+            condition = f'json_extract({self.column}, ?) {COMPARISONS[lookup_name]} ?'
+            return self._guard(json_type, types, condition), [path, path, path, value]
+        if lookup_name == 'in':
+            if not isinstance(value, (list, tuple)) or not value:
+                return None
+            kinds = {value_types(item) for item in value}
+            if len(kinds) != 1 or None in kinds:
+                return None
+            condition = f"json_extract({self.column}, ?) IN ({', '.join('?' * len(value))})"
+            return self._guard(json_type, kinds.pop(), condition), [path, path, path, *value]
+        return None
+
+    @staticmethod
+    def _guard(json_type: str, types: tuple[str, ...], condition: str) -> str:
+        # keep the rows the python lookup would evaluate differently (missing field, other types)
+        quoted = ', '.join(f"'{t}'" for t in types)
+        return f'({json_type} IS NULL OR {json_type} NOT IN ({quoted}) OR {condition})'
+
+    def order_key(self, field: FieldPath) -> tuple[str, list]:
+        if field == FieldPath.document_id:
+            return 'id', []
+        return f'json_extract({self.column}, ?)', [json_path(str(field))]
+
+    def order_types_check(self, field: FieldPath) -> tuple[str, list]:
+        """SQL returning the distinct json types of field, used to validate an order_by pushdown."""
+        return f'SELECT DISTINCT json_type({self.column}, ?) FROM documents WHERE parent = ?', [json_path(str(field))]
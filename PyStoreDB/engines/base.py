@@ -1,15 +1,23 @@
 from __future__ import annotations
 
 import abc
-from typing import Any
+import warnings
+from typing import Any, Iterator
 
+from PyStoreDB._utils import validate_data
 from PyStoreDB.constants import Json
 from PyStoreDB.core import FieldPath
+from PyStoreDB.core.aggregate import Aggregation, accumulate, accumulate_groups, order_groups
+from PyStoreDB.engines.stats import QueryStats, stage
+from PyStoreDB.errors import PyStoreDBError, PyStoreDBPathError
 
 __all__ = ['PyStoreDBEngine']
 
 
 class PyStoreDBEngine(abc.ABC):
+    SET = 'set'
+    UPDATE = 'update'
+    DELETE = 'delete'
 
     def __init__(self, store_name: str, **kwargs):
         """
@@ -25,9 +33,17 @@ class PyStoreDBEngine(abc.ABC):
         """
         return getattr(self, '_store', None)
 
+    @property
+    def settings(self):
+        """
+        Get the settings of the store
+        :rtype: PyStoreDB.conf.PyStoreDBSettings
+        """
+        return self.store.__class__.settings
+
     @property
     def in_memory(self):
-        return self.store.__class__.settings.store_dir is None
+        return self.settings.store_dir is None
 
     @abc.abstractmethod
     def path_exists(self, path: str) -> bool:
@@ -49,6 +65,126 @@ class PyStoreDBEngine(abc.ABC):
     def update(self, path: str, data: Json):
         pass
 
+    def commit(self, writes: list[tuple[str, str, Json | None]]):
+        """
+        Apply a batch of writes, each write is a ``(operation, path, data)`` tuple where operation is
+        one of ``SET``, ``UPDATE`` or ``DELETE`` (data is None for deletes).
+        Engines should override it to validate the batch once with ``_plan_writes`` and persist it with a single save.
+        """
+        for op, path, data in writes:
+            if op == self.SET:
+                self.set(path, data)
+            elif op == self.UPDATE:
+                self.update(path, data)
+            elif op == self.DELETE:
+                self.delete(path)
+            else:
+                raise ValueError(f'Unknown write operation {op}')
+
+    def _plan_writes(self, writes: list[tuple[str, str, Json | None]]) -> list[tuple[str, str, Json | None]]:
+        """
+        Validate a batch of writes before any of them is applied, so a bad write leaves the store unchanged. The
+        documents set or deleted by earlier writes of the batch are taken into account, deletes of missing documents
+        are dropped with a warning. Returns the writes to apply.
+        """
+        existing = {}
+        planned = []
+        for op, path, data in writes:
+            exists = existing[path] if path in existing else self.doc_exists(path)
+            if op == self.SET:
+                validate_data(data)
+                existing[path] = True
+            elif op == self.UPDATE:
+                validate_data(data)
+                if not exists:
+                    raise PyStoreDBPathError(path, "'%s' can't be updated, the document doesn't exist")
+            elif op == self.DELETE:
+                if not exists:
+                    warnings.warn(f"Document {path} does not exist")
+                    continue
+                existing[path] = False
+            else:
+                raise ValueError(f'Unknown write operation {op}')
+            planned.append((op, path, data))
+        return planned
+
+    def stream_collection(self, path: str, **kwargs) -> Iterator[tuple[str, Json]]:
+        """
+        Iterate over the ``(id, data)`` of the documents matching the query on the collection at path, engines
+        override it to read the documents as they are consumed
+        """
+        yield from self.get_collection(path, **kwargs).items()
+
+    def count_collection(self, path: str, **kwargs) -> int:
+        """
+        Count the documents matching the query on the collection at path, engines override it to count them
+        without reading them all
+        """
+        return len(self.get_collection(path, **kwargs))
+
+    def aggregate_collection(self, path: str, aggregations: dict[str, Aggregation], **kwargs) -> dict[str, Any]:
+        """
+        Compute the aggregations over the documents matching the query on the collection at path, in a single
+        pass over the decoded documents. The aggregations read the documents, not the fields selected by the query
+        """
+        kwargs.pop('select', None)
+        return accumulate(lambda: self.stream_collection(path, **kwargs), aggregations)
+
+    def group_collection(self, path: str, fields: list[FieldPath], aggregations: dict[str, Aggregation],
+                         group_order_by: list[tuple[FieldPath, bool]] = None, group_limit: int = None,
+                         **kwargs) -> list[dict[str, Any]]:
+        """
+        Compute the aggregations per group of the documents matching the query on the collection at path, the documents
+        are hashed to their group by the values of fields in a single pass. The groups are ordered by the
+        ``(field, descending)`` of group_order_by, fields being group fields or aggregation keys, and limited to
+        group_limit groups. The groups and aggregations read the documents, not the fields selected by the query
+        """
+        kwargs.pop('select', None)
+        groups = accumulate_groups(lambda: self.stream_collection(path, **kwargs), fields, aggregations)
+        return order_groups(groups, group_order_by, group_limit)
+
+    def explain(self, path: str, analyze=False, **kwargs) -> dict[str, Any]:
+        """
+        Get the plan of the query on the collection at path: how the documents are accessed (``scan``, ``index`` or
+        ``index-range``), the indexes and lookups pushed down to them and the filter, sort, cursor and limit strategies.
+        With analyze the query is run and the plan gets the documents examined, decoded and returned and the
+        time spent in each stage
+        """
+        plan = {'engine': self.__class__.__name__, 'path': path, 'access': 'scan', 'index': None, 'pushdown': []}
+        stats = QueryStats() if analyze else None
+        with stage(stats, 'total'):
+            result = self._query(path, kwargs, plan, stats, execute=analyze)
+        if analyze:
+            stats.returned = len(result)
+            plan['stats'] = stats.to_dict()
+        return plan
+
+    def _query(self, path: str, kwargs: dict, plan: dict = None, stats=None, execute=True):
+        """
+        Run the query on the collection at path, plan records how it is run and stats what it costs,
+        only the plan is filled when execute is False
+        """
+        raise PyStoreDBError(f'{self.__class__.__name__} does not support query plans')
+
+    def create_index(self, path: str, fields: list[tuple[str, bool]]):
+        """
+        Create a secondary index on the ``(field, descending)`` fields of the documents of the collection at path,
+        the definition is persisted with the store and the index is used by the queries it can serve
+        """
+        raise PyStoreDBError(f'{self.__class__.__name__} does not support secondary indexes')
+
+    def drop_index(self, path: str, fields: list[tuple[str, bool]]):
+        """
+        Drop the secondary index on the ``(field, descending)`` fields of the collection at path
+        """
+        raise PyStoreDBError(f'{self.__class__.__name__} does not support secondary indexes')
+
+    def get_indexes(self, path: str) -> list[list[tuple[str, bool]]]:
+        """
+        Get the ``(field, descending)`` fields of the indexes of the collection at path
+        """
+        return []
+
     @abc.abstractmethod
     def create_database_if_not_exists(self):
         pass
@@ -65,6 +201,12 @@ class PyStoreDBEngine(abc.ABC):
     def save(self):
         pass
 
+    def close(self):
+        """
+        Release the resources held by the engine, changes not yet persisted must be saved
+        """
+        pass
+
     @abc.abstractmethod
     def doc_exists(self, path) -> bool:
         pass
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import abc
+import contextlib
+import threading
+from typing import Any, Iterable, Iterator, Optional
+
+from PyStoreDB._utils import validate_data, validate_path, is_valid_document, is_valid_collection, path_segments
+from PyStoreDB.constants import Json
+from PyStoreDB.core import FieldPath
+from PyStoreDB.core.filters import referenced_fields
+from PyStoreDB.engines._raw import utils, query
+from PyStoreDB.engines._raw.flusher import Flusher
+from PyStoreDB.engines.base import PyStoreDBEngine
+from PyStoreDB.engines.stats import QueryStats, stage
+from PyStoreDB.errors import PyStoreDBPathError
+
+__all__ = ['PyStoreDBKeyValueEngine']
+
+
+class PyStoreDBKeyValueEngine(PyStoreDBEngine, abc.ABC):
+    """Base class for engines storing documents as records keyed by their path.
+
+    Subclasses only implement a handful of storage primitives working on document paths
+    (``/users/u1``) and encoded document data (the ``__data__`` payload of the raw engine,
+    where dict and datetime values are wrapped in ``__meta__`` envelopes), the document and
+    collection semantics of `PyStoreDBEngine` are implemented on top of them.
+
+    Engines buffering their writes implement `flush` and call `_start_flusher` once initialized,
+    `save` then follows the ``durability`` setting like the raw engine does.
+    """
+
+    def __init__(self, store_name: str, **kwargs):
+        super().__init__(store_name, **kwargs)
+        self._lock = threading.RLock()
+        self._flusher = None
+        self.query_engine = query.PyStoreDBRawQuery()
+
+    @abc.abstractmethod
+    def _get(self, path: str) -> Optional[Json]:
+        """Returns the encoded data of the document at path or None."""
+        pass
+
+    @abc.abstractmethod
+    def _put(self, path: str, data: Json):
+        """Stores the encoded data of the document at path."""
+        pass
+
+    @abc.abstractmethod
+    def _remove(self, path: str):
+        """Removes the document at path."""
+        pass
+
+    @abc.abstractmethod
+    def _children(self, path: str) -> Iterable[tuple[str, Json]]:
+        """Yields the (id, encoded data) of the documents directly in the collection at path."""
+        pass
+
+    @abc.abstractmethod
+    def _scan(self, path: str) -> Iterable[tuple[str, Json]]:
+        """Yields the (path, encoded data) of the documents at or below path, every document if path is empty."""
+        pass
+
+    @abc.abstractmethod
+    def _drop(self):
+        """Removes every document."""
+        pass
+
+    def _has_descendants(self, path: str) -> bool:
+        prefix = path.rstrip('/') + '/'
+        return any(doc_path.startswith(prefix) for doc_path, _ in self._scan(path))
+
+    def _transaction(self):
+        """Context manager grouping the writes of a batch, engines may override it."""
+        return contextlib.nullcontext()
+
+    def _start_flusher(self):
+        if self.settings.durability != 'sync':
+            max_pending = self.settings.group_commit_size if self.settings.durability == 'group' else None
+            self._flusher = Flusher(self.flush, self.settings.flush_interval, max_pending)
+            self._flusher.start()
+
+    def save(self):
+        if self._flusher is None:
+            self.flush()
+        else:
+            self._flusher.mark_dirty()
+
+    def flush(self):
+        """Persists the buffered writes, called by `save` or by the background flusher."""
+        pass
+
+    def close(self):
+        if self._flusher is not None:
+            flusher, self._flusher = self._flusher, None
+            flusher.stop()
+
+    def path_exists(self, path: str) -> bool:
+        return self.doc_exists(path) or self._has_descendants(path)
+
+    def doc_exists(self, path) -> bool:
+        return self._get(path) is not None
+
+    def get_document(self, path: str) -> Json:
+        data = self._get(path)
+        if data is None:
+            raise PyStoreDBPathError(path, "'%s' doesn't point to an existing document")
+        return utils.decode_document_data({utils.DATA_KEY: data})
+
+    def get_field(self, path: str, field: str | FieldPath, default=None) -> Any:
+        if field == FieldPath.document_id:
+            return path.split('/')[-1]
+        return self.get_document(path).get(field if isinstance(field, str) else field.path, default)
+
+    def get_collection(self, path: str, **kwargs) -> dict[str, Json]:
+        return self._query(path, kwargs)
+
+    def stream_collection(self, path: str, **kwargs) -> Iterator[tuple[str, Json]]:
+        fields = self.query_engine.decoded_fields(**kwargs)
+        rows = (
+            (doc_id, utils.decode_document_data({utils.DATA_KEY: doc}, fields)) for doc_id, doc in self._children(path)
+        )
+        return self.query_engine.stream_query_filters(rows, **kwargs)
+
+    def count_collection(self, path: str, **kwargs) -> int:
+        rows = self._children(path)
+        if kwargs.get('filters') or 'order_by' in kwargs:
+            # unfiltered counts don't decode the documents, unordered ones only decode the fields of the filters
+            fields = None if 'order_by' in kwargs else sorted(referenced_fields(kwargs['filters']))
+            rows = ((doc_id, utils.decode_document_data({utils.DATA_KEY: doc}, fields)) for doc_id, doc in rows)
+        return self.query_engine.count_query_filters(rows, **kwargs)
+
+    def _query(self, path: str, kwargs: dict, plan: dict = None, stats: QueryStats = None, execute=True):
+        if plan is not None:
+            plan.update(self.query_engine.describe(**kwargs))
+        if not execute:
+            return None
+        fields = self.query_engine.decoded_fields(**kwargs)
+        with stage(stats, 'decode'):
+            data = {
+                doc_id: utils.decode_document_data({utils.DATA_KEY: doc}, fields)
+                for doc_id, doc in self._children(path)
+            }
+        if stats is not None:
+            stats.examined += len(data)
+            stats.decoded += len(data)
+        return self.query_engine.apply_query_filters(data, stats=stats, **kwargs)
+
+    def get_raw(self, path: str):
+        if path != '':
+            validate_path(path)
+            if not (is_valid_collection(path, throw_error=False) or is_valid_document(path, throw_error=False)):
+                raise PyStoreDBPathError(f'Invalid path: {path}\nThis path doesn\'t point at a document or collection')
+        root = {}
+        depth = len(path_segments(path)) if path else 0
+        found = False
+        for doc_path, doc in self._scan(path):
+            found = True
+            node = utils.create_nested_dict('/'.join(path_segments(doc_path)[depth:]), root)
+            node[utils.DATA_KEY] = doc
+        if path and not found:
+            raise PyStoreDBPathError(path)
+        return utils.decode_all_data(root)
+
+    def set(self, path: str, data: Json):
+        validate_data(data)
+        with self._lock:
+            self._put(path, utils.encode_data(data)[utils.DATA_KEY])
+        self.save()
+
+    def update(self, path: str, data: Json):
+        validate_data(data)
+        with self._lock:
+            self._update(path, data)
+        self.save()
+
+    def _update(self, path: str, data: Json):
+        item = self._get(path)
+        if item is None:
+            raise PyStoreDBPathError(path, "'%s' can't be updated, the document doesn't exist")
+        item = dict(item)
+        utils.update_data({utils.DATA_KEY: item}, data)
+        self._put(path, item)
+
+    def delete(self, path: str):
+        with self._lock:
+            if not self.path_exists(path):
+                raise PyStoreDBPathError(path)
+            self._remove(path)
+        self.save()
+
+    def commit(self, writes: list[tuple[str, str, Json | None]]):
+        with self._lock:
+            planned = self._plan_writes(writes)
+            with self._transaction():
+                for op, path, data in planned:
+                    if op == self.SET:
+                        self._put(path, utils.encode_data(data)[utils.DATA_KEY])
+                    elif op == self.UPDATE:
+                        self._update(path, data)
+                    else:
+                        self._remove(path)
+        self.save()
+
+    def clear(self):
+        with self._lock:
+            self._drop()
+        self.save()
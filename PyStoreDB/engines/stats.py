@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import contextlib
+import time
+from typing import Any, Optional
+
+__all__ = ['QueryStats', 'stage']
+
+
+class QueryStats:
+    """Counters and per stage timings (in seconds) of a query run by explain(analyze=True)."""
+
+    def __init__(self):
+        self.examined = 0
+        self.decoded = 0
+        self.returned = 0
+        self.timings: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0) + time.perf_counter() - start
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'examined': self.examined,
+            'decoded': self.decoded,
+            'returned': self.returned,
+            'timings': dict(self.timings),
+        }
+
+
+def stage(stats: Optional[QueryStats], name: str):
+    """Times a stage of a query when it is analyzed."""
+    return contextlib.nullcontext() if stats is None else stats.stage(name)
@@ -0,0 +1,74 @@
+"""Converts the file of a store from a codec to another.
+
+Usage::
+
+    python -m PyStoreDB.migrate STORE_DIR STORE_NAME --from json --to binary+zlib
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+from PyStoreDB.engines._raw import utils, wal
+from PyStoreDB.engines._raw.codecs import get_codec
+
+__all__ = ['migrate_store', 'main']
+
+
+def migrate_store(store_dir: str, store_name: str, source: str, target: str) -> str:
+    """Rewrites the file of a raw engine store with another codec.
+
+    The write-ahead log of the store, if any, is folded into the new file. The store must not
+    be opened while it is migrated.
+
+    Args:
+        store_dir (str): The directory of the store.
+        store_name (str): The name of the store.
+        source (str): The codec the store is currently saved with.
+        target (str): The codec to save the store with.
+
+    Returns:
+        str: The path of the new store file.
+
+    Raises:
+        FileNotFoundError: If the store has no file for the source codec.
+        ValueError: If a codec is unknown.
+    """
+    source_codec, target_codec = get_codec(source), get_codec(target)
+    source_file = os.path.join(store_dir, store_name + source_codec.extension)
+    target_file = os.path.join(store_dir, store_name + target_codec.extension)
+    if not os.path.exists(source_file):
+        raise FileNotFoundError(source_file)
+    log = wal.WriteAheadLog(os.path.join(store_dir, f'{store_name}.wal'))
+    data = log.replay(utils.load_db(source_file, source_codec))
+
+    with open(target_file + '.tmp', 'wb') as f:
+        f.write(utils.dump_database(data, target_codec))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(target_file + '.tmp', target_file)
+    if source_file != target_file:
+        os.remove(source_file)
+    log.remove()
+    return target_file
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m PyStoreDB.migrate', description=__doc__.splitlines()[0])
+    parser.add_argument('store_dir', help='directory of the store')
+    parser.add_argument('store_name', help='name of the store')
+    parser.add_argument('--from', dest='source', default='json', help="current codec of the store (default: json)")
+    parser.add_argument('--to', dest='target', required=True, help="new codec of the store, e.g. 'binary+zlib'")
+    args = parser.parse_args(argv)
+    try:
+        path = migrate_store(args.store_dir, args.store_name, args.source, args.target)
+    except (FileNotFoundError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    print(f'{args.store_name} migrated to {args.target}: {path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,39 @@
+import os
 import uuid
 from unittest import TestCase
 
 from PyStoreDB import PyStoreDB
 from PyStoreDB.conf import PyStoreDBSettings
+from PyStoreDB.engines import PyStoreDBRawEngine
 
 
 class PyStoreDBTestCase(TestCase):
     """Test case for PyStoreDB functionality."""
 
     store_dir = ':memory:'
+    engine_class = PyStoreDBRawEngine
+    settings_options = {}
 
     @classmethod
     def setUpClass(cls):
         """Set up the test class by initializing PyStoreDB settings and instance."""
-        PyStoreDB.settings = PyStoreDBSettings(store_dir=cls.store_dir)
+        PyStoreDB.settings = PyStoreDBSettings(
+            store_dir=cls.store_dir, engine_class=cls.engine_class, **cls.settings_options
+        )
         if not PyStoreDB.is_initialised:
             PyStoreDB.initialize()
+        if cls.store_dir != ':memory:':
+            os.makedirs(cls.store_dir, exist_ok=True)
         cls.store = PyStoreDB.get_instance(uuid.uuid4().hex)
 
+    @classmethod
+    def reopen_store(cls):
+        """Close the store and open it again so its content is reloaded by a new engine."""
+        name = cls.store.name
+        cls.store.close()
+        cls.store = PyStoreDB.get_instance(name)
+        return cls.store
+
     def tearDown(self):
         """Clear the store after each test."""
         self.store.clear()
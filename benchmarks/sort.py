@@ -0,0 +1,48 @@
+"""Times the in-memory sort of the raw query engine.
+
+Usage: python benchmarks/sort.py [documents] [repeat]
+"""
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from PyStoreDB.core import FieldPath
+from PyStoreDB.engines._raw.query import PyStoreDBRawQuery
+
+CASES = {
+    'age': [('age', False)],
+    'age desc': [('age', True)],
+    'name desc': [('name', True)],
+    'country, age desc': [('country', False), ('age', True)],
+    'country desc, joined, id': [('country', True), ('joined', False), (FieldPath.document_id, False)],
+}
+
+
+def documents(n: int) -> dict:
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    return {
+        f'doc{i}': {
+            'name': f'user{rng.randrange(n)}',
+            'age': rng.randrange(18, 90),
+            'country': rng.choice(('FR', 'UK', 'US', 'CM', 'DE')),
+            'joined': start + timedelta(minutes=rng.randrange(10 ** 6)),
+        }
+        for i in range(n)
+    }
+
+
+def main(n=100_000, repeat=5):
+    data = documents(n)
+    engine = PyStoreDBRawQuery()
+    print(f'{n} documents, best of {repeat}')
+    for name, orders in CASES.items():
+        orders = [(field if isinstance(field, FieldPath) else FieldPath(field), desc) for field, desc in orders]
+        best = min(timeit.repeat(lambda: engine.apply_query_filters(dict(data), order_by=orders), number=1,
+                                 repeat=repeat))
+        print(f'  order_by {name:<28} {best * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
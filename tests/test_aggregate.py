@@ -1,8 +1,11 @@
+import random
+import statistics
 import unittest
 from unittest.mock import MagicMock
 
 from PyStoreDB.core import FieldPath, QueryDocumentSnapshot
-from PyStoreDB.core.aggregate import Count, Sum, Min, Max, Mode, Variance, Median, StdDev, Avg
+from PyStoreDB.core.aggregate import Count, Sum, Min, Max, Mode, Variance, Median, StdDev, Avg, accumulate, \
+    accumulate_groups
 
 
 class TestAggregation(unittest.TestCase):
@@ -153,6 +156,74 @@ class TestAggregation(unittest.TestCase):
         result = avg_aggregation.apply(docs_with_single_value)
         self.assertEqual(result, 5)
 
+    def test_count_without_field(self):
+        self.assertEqual(Count().apply(self.docs), 4)
+
+    def test_accumulate(self):
+        rows = [('a', {'x': 2, 'y': 'b'}), ('b', {'x': 4}), ('c', {'x': None, 'y': 'b'}), ('d', {'x': 4, 'y': 'c'})]
+        result = accumulate(lambda: rows, {
+            'n': Count(), 'y': Count('y', distinct=True), 'ids': Count(FieldPath.document_id), 'total': Sum('x'),
+            'avg': Avg('x'), 'mode': Mode('x'), 'min': Min('x'),
+        })
+        self.assertEqual(result, {'n': 4, 'y': 2, 'ids': 4, 'total': 10, 'avg': 10 / 3, 'mode': 4, 'min': 2})
+
+    def test_accumulate_groups(self):
+        rows = [('a', {'c': 'x', 'v': 1}), ('b', {'c': 'y', 'v': 5}), ('c', {'c': 'x', 'v': 3}), ('d', {'v': 7}),
+                ('e', {'c': 'x', 'v': 2})]
+        scans = []
+
+        def scan():
+            scans.append(rows)
+            return iter(rows)
+
+        result = accumulate_groups(scan, [FieldPath('c')], {'n': Count(), 'total': Sum('v'), 'median': Median('v', 2)})
+        self.assertEqual(result, [
+            {'c': 'x', 'n': 3, 'total': 6, 'median': 2},
+            {'c': 'y', 'n': 1, 'total': 5, 'median': 5},
+            {'c': None, 'n': 1, 'total': 7, 'median': 7},
+        ])
+        # only the group x doesn't fit in the median state and needs more passes
+        self.assertGreater(len(scans), 1)
+        self.assertEqual(accumulate_groups(lambda: [], [FieldPath('c')], {'n': Count()}), [])
+
+    def test_merge(self):
+        values = [3, 1.5, None, 8, 2, 2, 10, -4, 7]
+        for aggregation in (Count('x'), Count('x', distinct=True), Sum('x'), Min('x'), Max('x'), Mode('x'),
+                            Avg('x'), Variance('x'), StdDev('x'), Median('x')):
+            for cut in range(len(values) + 1):
+                parts = []
+                for part in (values[:cut], values[cut:]):
+                    state = aggregation.init()
+                    for value in part:
+                        state = aggregation.step(state, value)
+                    parts.append(state)
+                expected = aggregation.apply([MagicMock(spec=QueryDocumentSnapshot, **{'get.return_value': value})
+                                              for value in values])
+                self.assertAlmostEqual(aggregation.finalize(aggregation.merge(*parts)), expected, places=9)
+
+    def test_welford_precision(self):
+        values = [1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16]
+        rows = [(str(i), {'x': value}) for i, value in enumerate(values)]
+        result = accumulate(lambda: rows, {'avg': Avg('x'), 'variance': Variance('x'), 'sd': StdDev('x')})
+        self.assertEqual(result, {'avg': 1e9 + 10, 'variance': 30.0, 'sd': 30 ** 0.5})
+
+    def test_median_selection(self):
+        rng = random.Random(42)
+        scans = []
+        for values in ([rng.random() for _ in range(1000)], list(range(999, -1, -1)), [1, 2] * 300 + [3],
+                       [rng.randrange(5) for _ in range(1000)]):
+            rows = [(str(i), {'x': value}) for i, value in enumerate(values)]
+
+            def scan():
+                scans.append(rows)
+                return iter(rows)
+
+            self.assertEqual(accumulate(scan, {'median': Median('x', max_values=16)})['median'],
+                             statistics.median(values))
+        # the values don't fit in memory, the median is selected in several passes
+        self.assertGreater(len(scans), 4)
+        self.assertEqual(Median('x', max_values=None).apply(self.docs), 4)
+
 
 if __name__ == '__main__':
     unittest.main()
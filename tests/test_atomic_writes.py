@@ -0,0 +1,64 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+from PyStoreDB import PyStoreDB
+from PyStoreDB.conf import PyStoreDBSettings
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class AtomicWritesTestCase(PyStoreDBTestCase):
+    store_dir = 'test_store_atomic'
+
+    def tearDown(self):
+        PyStoreDB.settings.fsync = 'checkpoint'
+        PyStoreDB.settings.wal = False
+        self.reopen_store()
+        super().tearDown()
+
+    @property
+    def store_file(self):
+        return os.path.join(os.path.abspath(self.store_dir), f'{self.store.name}.json')
+
+    def read_store_file(self):
+        with open(self.store_file) as f:
+            return json.load(f)
+
+    def test_interrupted_write_keeps_previous_snapshot(self):
+        john = self.store.collection('users').add({'name': 'John'})
+        with mock.patch('os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.store.collection('users').add({'name': 'Jane'})
+        self.assertEqual(list(self.read_store_file()['users']), [john.id])
+
+        self.store.collection('users').add({'name': 'Alice'})
+        self.assertEqual(len(self.read_store_file()['users']), 3)
+        self.assertFalse(os.path.exists(self.store_file + '.tmp'))
+
+    def count_fsyncs(self, write):
+        with mock.patch('os.fsync') as fsync:
+            write()
+        return fsync.call_count
+
+    def test_fsync_policies(self):
+        users = self.store.collection('users')
+        self.assertGreater(self.count_fsyncs(lambda: users.add({'name': 'John'})), 0)
+        PyStoreDB.settings.fsync = 'never'
+        self.assertEqual(self.count_fsyncs(lambda: users.add({'name': 'Jane'})), 0)
+
+    def test_fsync_policies_with_wal(self):
+        PyStoreDB.settings.wal = True
+        for policy, log_fsyncs in (('checkpoint', False), ('always', True)):
+            PyStoreDB.settings.fsync = policy
+            store = self.reopen_store()
+            self.assertEqual(self.count_fsyncs(lambda: store.collection('users').add({'name': 'John'})) > 0, log_fsyncs)
+            self.assertGreater(self.count_fsyncs(store._delegate.engine.checkpoint), 0)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            PyStoreDBSettings(fsync='sometimes')
+
+
+if __name__ == '__main__':
+    unittest.main()
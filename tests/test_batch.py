@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import patch
+
+from PyStoreDB.errors import PyStoreDBPathError, PyStoreDBUnsupportedTypeError
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class User:
+    def __init__(self, name: str):
+        self.name = name
+
+    def to_dict(self):
+        return {'name': self.name}
+
+
+class WriteBatchTestCase(PyStoreDBTestCase):
+
+    @property
+    def engine(self):
+        return self.store._delegate.engine
+
+    def test_commit(self):
+        users = self.store.collection('users')
+        john = users.add({'name': 'John', 'age': 25})
+        jane = users.doc()
+        bob = users.doc()
+
+        batch = self.store.batch()
+        batch.set(jane, {'name': 'Jane'}, age=20)
+        batch.set(bob, {'name': 'Bob'})
+        batch.update(john, age=26)
+        batch.delete(bob)
+        self.assertFalse(jane.get().exists)
+        batch.commit()
+
+        self.assertEqual(jane.get().data, {'name': 'Jane', 'age': 20})
+        self.assertEqual(john.get().get('age'), 26)
+        self.assertFalse(bob.get().exists)
+
+    def test_commit_saves_once(self):
+        users = self.store.collection('users')
+        with patch.object(self.engine, 'save') as save:
+            with self.store.batch() as batch:
+                for i in range(100):
+                    batch.set(users.doc(), {'index': i})
+        save.assert_called_once()
+        self.assertEqual(users.get().size, 100)
+
+    def test_context_manager_does_not_commit_on_error(self):
+        user = self.store.collection('users').doc()
+        with self.assertRaises(RuntimeError):
+            with self.store.batch() as batch:
+                batch.set(user, {'name': 'John'})
+                raise RuntimeError
+        self.assertFalse(user.get().exists)
+
+    def test_invalid_batch_leaves_store_unchanged(self):
+        users = self.store.collection('users')
+        john = users.doc()
+        batch = self.store.batch().set(john, {'name': 'John'}).set(users.doc(), {'name': object()})
+        with self.assertRaises(PyStoreDBUnsupportedTypeError):
+            batch.commit()
+        self.assertFalse(john.get().exists)
+
+        batch = self.store.batch().set(john, {'name': 'John'}).update(users.doc('unknown'), name='Jane')
+        with self.assertRaises(PyStoreDBPathError):
+            batch.commit()
+        self.assertFalse(john.get().exists)
+
+    def test_update_document_created_in_batch(self):
+        user = self.store.collection('users').doc()
+        self.store.batch().set(user, {'name': 'John'}).update(user, age=25).commit()
+        self.assertEqual(user.get().data, {'name': 'John', 'age': 25})
+
+    def test_delete_unknown_document(self):
+        user = self.store.collection('users').doc('unknown')
+        with self.assertWarns(UserWarning):
+            self.store.batch().delete(user).commit()
+
+    def test_with_converter(self):
+        users = self.store.collection('users').with_converter(
+            from_json=lambda snapshot: User(snapshot['name']),
+            to_json=lambda user: user.to_dict()
+        )
+        user = users.doc()
+        self.store.batch().set(user, User('John')).commit()
+        self.assertEqual(user.get().data.name, 'John')
+
+    def test_commit_twice(self):
+        batch = self.store.batch()
+        batch.commit()
+        with self.assertRaises(AssertionError):
+            batch.commit()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import unittest
+
+import test_collections
+import test_document
+import test_persistence
+from PyStoreDB.engines import PyStoreDBBitcaskEngine
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class BitcaskEngineMixin:
+    store_dir = 'test_store_bitcask'
+    engine_class = PyStoreDBBitcaskEngine
+
+
+class BitcaskDocumentCRUDTestCase(BitcaskEngineMixin, test_document.DocumentCRUDTestCase):
+    pass
+
+
+class BitcaskCollectionQueryTestCase(BitcaskEngineMixin, test_collections.CollectionQueryTestCase):
+    pass
+
+
+class BitcaskPersistenceTestCase(BitcaskEngineMixin, test_persistence.PersistenceTestCase):
+    settings_options = {'engine_options': {'max_file_size': 1024}}
+
+
+class BitcaskEngineTestCase(BitcaskEngineMixin, PyStoreDBTestCase):
+    settings_options = {'engine_options': {'max_file_size': 1024, 'merge_min_size': 10 ** 9}}
+
+    @property
+    def engine(self):
+        return self.store._delegate.engine
+
+    def files(self, extension):
+        return sorted(name for name in os.listdir(self.engine._dir) if name.endswith(extension))
+
+    def test_data_files_are_rotated(self):
+        users = self.store.collection('users')
+        for i in range(50):
+            users.add({'name': 'John Doe', 'index': i})
+        self.assertGreater(len(self.files('.data')), 1)
+        self.assertEqual([doc['index'] for doc in users.get().docs], list(range(50)))
+
+    def test_merge(self):
+        users = self.store.collection('users')
+        docs = [users.add({'index': i}) for i in range(20)]
+        for doc in docs[:10]:
+            doc.delete()
+        for doc in docs[10:]:
+            doc.update(index=doc.get()['index'] * 2)
+        dead_bytes = self.engine._dead_bytes
+        self.assertGreater(dead_bytes, 0)
+
+        self.engine.merge()
+        self.assertEqual(self.engine._dead_bytes, 0)
+        self.assertEqual(len(self.files('.hint')), 1)
+        self.assertEqual(len(self.files('.data')), 2)  # the merged file and the new active file
+
+        users.add({'index': 100})
+        store = self.reopen_store()
+        self.assertEqual([doc['index'] for doc in store.collection('users').get().docs],
+                         [i * 2 for i in range(10, 20)] + [100])
+
+    def test_merge_is_triggered_by_stale_bytes(self):
+        self.engine.merge_min_size = 200
+        doc = self.store.collection('users').add({'index': 0})
+        for i in range(20):
+            doc.update(index=i)
+        self.assertLess(self.engine._dead_bytes, 200)
+        self.assertEqual(len(self.files('.hint')), 1)
+        self.assertEqual(doc.get()['index'], 19)
+
+    def test_torn_record_is_dropped(self):
+        users = self.store.collection('users')
+        john = users.add({'name': 'John'})
+        data_file = os.path.join(self.engine._dir, self.files('.data')[-1])
+        size = os.path.getsize(data_file)
+        users.add({'name': 'Jane'})
+        self.engine.close()
+        with open(data_file, 'r+b') as f:
+            f.truncate(os.path.getsize(data_file) - 3)
+
+        store = self.reopen_store()
+        self.assertEqual([doc.id for doc in store.collection('users').get().docs], [john.id])
+        self.assertEqual(os.path.getsize(data_file), size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import struct
+import unittest
+
+import test_collections
+import test_document
+import test_persistence
+from PyStoreDB.engines import PyStoreDBBTreeEngine
+from PyStoreDB.engines._btree.pages import Internal
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class BTreeEngineMixin:
+    store_dir = 'test_store_btree'
+    engine_class = PyStoreDBBTreeEngine
+
+
+class BTreeDocumentCRUDTestCase(BTreeEngineMixin, test_document.DocumentCRUDTestCase):
+    pass
+
+
+class BTreeCollectionQueryTestCase(BTreeEngineMixin, test_collections.CollectionQueryTestCase):
+    settings_options = {'engine_options': {'page_size': 512}}
+
+
+class BTreePersistenceTestCase(BTreeEngineMixin, test_persistence.PersistenceTestCase):
+    settings_options = {'engine_options': {'page_size': 512}}
+
+
+class BTreeEngineTestCase(BTreeEngineMixin, PyStoreDBTestCase):
+    settings_options = {'engine_options': {'page_size': 512, 'cache_pages': 4}}
+
+    @property
+    def engine(self):
+        return self.store._delegate.engine
+
+    @property
+    def file(self):
+        return os.path.join(os.path.abspath(self.store_dir), f'{self.store.name}.btree')
+
+    def test_tree_grows_and_pages_are_evicted(self):
+        users = self.store.collection('users')
+        docs = [users.add({'name': 'John Doe', 'index': i}) for i in range(200)]
+        self.assertIsInstance(self.engine._pager.get(self.engine._pager.header.root), Internal)
+        self.assertLessEqual(len(self.engine._pager._cache), 4)
+        self.assertEqual([doc['index'] for doc in users.get().docs], list(range(200)))
+        self.assertEqual(docs[123].get()['index'], 123)
+
+    def test_large_documents_use_overflow_pages(self):
+        doc = self.store.collection('users').add({'bio': 'a' * 5000})
+        doc.update(bio='b' * 3000)
+        free_head = self.engine._pager.header.free_head
+        self.assertNotEqual(free_head, 0)
+        doc.update(bio='c' * 3000)
+        self.assertEqual(self.reopen_store().doc(doc.path).get()['bio'], 'c' * 3000)
+
+    def test_split_leaves_fit_in_pages(self):
+        # the large documents all land in the upper half of a split by entry count, which overflowed its page
+        users = self.store.collection('u')
+        for i in range(4):
+            users.doc(f'a{i}').set({'i': i})
+        for i in range(4):
+            users.doc(f'b{i}').set({'bio': str(i) * 100})
+        store = self.reopen_store()
+        self.assertEqual([doc.id for doc in store.collection('u').get().docs], [
+            'a0', 'a1', 'a2', 'a3', 'b0', 'b1', 'b2', 'b3',
+        ])
+        self.assertEqual(store.collection('u').doc('b3').get()['bio'], '3' * 100)
+
+    def test_interrupted_flush_is_rolled_back(self):
+        john = self.store.collection('users').add({'name': 'John'})
+        self.store._delegate.engine.close()
+        with open(self.file, 'rb') as f:
+            content = f.read()
+        page_size = 512
+        journal = struct.pack('>I', len(content) // page_size) + b''.join(
+            struct.pack('>I', page_id) + content[page_id * page_size:(page_id + 1) * page_size]
+            for page_id in range(len(content) // page_size)
+        )
+        with open(self.file + '-journal', 'wb') as f:
+            f.write(journal)
+        with open(self.file, 'r+b') as f:
+            f.seek(page_size)
+            f.write(b'\xff' * page_size * 3)
+
+        store = self.reopen_store()
+        self.assertEqual(store.doc(john.path).get().data, {'name': 'John'})
+        self.assertEqual(os.path.getsize(self.file), len(content))
+        self.assertFalse(os.path.exists(self.file + '-journal'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import test_document
+from PyStoreDB import PyStoreDB
+from PyStoreDB.conf import PyStoreDBSettings
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.engines._raw.codecs import get_codec
+from PyStoreDB.errors import PyStoreDBError
+from PyStoreDB.migrate import main, migrate_store
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class CodecTestCase(unittest.TestCase):
+    raw_db = {
+        'users': {
+            'u1': {
+                utils.DATA_KEY: utils.encode_data({
+                    'name': 'Jöhn',
+                    'age': 25,
+                    'big': 2 ** 70,
+                    'score': -1.5,
+                    'active': True,
+                    'deleted': False,
+                    'nothing': None,
+                    'tags': ['a', 1, [2.5, None]],
+                    'address': {'city': 'Paris', 'geo': {'lat': 1.0}},
+                    'birthday': datetime(1999, 1, 1, 12, 30, 15, 123),
+                    'last_login': datetime(2024, 5, 4, 8, 0, tzinfo=timezone(timedelta(hours=-5, minutes=-30))),
+                })[utils.DATA_KEY],
+                'posts': {'p1': {utils.DATA_KEY: {'title': 'Hello'}}},
+            },
+            'u2': {},
+        }
+    }
+
+    def test_round_trip(self):
+        for name in ('json', 'compact-json', 'binary', 'json+zlib', 'binary+lzma', 'compact-json+zlib+lzma'):
+            with self.subTest(codec=name):
+                codec = get_codec(name)
+                self.assertEqual(codec.decode(codec.encode(self.raw_db)), self.raw_db)
+
+    def test_compact_formats_are_smaller(self):
+        sizes = {name: len(get_codec(name).encode(self.raw_db)) for name in ('json', 'compact-json', 'binary')}
+        self.assertLess(sizes['compact-json'], sizes['json'])
+        self.assertLess(sizes['binary'], sizes['json'])
+
+    def test_binary_uses_native_tags(self):
+        self.assertNotIn(utils.META_KEY.encode(), get_codec('binary').encode(self.raw_db))
+
+    def test_extensions(self):
+        self.assertEqual(get_codec('json').extension, '.json')
+        self.assertEqual(get_codec('binary+zlib').extension, '.psdb.z')
+        self.assertEqual(get_codec('binary+zlib').name, 'binary+zlib')
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            get_codec('xml')
+        with self.assertRaises(ValueError):
+            get_codec('json+zip')
+        with self.assertRaises(ValueError):
+            PyStoreDBSettings(codec='xml')
+
+
+class BinaryCodecDocumentCRUDTestCase(test_document.DocumentCRUDTestCase):
+    store_dir = 'test_store_binary'
+    settings_options = {'codec': 'binary+zlib'}
+
+
+class CodecStoreTestCase(PyStoreDBTestCase):
+    store_dir = 'test_store_codecs'
+    settings_options = {'codec': 'binary'}
+
+    def tearDown(self):
+        PyStoreDB.settings.codec = 'binary'
+        super().tearDown()
+
+    def store_file(self, extension):
+        return os.path.join(os.path.abspath(self.store_dir), self.store.name + extension)
+
+    def test_store_file_uses_codec(self):
+        user = self.store.collection('users').add({'name': 'John', 'birthday': datetime(1999, 1, 1)})
+        self.assertTrue(os.path.exists(self.store_file('.psdb')))
+        self.assertFalse(os.path.exists(self.store_file('.json')))
+        store = self.reopen_store()
+        self.assertEqual(store.doc(user.path).get().data, {'name': 'John', 'birthday': datetime(1999, 1, 1)})
+
+    def test_migration(self):
+        user = self.store.collection('users').add({'name': 'John', 'address': {'city': 'Paris'}})
+        self.store.close()
+
+        path = migrate_store(os.path.abspath(self.store_dir), self.store.name, 'binary', 'json+lzma')
+        self.assertEqual(path, self.store_file('.json.xz'))
+        self.assertFalse(os.path.exists(self.store_file('.psdb')))
+        with self.assertRaises(PyStoreDBError):
+            PyStoreDB.get_instance(self.store.name)
+
+        PyStoreDB.settings.codec = 'json+lzma'
+        store = PyStoreDB.get_instance(self.store.name)
+        self.assertEqual(store.doc(user.path).get().data, {'name': 'John', 'address': {'city': 'Paris'}})
+
+        store.close()
+        self.assertEqual(main([self.store_dir, store.name, '--from', 'json+lzma', '--to', 'binary']), 0)
+        self.assertEqual(main([self.store_dir, store.name, '--from', 'json+lzma', '--to', 'binary']), 1)
+        PyStoreDB.settings.codec = 'binary'
+        store = type(self).store = PyStoreDB.get_instance(store.name)
+        self.assertEqual(store.doc(user.path).get()['name'], 'John')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 from datetime import datetime
+from unittest import mock
 
+from PyStoreDB.core import FieldPath
+from PyStoreDB.core.aggregate import Count, Sum, Min, Max, Mode, Variance, Median, StdDev, Avg
+from PyStoreDB.engines._raw import utils
 from PyStoreDB.test import PyStoreDBTestCase
 
 
@@ -33,13 +37,33 @@ class CollectionQueryTestCase(PyStoreDBTestCase):
         self.assertEqual(docs[0].data, self.alice_data)
         self.assertEqual(docs[1]['name'], 'Bob')
 
+    def test_list_documents_after_delete(self):
+        self.jane.delete()
+        snapshot = self.store.collection('users').get()
+
+        self.assertEqual(snapshot.size, 6)
+        self.assertNotIn(self.jane.id, [doc.id for doc in snapshot.docs])
+
     def test_can_get_ref_from_query_doc_snapshot(self):
         snapshot = self.store.collection('users').get()
         user = list(snapshot.docs)[0]
 
         self.assertEqual(user.data.get('name'), 'Alice')
         user.reference.update(name='Joe')
-        self.assertEqual(user.get('name'), 'Joe')
+        self.assertEqual(user.reference.get().get('name'), 'Joe')
+
+    def test_query_doc_snapshot_is_point_in_time(self):
+        self.store.collection('users').doc('tagged').set({'name': 'Zoe', 'tags': ['a'], 'address': {'city': 'Paris'}})
+        user = self.store.collection('users').where(name='Zoe').get().docs[0]
+
+        user.reference.update(name='Zed', address={'city': 'Lyon'})
+        user.data['tags'].append('b')
+        self.assertEqual(user.get('name'), 'Zoe')
+        self.assertEqual(user.data['address'], {'city': 'Paris'})
+        self.assertEqual(self.store.collection('users').doc('tagged').get().get('tags'), ['a'])
+        user.reference.delete()
+        self.assertTrue(user.exists)
+        self.assertEqual(user.get(FieldPath.document_id), 'tagged')
 
     def test_order_by(self):
         snapshot = self.store.collection('users').order_by('name').get()
@@ -113,6 +137,175 @@ class CollectionQueryTestCase(PyStoreDBTestCase):
         self.assertEqual(docs[1].data['name'], 'Mike')
         self.assertEqual(docs[2].data['name'], 'Tom')
 
+    def test_order_by_limit_keeps_ties_stable(self):
+        users = self.store.collection('users')
+        query = users.order_by('active').order_by('age', descending=True)
+        names = [doc['name'] for doc in query.get().docs]
+        self.assertEqual(names, ['Anna', 'Jane', 'Bob', 'Tom', 'John', 'Mike', 'Alice'])
+        for k in (1, 3, 7, 10):
+            self.assertEqual([doc['name'] for doc in query.limit(k).get().docs], names[:k])
+            self.assertEqual([doc['name'] for doc in query.limit_to_last(k).get().docs], names[-k:])
+        # the documents tied on active keep the collection order
+        names = [doc['name'] for doc in users.order_by('active', descending=True).get().docs]
+        self.assertEqual([doc['name'] for doc in users.order_by('active', descending=True).limit(2).get().docs],
+                         names[:2])
+        self.assertEqual(
+            [doc['name'] for doc in users.order_by('active', descending=True).limit_to_last(2).get().docs], names[-2:]
+        )
+
+    def test_stream(self):
+        users = self.store.collection('users')
+        queries = [
+            users, users.where(active=True), users.where(age__gt=27).limit(2), users.order_by('age').limit(3),
+            users.order_by('name').limit_to_last(2), users.where(active=False).order_by('age').start_after(30),
+        ]
+        for query in queries:
+            self.assertEqual([doc.id for doc in query.stream()], [doc.id for doc in query.get().docs])
+        self.assertEqual([doc['name'] for doc in users.where(active=True).limit(2).stream()], ['Alice', 'John'])
+
+    def test_count(self):
+        users = self.store.collection('users')
+        queries = [
+            users.where(age__gt=30), users.exclude(active=True), users.where(active=True).limit(2),
+            users.order_by('age').start_after(30), users.order_by('name').limit_to_last(3),
+        ]
+        for query in queries:
+            self.assertEqual(query.count(), query.get().size)
+        with mock.patch.object(utils, 'decode_document_data', wraps=utils.decode_document_data) as decode:
+            self.assertEqual(users.count(), 7)
+            self.assertEqual(users.limit(3).count(), 3)
+            decode.assert_not_called()
+
+        users.doc('new').set({'name': 'New', 'age': 50})
+        users.doc('new').set({'name': 'New', 'age': 51})
+        self.assertEqual(users.count(), 8)
+        self.jane.delete()
+        with self.store.batch() as batch:
+            batch.set(users.doc('batched'), {'name': 'Batched', 'age': 20})
+            batch.delete(users.doc('new'))
+        self.assertEqual(users.count(), 7)
+        self.assertEqual(users.count(), users.get().size)
+        users.doc('new').collection('posts').add({'title': 'Post'})
+        self.assertEqual(users.count(), 7)
+        self.assertEqual(self.store.collection('missing').count(), 0)
+
+    def test_aggregate(self):
+        users = self.store.collection('users')
+        aggregations = {
+            'n': Count(), 'ages': Count('age', distinct=True), 'total': Sum('age'), 'youngest': Min('age'),
+            'oldest': Max('age'), 'mode': Mode('active'), 'avg': Avg('age'), 'variance': Variance('age'),
+            'sd': StdDev('age'), 'median': Median('age'),
+        }
+        for query in (users, users.where(active=True), users.order_by('age').limit(3)):
+            docs = query.get().docs
+            self.assertEqual(query.aggregate(aggregations), {key: a.apply(docs) for key, a in aggregations.items()})
+        self.assertEqual(users.where(active=True).aggregate(n=Count(), total=Sum('age')), {'n': 4, 'total': 120})
+        with mock.patch('PyStoreDB._impl.JsonQuerySnapshot') as snapshot:
+            self.assertEqual(users.aggregate(oldest=Max('age')), {'oldest': 40})
+        snapshot.assert_not_called()
+        converted = users.with_converter(from_json=lambda data: data['name'], to_json=lambda name: {'name': name})
+        self.assertEqual(converted.where(age__lt=28).aggregate(n=Count()), {'n': 2})
+
+    def test_group_by(self):
+        users = self.store.collection('users')
+        users.add({'name': 'Zoe', 'age': 25, 'active': True, 'city': {'name': 'Paris'}})
+        self.assertEqual(users.group_by('active').aggregate(n=Count(), total=Sum('age')), [
+            {'active': True, 'n': 5, 'total': 145},
+            {'active': False, 'n': 3, 'total': 97},
+        ])
+        grouped = users.where(age__lt=35).group_by('active', 'city').order_by('n', descending=True)
+        self.assertEqual(grouped.aggregate(n=Count(), median=Median('age')), [
+            {'active': True, 'city': None, 'n': 3, 'median': 27},
+            {'active': False, 'city': None, 'n': 2, 'median': 31},
+            {'active': True, 'city': {'name': 'Paris'}, 'n': 1, 'median': 25},
+        ])
+        self.assertEqual(
+            users.group_by('active').order_by('active').limit(1).aggregate(oldest=Max('age')),
+            [{'active': False, 'oldest': 35}],
+        )
+        self.assertEqual(
+            users.group_by('age').order_by('n', descending=True).order_by('age').limit(2).aggregate(n=Count()),
+            [{'age': 25, 'n': 2}, {'age': 27, 'n': 1}],
+        )
+        converted = users.with_converter(from_json=lambda data: data['name'], to_json=lambda name: {'name': name})
+        self.assertEqual(converted.group_by('active').limit(1).aggregate(n=Count()), [{'active': True, 'n': 5}])
+        # documents without a group field and aggregations without values give None, which sorts first
+        users.add({'name': 'Max', 'age': 'unknown'})
+        for limit in (None, 2):
+            grouped = users.group_by('active').order_by('active')
+            grouped = grouped if limit is None else grouped.limit(limit)
+            self.assertEqual(grouped.aggregate(n=Count()), [
+                {'active': None, 'n': 1}, {'active': False, 'n': 3}, {'active': True, 'n': 5},
+            ][:limit])
+            grouped = users.group_by('active').order_by('avg', descending=True).order_by('active')
+            grouped = grouped if limit is None else grouped.limit(limit)
+            self.assertEqual(grouped.aggregate(avg=Avg('age')), [
+                {'active': False, 'avg': 97 / 3}, {'active': True, 'avg': 29}, {'active': None, 'avg': None},
+            ][:limit])
+        with self.assertRaises(AssertionError):
+            users.group_by('active').order_by('age').aggregate(n=Count())
+        with self.assertRaises(AssertionError):
+            users.group_by('active').aggregate(active=Count())
+        with self.assertRaises(AssertionError):
+            users.group_by()
+
+    def test_group_by_values_of_any_kind(self):
+        places = self.store.collection('places')
+        for city in ('Paris', {'name': 'Lyon'}, 3, None, ['Nice'], 1.5, 'Paris', {'name': 'Lyon'}):
+            places.add({'city': city})
+        # values are ranked by kind, dicts and lists have no order and sort last by their JSON
+        expected = [None, 1.5, 3, 'Paris', ['Nice'], {'name': 'Lyon'}]
+        for limit in (None, 4):
+            grouped = places.group_by('city').order_by('city')
+            grouped = grouped if limit is None else grouped.limit(limit)
+            self.assertEqual([group['city'] for group in grouped.aggregate(n=Count())], expected[:limit])
+            grouped = places.group_by('city').order_by('city', descending=True)
+            grouped = grouped if limit is None else grouped.limit(limit)
+            self.assertEqual([group['city'] for group in grouped.aggregate(n=Count())], expected[::-1][:limit])
+
+    def test_select(self):
+        users = self.store.collection('users')
+        docs = users.where(active=True).order_by('age').select('name', FieldPath.document_id).limit(2).get().docs
+        self.assertEqual([doc.data for doc in docs], [{'name': 'Alice'}, {'name': 'Mike'}])
+        self.assertIsNone(docs[0].get('age'))
+        self.assertEqual(docs[0].reference.get().get('age'), 25)
+        self.assertEqual(
+            [doc.data for doc in users.where(name__startswith='J').select('birthday', 'age').stream()],
+            [{'birthday': datetime(1995, 5, 15), 'age': 28}, {'birthday': datetime(1991, 8, 22), 'age': 32}],
+        )
+        self.assertEqual(users.select('name').explain()['projection'], ['name'])
+        converted = users.with_converter(from_json=lambda doc: doc['name'], to_json=lambda name: {'name': name})
+        self.assertEqual([doc.data for doc in converted.where(age__lt=26).select('name').get().docs], ['Alice'])
+
+    def test_select_does_not_change_aggregations(self):
+        users = self.store.collection('users')
+        self.assertEqual(users.select('name').aggregate(total=Sum('age'), n=Count()), {'total': 217, 'n': 7})
+        self.assertEqual(users.select('age').group_by('active').order_by('active').aggregate(total=Sum('age')), [
+            {'active': False, 'total': 97}, {'active': True, 'total': 120},
+        ])
+
+    def test_select_pagination(self):
+        users = self.store.collection('users')
+        query = users.order_by('age', descending=True).select('name')
+        names, page = [], query.limit(3).get().docs
+        while page:
+            self.assertTrue(all(doc.data.keys() == {'name'} for doc in page))
+            names.extend(doc['name'] for doc in page)
+            page = query.start_after_document(page[-1]).limit(3).get().docs
+        self.assertEqual(names, ['Tom', 'Anna', 'Jane', 'Bob', 'John', 'Mike', 'Alice'])
+        last = list(query.limit(2).stream())[-1]
+        self.assertEqual([doc['name'] for doc in query.start_at_document(last).limit(2).stream()], ['Anna', 'Jane'])
+
+    def test_select_decodes_only_read_fields(self):
+        users = self.store.collection('users')
+        with mock.patch.object(utils, 'parse_value_metadata', wraps=utils.parse_value_metadata) as parse:
+            self.assertEqual(len(users.where(active=True).select('name').get().docs), 4)
+        # name and active of the 7 users, birthday and age are not decoded
+        self.assertEqual(parse.call_count, 14)
+        with mock.patch.object(utils, 'parse_value_metadata', wraps=utils.parse_value_metadata) as parse:
+            self.assertEqual(users.where(active=True).count(), 4)
+        self.assertEqual(parse.call_count, 7)
+
     def test_limit_and_limit_to_last(self):
         with self.assertRaises(AssertionError,
                                msg='Invalid query. You cannot call limit() after limit_to_last(), these are mutually exclusive'):
@@ -204,6 +397,14 @@ class CollectionQueryTestCase(PyStoreDBTestCase):
         self.assertEqual(snapshot.size, 1)
         self.assertEqual(docs[0].data['name'], 'Alice')
 
+    def test_combined_cursors(self):
+        users = self.store.collection('users')
+        names = [doc['name'] for doc in users.order_by('age', descending=True).start_at(27).end_before(35).get().docs]
+        self.assertEqual(names, ['Jane', 'Bob', 'John', 'Mike'])
+        bob = users.where(name='Bob').get().docs[0]
+        query = users.order_by('name').start_after_document(bob).end_at_document(self.jane.get())
+        self.assertEqual([doc['name'] for doc in query.get().docs], ['Jane'])
+
     def test_start_at_document(self):
         snapshot = self.store.collection('users').order_by('name').start_at_document(self.jane.get()).get()
         docs = list(snapshot.docs)
@@ -243,5 +444,63 @@ class CollectionQueryTestCase(PyStoreDBTestCase):
         self.assertEqual(docs[2].data['name'], 'Bob')
 
 
+class StreamTestCase(PyStoreDBTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.users = self.store.collection('users')
+        for i in range(20):
+            self.users.doc(f'u{i:02d}').set({'age': i})
+
+    def test_limit_stops_reading(self):
+        with mock.patch.object(utils, 'decode_document_data', wraps=utils.decode_document_data) as decode:
+            stream = self.users.where(age__gte=5).limit(2).stream()
+            self.assertEqual(decode.call_count, 0)
+            self.assertEqual([doc.id for doc in stream], ['u05', 'u06'])
+        self.assertEqual(decode.call_count, 7)
+
+    def test_results_are_produced_lazily(self):
+        stream = self.users.where(age__lt=3).stream()
+        self.assertEqual(next(stream).id, 'u00')
+        self.users.doc('u01').delete()
+        self.assertEqual([doc.id for doc in stream], ['u02'])
+
+    def test_converter(self):
+        users = self.users.with_converter(from_json=lambda data: data['age'], to_json=lambda age: {'age': age})
+        self.assertEqual([doc.data for doc in users.where(age__gt=17).stream()], [18, 19])
+
+
+class OrderByTestCase(PyStoreDBTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.users = self.store.collection('users')
+        rows = [('b', 'Bob', 2.5, datetime(2024, 1, 2)), ('a', 'Ann', 2, datetime(2024, 1, 1)),
+                ('d', 'Bob', 1, datetime(2024, 1, 3)), ('c', 'Ann', 3, datetime(2024, 1, 1))]
+        for doc_id, name, score, joined in rows:
+            self.users.doc(doc_id).set({'name': name, 'score': score, 'joined': joined, 'tags': [name]})
+
+    def ids(self, *orders):
+        query = self.users
+        for field, descending in orders:
+            query = query.order_by(field, descending=descending)
+        return [doc.id for doc in query.get().docs]
+
+    def test_mixed_directions(self):
+        self.assertEqual(self.ids(('name', True), ('score', False)), ['d', 'b', 'a', 'c'])
+        self.assertEqual(self.ids(('name', False), ('score', True)), ['c', 'a', 'b', 'd'])
+        self.assertEqual(self.ids(('joined', True), ('name', False)), ['d', 'b', 'a', 'c'])
+        self.assertEqual(self.ids(('joined', False), (FieldPath.document_id, True)), ['c', 'a', 'b', 'd'])
+        self.assertEqual(self.ids(('name', True), ('joined', True), (FieldPath.document_id, False)),
+                         ['d', 'b', 'a', 'c'])
+
+    def test_invalid_order_fields(self):
+        with self.assertRaises(AssertionError):
+            self.ids(('tags', False))
+        self.users.add({'name': 'Eve'})
+        with self.assertRaises(AssertionError):
+            self.ids(('name', False), ('score', True))
+
+
 if __name__ == '__main__':
     unittest.main()
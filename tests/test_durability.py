@@ -0,0 +1,58 @@
+import json
+import os
+import unittest
+
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class DurabilityTestCase(PyStoreDBTestCase):
+    store_dir = 'test_store_durability'
+
+    def read_snapshot(self):
+        with open(os.path.join(os.path.abspath(self.store_dir), f'{self.store.name}.json')) as f:
+            return json.load(f)
+
+    def tearDown(self):
+        super().tearDown()
+        self.store._delegate.engine.flush()
+
+
+class AsyncDurabilityTestCase(DurabilityTestCase):
+    settings_options = {'durability': 'async', 'flush_interval': 60_000}
+
+    def test_writes_are_flushed_in_background(self):
+        users = self.store.collection('users')
+        for i in range(50):
+            users.add({'index': i})
+        self.assertEqual(self.read_snapshot().get('users', {}), {})
+        self.assertEqual(users.get().size, 50)
+
+        store = self.reopen_store()
+        self.assertEqual(store.collection('users').get().size, 50)
+        self.assertEqual(len(self.read_snapshot()['users']), 50)
+
+
+class GroupDurabilityTestCase(DurabilityTestCase):
+    settings_options = {'durability': 'group', 'flush_interval': 60_000, 'group_commit_size': 10}
+
+    def test_writer_waits_for_group_commit(self):
+        users = self.store.collection('users')
+        for i in range(9):
+            users.add({'index': i})
+        self.assertEqual(self.read_snapshot().get('users', {}), {})
+        users.add({'index': 9})
+        self.assertEqual(len(self.read_snapshot()['users']), 10)
+
+
+class GroupDurabilityWithLogTestCase(DurabilityTestCase):
+    settings_options = {'durability': 'group', 'flush_interval': 1, 'wal': True}
+
+    def test_log_is_flushed(self):
+        user = self.store.collection('users').add({'name': 'John'})
+        user.update(name='Jane')
+        store = self.reopen_store()
+        self.assertEqual(store.doc(user.path).get().data, {'name': 'Jane'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from PyStoreDB.engines import PyStoreDBSQLiteEngine
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class ExplainTestCase(PyStoreDBTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.users = self.store.collection('users')
+        for name, age, country in (('John', 25, 'US'), ('Jane', 20, 'FR'), ('Alice', 30, 'US'), ('Bob', 40, 'UK')):
+            self.users.add({'name': name, 'age': age, 'country': country})
+
+    def test_scan(self):
+        plan = self.users.where(age__gt=21).order_by('age').limit(2).explain()
+        self.assertEqual(plan['access'], 'scan')
+        self.assertIsNone(plan['index'])
+        self.assertEqual(plan['pushdown'], [])
+        self.assertEqual(plan['filter'], 'in-memory')
+        self.assertEqual(plan['sort'], 'top-k')
+        self.assertEqual(plan['limit'], 'slice')
+        self.assertIsNone(plan['cursor'])
+        self.assertNotIn('stats', plan)
+
+    def test_cursors(self):
+        self.assertEqual(self.users.order_by('age').start_at(25).explain()['cursor'], 'bisect')
+        john = self.users.where(name='John').get().docs[0]
+        self.assertEqual(self.users.order_by('age').start_after_document(john).explain()['cursor'], 'document-bisect')
+
+    def test_analyze(self):
+        plan = self.users.where(age__gt=21).order_by('age').limit(2).explain(analyze=True)
+        stats = plan['stats']
+        self.assertEqual((stats['examined'], stats['decoded'], stats['returned']), (4, 4, 2))
+        self.assertTrue({'decode', 'filter', 'sort', 'limit', 'total'} <= set(stats['timings']))
+
+    def test_index(self):
+        self.users.create_index('age')
+        plan = self.users.where(age__gt=21, country='US').explain(analyze=True)
+        self.assertEqual(plan['access'], 'index')
+        self.assertEqual(plan['index'], [[('age', False)]])
+        self.assertEqual(plan['pushdown'], ['age__gt'])
+        self.assertEqual((plan['stats']['examined'], plan['stats']['returned']), (3, 2))
+        self.users.drop_index('age')
+
+    def test_index_range(self):
+        self.users.create_index('country', ('age', True))
+        plan = self.users.where(country='US').order_by('age', descending=True).limit(1).explain(analyze=True)
+        self.assertEqual(plan['access'], 'index-range')
+        self.assertEqual(plan['index'], [[('country', False), ('age', True)]])
+        self.assertEqual(plan['pushdown'], ['country'])
+        self.assertEqual((plan['sort'], plan['limit']), ('index', 'early-stop'))
+        self.assertEqual((plan['stats']['examined'], plan['stats']['returned']), (1, 1))
+        self.users.drop_index('country', ('age', True))
+
+    def test_converter(self):
+        users = self.users.with_converter(from_json=lambda data: data['name'], to_json=lambda name: {'name': name})
+        self.assertEqual(users.where(age=20).explain(analyze=True)['stats']['returned'], 1)
+
+
+class SQLiteExplainTestCase(ExplainTestCase):
+    store_dir = 'test_store_explain_sqlite'
+    engine_class = PyStoreDBSQLiteEngine
+
+    def test_sql_pushdown(self):
+        plan = self.users.where(age__gt=21).explain(analyze=True)
+        self.assertEqual(len(plan['pushdown']), 1)
+        self.assertIn(plan['pushdown'][0], plan['sql'])
+        self.assertEqual((plan['stats']['examined'], plan['stats']['returned']), (3, 3))
+        plan = self.users.order_by('age').limit(2).explain()
+        self.assertEqual((plan['sort'], plan['limit']), ('sql', 'sql'))
+
+    test_scan = test_analyze = test_index = test_index_range = None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,281 @@
+import os
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import test_query_filters
+from PyStoreDB.core import FieldPath
+from PyStoreDB.core.filters import Q
+from PyStoreDB.engines import PyStoreDBSQLiteEngine, PyStoreDBShardedEngine
+from PyStoreDB.engines._raw import utils
+from PyStoreDB.errors import PyStoreDBError
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class IndexedFiltersTestCase(test_query_filters.FiltersTestCase):
+
+    def setUp(self):
+        users = self.store.collection('users')
+        for field in ('name', 'age', 'country'):
+            users.create_index(field)
+        super().setUp()
+
+
+class IndexTestCase(PyStoreDBTestCase):
+    store_dir = 'test_store_indexes'
+
+    @property
+    def engine(self):
+        return self.store._delegate.engine
+
+    def setUp(self):
+        super().setUp()
+        self.users = self.store.collection('users')
+        self.users.create_index('age')
+        self.john = self.users.add({'name': 'John', 'age': 25})
+        self.jane = self.users.add({'name': 'Jane', 'age': 20})
+        self.alice = self.users.add({'name': 'Alice', 'age': 30})
+        self.bob = self.users.add({'name': 'Bob', 'age': None})
+
+    def tearDown(self):
+        super().tearDown()
+        self.users.drop_index('age')
+
+    def names(self, *args, **kwargs):
+        return [doc['name'] for doc in self.users.where(*args, **kwargs).get().docs]
+
+    def assertUsesIndex(self, *args, **kwargs):
+        names = self.names(*args, **kwargs)
+        with mock.patch.object(self.engine._indexes, 'lookup', return_value=None):
+            self.assertEqual(names, self.names(*args, **kwargs))
+        return names
+
+    def test_lookups(self):
+        self.assertEqual(self.assertUsesIndex(age=25), ['John'])
+        self.assertEqual(self.assertUsesIndex(age__in=[20, 30, 40]), ['Jane', 'Alice'])
+        self.assertEqual(self.assertUsesIndex(age__isnull=True), ['Bob'])
+        self.assertEqual(self.assertUsesIndex(age__isnull=False), ['John', 'Jane', 'Alice'])
+        self.assertEqual(self.assertUsesIndex(age__in=[25, None]), ['John', 'Bob'])
+
+    def test_range_lookups(self):
+        self.bob.update(age=40)
+        self.assertEqual(self.assertUsesIndex(age__gt=25), ['Alice', 'Bob'])
+        self.assertEqual(self.assertUsesIndex(age__gte=25), ['John', 'Alice', 'Bob'])
+        self.assertEqual(self.assertUsesIndex(age__lt=25), ['Jane'])
+        self.assertEqual(self.assertUsesIndex(age__lte=25.0), ['John', 'Jane'])
+        self.assertEqual(self.assertUsesIndex(age__range=(20, 30)), ['John', 'Jane', 'Alice'])
+        self.assertEqual(self.assertUsesIndex(age__gt=100), [])
+
+    def test_only_candidates_are_decoded(self):
+        self.bob.update(age=40)
+        self.assertEqual(self.names(age__gt=28), ['Alice', 'Bob'])
+        with mock.patch.object(utils, 'decode_document_data', wraps=utils.decode_document_data) as decode:
+            data = self.engine.get_collection('/users', filters=[Q(age__gt=28)])
+        self.assertEqual([doc['name'] for doc in data.values()], ['Alice', 'Bob'])
+        self.assertEqual(decode.call_count, 2)
+
+    def test_count_decodes_only_candidates(self):
+        self.bob.update(age=40)
+        self.assertEqual(self.users.where(age__gt=28, name__startswith='B').count(), 1)
+        with mock.patch.object(utils, 'decode_document_data', wraps=utils.decode_document_data) as decode:
+            self.assertEqual(self.users.where(age__gt=28, name__startswith='A').count(), 1)
+        self.assertEqual(decode.call_count, 2)
+
+    def test_index_follows_writes(self):
+        self.john.update(age=35)
+        self.jane.set({'name': 'Jane', 'age': 50})
+        self.alice.delete()
+        self.bob.update(age=31)
+        carol = self.users.add({'name': 'Carol', 'age': 33})
+        self.assertEqual(self.assertUsesIndex(age__gt=30), ['John', 'Jane', 'Bob', 'Carol'])
+        self.alice.set({'name': 'Alice', 'age': 45})
+        carol.delete()
+        # a document set again keeps its position in the collection
+        self.assertEqual(self.assertUsesIndex(age__gt=30), ['John', 'Jane', 'Alice', 'Bob'])
+
+    def test_combined_with_other_filters(self):
+        self.bob.update(age=40)
+        self.assertEqual(self.assertUsesIndex(age__gte=25, name__startswith='A'), ['Alice'])
+        self.assertEqual(self.assertUsesIndex(Q(age__gte=25) & Q(age__lt=35)), ['John', 'Alice'])
+        self.assertEqual(self.assertUsesIndex(Q(age=25) | Q(name='Jane')), ['John', 'Jane'])
+        self.assertEqual(self.assertUsesIndex(~Q(age__gte=25)), ['Jane'])
+
+    def test_order_by_and_limit(self):
+        self.bob.update(age=40)
+        query = self.users.where(age__gte=25).order_by('age', descending=True).limit(2)
+        self.assertEqual([doc['name'] for doc in query.get().docs], ['Bob', 'Alice'])
+
+    def test_falls_back_to_scan(self):
+        # a document without the field makes the scan raise, the index must not hide it
+        self.users.add({'name': 'Eve'})
+        with self.assertRaises(ValueError):
+            _ = self.users.where(age=25).get().docs
+
+    def test_values_of_another_kind(self):
+        self.bob.update(age='40')
+        self.assertEqual(self.assertUsesIndex(age='40'), ['Bob'])
+        with self.assertRaises(TypeError):
+            _ = self.users.where(age__gt=25).get().docs
+
+    def test_datetime_values(self):
+        self.users.create_index('joined')
+        for i, user in enumerate((self.john, self.jane, self.alice, self.bob)):
+            user.update(joined=datetime(2024, 1, i + 1))
+        self.assertEqual(self.assertUsesIndex(joined__gte=datetime(2024, 1, 3)), ['Alice', 'Bob'])
+        self.users.drop_index('joined')
+
+    def test_sub_collections_are_indexed_separately(self):
+        posts = self.john.collection('posts')
+        posts.create_index('likes')
+        posts.add({'likes': 3})
+        posts.add({'likes': 10})
+        self.assertEqual([doc['likes'] for doc in posts.where(likes__gt=5).get().docs], [10])
+        self.john.set({'name': 'John', 'age': 25})
+        self.assertEqual(posts.where(likes__gt=5).get().docs, [])
+        posts.drop_index('likes')
+
+    def test_parent_created_by_sub_collection_write(self):
+        self.users.doc('dave').collection('posts').add({'title': 'Hello'})
+        self.assertEqual(self.names(age=20), ['Jane'])
+        eve = self.users.add({'name': 'Eve', 'age': 20})
+        self.users.doc('dave').set({'name': 'Dave', 'age': 20})
+        self.assertEqual([doc.id for doc in self.users.where(age=20).get().docs], [self.jane.id, 'dave', eve.id])
+
+    def test_definitions_are_persisted(self):
+        self.users.create_index('name')
+        self.assertTrue(os.path.exists(os.path.join(self.store_dir, f'{self.store.name}.indexes')))
+        self.reopen_store()
+        self.users = self.store.collection('users')
+        self.assertEqual(self.engine.get_indexes('/users'), [[('age', False)], [('name', False)]])
+        self.assertEqual(self.assertUsesIndex(name='Jane'), ['Jane'])
+        self.users.drop_index('name')
+        self.assertEqual(self.engine.get_indexes('/users'), [[('age', False)]])
+
+    def test_document_id_cannot_be_indexed(self):
+        with self.assertRaises(ValueError):
+            self.users.create_index(FieldPath.document_id)
+
+    def test_unsupported_engine(self):
+        with self.assertRaises(PyStoreDBError):
+            PyStoreDBSQLiteEngine('store').create_index('/users', 'age')
+
+
+class CompositeIndexTestCase(PyStoreDBTestCase):
+    store_dir = 'test_store_composite_indexes'
+
+    @property
+    def engine(self):
+        return self.store._delegate.engine
+
+    def setUp(self):
+        super().setUp()
+        self.tasks = self.store.collection('tasks')
+        self.tasks.create_index('status', 'priority', ('created', True))
+        self.tasks.create_index('priority')
+        rows = [
+            ('open', 1, 5), ('closed', 1, 3), ('open', 2, 1), ('open', 1, 2), ('open', 1, 8),
+            ('closed', 2, 9), ('open', 2, 4), ('open', 1, 5), ('open', 2, 7),
+        ]
+        for i, (status, priority, created) in enumerate(rows):
+            self.tasks.doc(f't{i}').set({'status': status, 'priority': priority, 'created': created})
+
+    def tearDown(self):
+        super().tearDown()
+        self.tasks.drop_index('status', 'priority', ('created', True))
+        self.tasks.drop_index('priority')
+
+    def assertServed(self, query):
+        with mock.patch.object(self.engine.query_engine, 'apply_query_filters',
+                               wraps=self.engine.query_engine.apply_query_filters) as scan:
+            ids = [doc.id for doc in query.get().docs]
+        self.assertFalse(any(not call.kwargs.get('presorted') for call in scan.call_args_list))
+        with mock.patch.object(self.engine._indexes, 'ordered_lookup', return_value=None):
+            self.assertEqual(ids, [doc.id for doc in query.get().docs])
+        return ids
+
+    def test_equality_and_order(self):
+        query = self.tasks.where(status='open', priority=1).order_by('created', descending=True)
+        self.assertEqual(self.assertServed(query), ['t4', 't0', 't7', 't3'])
+        self.assertEqual(self.assertServed(query.limit(2)), ['t4', 't0'])
+        self.assertEqual(self.assertServed(query.limit_to_last(3)), ['t0', 't7', 't3'])
+
+    def test_leading_equality_only(self):
+        query = self.tasks.where(status='open').order_by('priority').order_by('created', descending=True)
+        self.assertEqual(self.assertServed(query.limit(5)), ['t4', 't0', 't7', 't3', 't8'])
+
+    def test_single_field_index_serves_order_by(self):
+        self.assertEqual(self.assertServed(self.tasks.order_by('priority').limit(3)), ['t0', 't1', 't3'])
+
+    def test_other_filters_and_cursors(self):
+        query = self.tasks.where(status='open', priority=1, created__lt=8).order_by('created', descending=True)
+        self.assertEqual(self.assertServed(query.limit(2)), ['t0', 't7'])
+        query = self.tasks.where(status='open', priority=2).order_by('created', descending=True)
+        self.assertEqual(self.assertServed(query.start_at(4)), ['t8', 't6'])
+
+    def test_cursors_seek_the_index(self):
+        query = self.tasks.where(status='open', priority=1).order_by('created', descending=True)
+        self.assertEqual(self.assertServed(query.start_after(5).limit(1)), ['t4'])
+        self.assertEqual(self.assertServed(query.start_at(2).end_before(8)), ['t0', 't7', 't3'])
+        plan = query.start_at(5).limit(1).explain(analyze=True)
+        self.assertEqual((plan['cursor'], plan['limit']), ('index-seek', 'early-stop'))
+        self.assertEqual(plan['stats']['decoded'], 1)
+        # a cursor value of another kind is not sought, the scan raises on it
+        self.assertEqual(query.start_at('5').explain()['cursor'], 'bisect')
+        with self.assertRaises(AssertionError):
+            _ = query.start_at('5').get().docs
+
+    def test_int_and_float_cursors(self):
+        for i, value in enumerate((1, 1.5, 2, 2.5, True)):
+            self.tasks.doc(f'n{i}').set({'status': 'mixed', 'priority': 0, 'created': value})
+        query = self.tasks.where(status='mixed', priority=0).order_by('created', descending=True)
+        # the scan orders ints and floats together like the index does
+        self.assertEqual(self.assertServed(query.end_before(2)), ['n1', 'n0', 'n4'])
+        self.assertEqual(self.assertServed(query.start_at(1.5).end_at(2)), ['n2', 'n1'])
+        self.assertEqual(query.end_before(2).explain()['cursor'], 'index-seek')
+
+    def test_only_returned_documents_are_read(self):
+        query = self.tasks.where(status='open', priority=1).order_by('created', descending=True).limit(1)
+        self.assertEqual(self.assertServed(query), ['t4'])
+        with mock.patch.object(utils, 'decode_document_data', wraps=utils.decode_document_data) as decode:
+            self.engine.get_collection('/tasks', **query._delegate.kwargs)
+        self.assertEqual(decode.call_count, 1)
+
+    def test_directions_must_match(self):
+        query = self.tasks.where(status='open', priority=1).order_by('created').limit(2)
+        self.assertIsNone(self.engine._indexes.ordered_lookup(
+            '/tasks', self.engine._raw_db['tasks'], query._delegate.kwargs['filters'], query._delegate.kwargs['order_by']
+        ))
+        self.assertEqual([doc.id for doc in query.get().docs], ['t3', 't0'])
+
+    def test_index_follows_writes(self):
+        self.tasks.doc('t4').update(created=0)
+        self.tasks.doc('t9').set({'status': 'open', 'priority': 1, 'created': 6})
+        self.tasks.doc('t0').delete()
+        query = self.tasks.where(status='open', priority=1).order_by('created', descending=True)
+        self.assertEqual(self.assertServed(query), ['t9', 't7', 't3', 't4'])
+
+    def test_values_of_several_kinds(self):
+        self.tasks.doc('t1').update(created='yesterday')
+        query = self.tasks.where(status='open', priority=1).order_by('created', descending=True)
+        self.assertIsNone(self.engine._indexes.ordered_lookup(
+            '/tasks', self.engine._raw_db['tasks'], query._delegate.kwargs['filters'], query._delegate.kwargs['order_by']
+        ))
+        self.assertEqual([doc.id for doc in query.get().docs], ['t4', 't0', 't7', 't3'])
+
+    def test_definitions(self):
+        self.assertEqual(self.engine.get_indexes('/tasks'), [
+            [('status', False), ('priority', False), ('created', True)], [('priority', False)]
+        ])
+        with self.assertRaises(ValueError):
+            self.tasks.create_index('status', 'status')
+        with self.assertRaises(ValueError):
+            self.tasks.create_index()
+
+
+class ShardedIndexTestCase(IndexTestCase):
+    store_dir = 'test_store_indexes_sharded'
+    engine_class = PyStoreDBShardedEngine
+
+
+if __name__ == '__main__':
+    unittest.main()
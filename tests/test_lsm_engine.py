@@ -0,0 +1,89 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+import test_collections
+import test_document
+import test_persistence
+from PyStoreDB.engines import PyStoreDBLSMEngine
+from PyStoreDB.engines._lsm.bloom import BloomFilter
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class LSMEngineMixin:
+    store_dir = 'test_store_lsm'
+    engine_class = PyStoreDBLSMEngine
+
+
+class LSMDocumentCRUDTestCase(LSMEngineMixin, test_document.DocumentCRUDTestCase):
+    pass
+
+
+class LSMCollectionQueryTestCase(LSMEngineMixin, test_collections.CollectionQueryTestCase):
+    settings_options = {'engine_options': {'memtable_size': 256}}
+
+
+class LSMPersistenceTestCase(LSMEngineMixin, test_persistence.PersistenceTestCase):
+    settings_options = {'engine_options': {'memtable_size': 256}}
+
+
+class LSMEngineTestCase(LSMEngineMixin, PyStoreDBTestCase):
+    settings_options = {
+        'engine_options': {'memtable_size': 512, 'segment_size': 512, 'level0_segments': 2, 'level_size': 2048}
+    }
+
+    @property
+    def engine(self):
+        return self.store._delegate.engine
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter.for_capacity(100)
+        for i in range(100):
+            bloom.add(f'/users/{i}')
+        self.assertTrue(all(f'/users/{i}' in bloom for i in range(100)))
+        false_positives = sum(f'/orders/{i}' in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+        self.assertTrue('/users/1' in BloomFilter.from_dict(bloom.to_dict()))
+
+    def test_memtable_is_flushed_and_compacted(self):
+        users = self.store.collection('users')
+        docs = [users.add({'name': 'John Doe', 'index': i}) for i in range(100)]
+        self.assertGreater(len(self.engine._levels), 1)
+        self.assertLess(len(self.engine._levels[0]), 2)
+        for level in self.engine._levels[1:]:
+            # segments of the levels above 0 never overlap
+            for previous, segment in zip(level, level[1:]):
+                self.assertLess(previous.max_key, segment.min_key)
+        self.assertEqual([doc['index'] for doc in users.get().docs], list(range(100)))
+        self.assertEqual(docs[42].get()['index'], 42)
+
+    def test_deleted_documents_are_readded_last(self):
+        users = self.store.collection('users')
+        john = users.doc('john')
+        john.set({'name': 'John'})
+        users.doc('jane').set({'name': 'Jane'})
+        john.delete()
+        john.set({'name': 'John'})
+        self.assertEqual([doc.id for doc in users.get().docs], ['jane', 'john'])
+
+    def test_overwrites_keep_the_sequence_without_decoding(self):
+        users = self.store.collection('users')
+        users.doc('john').set({'name': 'John', 'bio': 'x' * 300})
+        users.doc('jane').set({'name': 'Jane'})
+        with mock.patch('PyStoreDB.engines._lsm.json.loads', wraps=json.loads) as loads:
+            users.doc('john').set({'name': 'John'})
+        loads.assert_not_called()
+        self.assertEqual([doc.id for doc in users.get().docs], ['john', 'jane'])
+
+    def test_unreferenced_segments_are_removed(self):
+        self.store.collection('users').add({'name': 'John'})
+        with open(os.path.join(self.engine._dir, '999999999.sst'), 'wb') as f:
+            f.write(b'partial')
+        self.reopen_store()
+        self.assertNotIn('999999999.sst', os.listdir(self.engine._dir))
+        self.assertEqual(self.store.collection('users').get().size, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
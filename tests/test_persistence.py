@@ -0,0 +1,32 @@
+import unittest
+from datetime import datetime
+
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class PersistenceTestCase(PyStoreDBTestCase):
+    store_dir = 'test_store_persistence'
+
+    def test_persistence(self):
+        users = self.store.collection('users')
+        docs = [users.add({'index': i}) for i in range(30)]
+        for doc in docs[:10]:
+            doc.delete()
+        docs[20].update(index=-20)
+        docs[10].set({'index': 'ten', 'birthday': datetime(1990, 5, 4), 'tags': ['a'], 'address': {'city': 'Lyon'}})
+        posts = docs[25].collection('posts')
+        post = posts.add({'title': 'Hello'})
+
+        store = self.reopen_store()
+        indexes = [doc['index'] for doc in store.collection('users').get().docs]
+        self.assertEqual(indexes, ['ten', *range(11, 20), -20, *range(21, 30)])
+        self.assertEqual(store.doc(docs[10].path).get().data,
+                         {'index': 'ten', 'birthday': datetime(1990, 5, 4), 'tags': ['a'], 'address': {'city': 'Lyon'}})
+        self.assertFalse(store.doc(docs[0].path).get().exists)
+        self.assertEqual(store.doc(post.path).get().get('title'), 'Hello')
+        self.assertEqual(store.collection(posts.path).get().size, 1)
+        self.assertEqual(store.get_raw_data(posts.path)[post.id]['__data__'], {'title': 'Hello'})
+
+
+if __name__ == '__main__':
+    unittest.main()
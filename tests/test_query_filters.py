@@ -1,8 +1,10 @@
+import re
 import unittest
 
 from PyStoreDB.constants import Json
 from PyStoreDB.core import QuerySnapshot
-from PyStoreDB.core.filters import Q, F
+from PyStoreDB.core.filters import Q, F, Lookup, compile_filters, lookup_registry, referenced_fields
+from PyStoreDB.core.filters.lookups import compile_pattern
 from PyStoreDB.test import PyStoreDBTestCase
 
 
@@ -103,5 +105,79 @@ class FiltersTestCase(PyStoreDBTestCase):
         self.store.collection('users').add({'name': 'Alice', 'age': 30, 'country': 'UK', 'bio': 'I am a manager'})
 
 
+class CompileFiltersTestCase(unittest.TestCase):
+    john = {'name': 'John', 'age': 25}
+    jane = {'name': 'Jane', 'age': 20, 'country': 'UK'}
+
+    def test_connectors(self):
+        match = compile_filters([Q(name='John') ^ Q(age__gte=20)])
+        self.assertFalse(match(self.john))
+        self.assertFalse(compile_filters([Q(name='John', age__lt=20)])(self.john))
+        self.assertTrue(compile_filters([~Q(name='Jane'), Q(age__range=(20, 30))])(self.john))
+        self.assertTrue(compile_filters([Q(name__iexact='JOHN') | Q(name__in=('Jane',))])(self.john))
+
+    def test_short_circuit(self):
+        match = compile_filters([Q(name='John') | Q(country='UK')])
+        self.assertTrue(match(self.john))
+        self.assertTrue(match(self.jane))
+        with self.assertRaises(ValueError):
+            compile_filters([Q(country='UK') | Q(name='John')])(self.john)
+
+    def test_lookup_per_field_type(self):
+        match = compile_filters([Q(age__gt=21)])
+        self.assertTrue(match(self.john))
+        self.assertFalse(match({'age': 21.0}))
+        with self.assertRaises(TypeError):
+            match({'age': '30'})
+        with self.assertRaises(ValueError):
+            compile_filters([Q(age__unknown=1)])(self.john)
+
+    def test_f_expressions(self):
+        self.assertTrue(compile_filters([Q(age__in=[F('age'), 0])])(self.john))
+
+    def test_referenced_fields(self):
+        filters = [Q(name='John') | ~Q(age__gte=F('min_age'), country__in=['UK', F('home')]), Q(score__lt=3)]
+        self.assertEqual(referenced_fields(filters), {'name', 'age', 'min_age', 'country', 'home', 'score'})
+
+    def test_pattern_lookups(self):
+        def match(**kwargs):
+            return compile_filters([Q(**kwargs)])(self.john)
+
+        self.assertTrue(match(name__startswith='Jo'))
+        self.assertFalse(match(name__startswith='jo'))
+        self.assertTrue(match(name__istartswith='jO'))
+        self.assertTrue(match(name__iendswith='HN'))
+        self.assertTrue(match(name__icontains='OH'))
+        self.assertTrue(match(age__contains=5))
+        self.assertFalse(match(name__contains='.'))
+        self.assertTrue(match(name__regex=r'^J\w+n$'))
+        self.assertTrue(match(name__iregex=re.compile('^john$')))
+        self.assertFalse(match(name__regex=re.compile('^john$')))
+        with self.assertRaises(AssertionError):
+            match(name__regex=1)
+
+    def test_patterns_are_cached(self):
+        compile_filters([Q(name__regex='^cached$')])(self.john)
+        hits = compile_pattern.cache_info().hits
+        compile_filters([Q(name__regex='^cached$')])(self.john)
+        self.assertEqual(compile_pattern.cache_info().hits, hits + 1)
+
+    def test_registered_lookup(self):
+        match = compile_filters([Q(age__odd=True)])
+        with self.assertRaises(ValueError):
+            match(self.john)
+
+        @lookup_registry.register(int)
+        class Odd(Lookup):
+            lookup_name = 'odd'
+
+            @property
+            def as_bool(self):
+                return (self.db_value % 2 == 1) == self.value
+
+        self.assertTrue(match(self.john))
+        self.assertFalse(match(self.jane))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,115 @@
+import os
+import unittest
+
+import test_persistence
+from PyStoreDB import PyStoreDB
+from PyStoreDB.engines import PyStoreDBShardedEngine
+from PyStoreDB.errors import PyStoreDBError
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class ShardedEngineMixin:
+    store_dir = 'test_store_sharded'
+    engine_class = PyStoreDBShardedEngine
+
+
+class ShardedPersistenceTestCase(ShardedEngineMixin, test_persistence.PersistenceTestCase):
+    pass
+
+
+class ShardedSubcollectionsPersistenceTestCase(ShardedEngineMixin, test_persistence.PersistenceTestCase):
+    settings_options = {'engine_options': {'shard_subcollections': True}}
+
+
+class ShardedEngineTestCase(ShardedEngineMixin, PyStoreDBTestCase):
+
+    @property
+    def engine(self):
+        return self.store._delegate.engine
+
+    @property
+    def shard_dir(self):
+        return os.path.join(os.path.abspath(self.store_dir), self.store.name)
+
+    def shard_files(self):
+        return sorted(os.listdir(self.shard_dir))
+
+    def test_one_file_per_collection(self):
+        user = self.store.collection('users').add({'name': 'John'})
+        user.collection('posts').add({'title': 'Hello'})
+        self.store.collection('orders').add({'total': 10})
+        self.assertEqual(self.shard_files(), ['orders.json', 'users.json'])
+
+    def test_only_dirty_shards_are_written(self):
+        self.store.collection('users').add({'name': 'John'})
+        self.store.collection('logs').add({'message': 'start'})
+        users_mtime = os.stat(os.path.join(self.shard_dir, 'users.json')).st_mtime_ns
+        os.utime(os.path.join(self.shard_dir, 'users.json'), ns=(users_mtime - 10 ** 9, users_mtime - 10 ** 9))
+
+        self.store.collection('logs').add({'message': 'stop'})
+        self.assertEqual(os.stat(os.path.join(self.shard_dir, 'users.json')).st_mtime_ns, users_mtime - 10 ** 9)
+
+    def test_shards_are_loaded_lazily(self):
+        john = self.store.collection('users').add({'name': 'John'})
+        self.store.collection('logs').add({'message': 'start'})
+        post = john.collection('posts').add({'title': 'Hello'})
+
+        store = self.reopen_store()
+        self.assertEqual(store._delegate.engine._loaded_shards, set())
+        self.assertEqual(store.doc(john.path).get().data, {'name': 'John'})
+        self.assertEqual(store._delegate.engine._loaded_shards, {'/users'})
+        self.assertEqual(store.doc(post.path).get().get('title'), 'Hello')
+        self.assertEqual(store.collection('logs').get().size, 1)
+        self.assertEqual(store._delegate.engine._loaded_shards, {'/users', '/logs'})
+
+    def test_clear_removes_shards(self):
+        self.store.collection('users').add({'name': 'John'})
+        self.store.clear()
+        self.assertEqual(self.shard_files(), [])
+        self.assertEqual(self.reopen_store().get_raw_data(), {})
+
+    def test_shards_of_another_codec_raise(self):
+        self.store.collection('users').add({'name': 'John'})
+        self.store.close()
+        PyStoreDB.settings.codec = 'binary'
+        try:
+            with self.assertRaises(PyStoreDBError):
+                PyStoreDB.get_instance(self.store.name)
+        finally:
+            PyStoreDB.settings.codec = 'json'
+        store = type(self).store = PyStoreDB.get_instance(self.store.name)
+        self.assertEqual(store.collection('users').get().size, 1)
+
+
+class ShardedSubcollectionsEngineTestCase(ShardedEngineTestCase):
+    store_dir = 'test_store_sharded_subcollections'
+    settings_options = {'engine_options': {'shard_subcollections': True}}
+
+    def test_one_file_per_collection(self):
+        user = self.store.collection('users').add({'name': 'John'})
+        user.collection('posts').add({'title': 'Hello'})
+        self.store.collection('orders').add({'total': 10})
+        self.assertEqual(self.shard_files(), ['orders.json', f'users.{user.id}.posts.json', 'users.json'])
+
+    def test_shards_are_loaded_lazily(self):
+        john = self.store.collection('users').add({'name': 'John'})
+        post = john.collection('posts').add({'title': 'Hello'})
+
+        store = self.reopen_store()
+        self.assertEqual(store.collection(f'users/{john.id}/posts').get().size, 1)
+        self.assertEqual(store._delegate.engine._loaded_shards, {'/users', f'/users/{john.id}/posts'})
+        self.assertEqual(store.get_raw_data()['users'][john.id]['posts'][post.id]['__data__'], {'title': 'Hello'})
+
+    def test_delete_keeps_sub_collections(self):
+        john = self.store.collection('users').add({'name': 'John'})
+        post = john.collection('posts').add({'title': 'Hello'})
+        john.delete()
+
+        store = self.reopen_store()
+        self.assertFalse(store.doc(john.path).get().exists)
+        self.assertEqual(store.doc(post.path).get().get('title'), 'Hello')
+        self.assertEqual(store.collection('users').get().size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import random
+import unittest
+from datetime import datetime
+
+from PyStoreDB.core.aggregate import ApproxCountDistinct, ApproxMedian, ApproxQuantile, Count, accumulate
+from PyStoreDB.core.sketches import HyperLogLog, KLLSketch
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class HyperLogLogTestCase(unittest.TestCase):
+
+    def test_estimate(self):
+        for n in (0, 1, 100, 20000):
+            sketch = HyperLogLog.for_error(0.01)
+            for i in range(n):
+                sketch.add(f'user{i}')
+                sketch.add(f'user{i}')
+            self.assertLessEqual(abs(sketch.estimate() - n), max(1, n * 0.03))
+
+    def test_equal_values_have_the_same_hash(self):
+        sketch, expected = HyperLogLog(4), HyperLogLog(4)
+        for value in (1, 1.0, True, 'a', datetime(2024, 1, 1), datetime(2024, 1, 1), {'a': [1]}, {'a': [1]}):
+            sketch.add(value)
+        for value in (1, 'a', datetime(2024, 1, 1), {'a': [1]}):
+            expected.add(value)
+        self.assertEqual(sketch.registers, expected.registers)
+
+    def test_merge(self):
+        left, right, union = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+        for i in range(3000):
+            (left if i % 2 else right).add(i)
+            union.add(i)
+        self.assertEqual(left.merge(right).registers, union.registers)
+        with self.assertRaises(ValueError):
+            left.merge(HyperLogLog(10))
+
+    def test_to_dict(self):
+        sketch = HyperLogLog(10)
+        for i in range(500):
+            sketch.add(i)
+        restored = HyperLogLog.from_dict(sketch.to_dict())
+        self.assertEqual(restored.registers, sketch.registers)
+        self.assertEqual(restored.estimate(), sketch.estimate())
+        with self.assertRaises(ValueError):
+            HyperLogLog(20)
+
+
+class KLLSketchTestCase(unittest.TestCase):
+
+    def assertRankError(self, sketch, values, error):
+        values = sorted(values)
+        for q in (0, 0.1, 0.5, 0.9, 1):
+            rank = values.index(sketch.quantile(q)) / (len(values) - 1)
+            self.assertLessEqual(abs(rank - q), error)
+
+    def test_quantiles(self):
+        values = list(range(100000))
+        random.Random(7).shuffle(values)
+        sketch = KLLSketch.for_error(0.01, seed=1)
+        for value in values:
+            sketch.add(value)
+        self.assertRankError(sketch, values, 0.02)
+        # the memory doesn't grow with the number of values
+        self.assertLess(sum(len(compactor) for compactor in sketch.compactors), 3 * sketch.k)
+
+    def test_small_sketch_is_exact(self):
+        sketch = KLLSketch(seed=1)
+        for value in (5, 1, 4, 2, 3):
+            sketch.add(value)
+        self.assertEqual([sketch.quantile(q) for q in (0, 0.5, 1)], [1, 3, 5])
+        self.assertIsNone(KLLSketch().quantile(0.5))
+
+    def test_merge_and_to_dict(self):
+        parts = [KLLSketch(100, seed=i) for i in range(4)]
+        rng = random.Random(3)
+        values = [rng.gauss(0, 1) for _ in range(40000)]
+        for i, value in enumerate(values):
+            parts[i % 4].add(value)
+        sketch = KLLSketch.from_dict(parts[0].to_dict())
+        for part in parts[1:]:
+            sketch.merge(KLLSketch.from_dict(part.to_dict()))
+        self.assertEqual(sketch.count, len(values))
+        self.assertRankError(sketch, values, 0.05)
+        with self.assertRaises(ValueError):
+            sketch.merge(KLLSketch(200))
+
+
+class ApproxAggregationsTestCase(PyStoreDBTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.events = self.store.collection('events')
+        rng = random.Random(11)
+        with self.store.batch() as batch:
+            for i in range(2000):
+                batch.set(self.events.doc(), {'user': f'user{rng.randrange(500)}', 'duration': rng.randrange(1000)})
+
+    def test_aggregate(self):
+        result = self.events.aggregate(
+            users=ApproxCountDistinct('user'), exact=Count('user', distinct=True), median=ApproxMedian('duration'),
+            p90=ApproxQuantile('duration', 0.9, error=0.005),
+        )
+        self.assertLessEqual(abs(result['users'] - result['exact']), result['exact'] * 0.03)
+        durations = sorted(doc['duration'] for doc in self.events.get().docs)
+        for key, q in (('median', 0.5), ('p90', 0.9)):
+            self.assertLessEqual(abs(durations.index(result[key]) / len(durations) - q), 0.02)
+
+    def test_sketches_are_saved_with_the_collection(self):
+        aggregations = {'users': ApproxCountDistinct('user', sketch=True), 'durations': ApproxMedian('duration', sketch=True)}
+        result = self.events.aggregate(aggregations)
+        sketches = self.store.collection('sketches')
+        sketches.doc('events').set({key: sketch.to_dict() for key, sketch in result.items()})
+
+        # the sketches of new events are merged with the saved ones
+        new_events = [('new', {'user': f'new{i}', 'duration': 5000}) for i in range(100)]
+        new_sketches = accumulate(lambda: new_events, aggregations)
+        saved = sketches.doc('events').get()
+        users = HyperLogLog.from_dict(saved['users']).merge(new_sketches['users'])
+        durations = KLLSketch.from_dict(saved['durations']).merge(new_sketches['durations'])
+        self.assertLessEqual(abs(users.estimate() - 600), 600 * 0.03)
+        self.assertEqual(durations.count, 2100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from datetime import datetime
+
+import test_collections
+import test_document
+import test_persistence
+import test_query_filters
+from PyStoreDB.core.filters import Q
+from PyStoreDB.engines import PyStoreDBSQLiteEngine
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class SQLiteEngineMixin:
+    store_dir = 'test_store_sqlite'
+    engine_class = PyStoreDBSQLiteEngine
+
+
+class SQLiteDocumentCRUDTestCase(SQLiteEngineMixin, test_document.DocumentCRUDTestCase):
+    pass
+
+
+class SQLiteCollectionQueryTestCase(SQLiteEngineMixin, test_collections.CollectionQueryTestCase):
+    pass
+
+
+class SQLiteFiltersTestCase(SQLiteEngineMixin, test_query_filters.FiltersTestCase):
+    pass
+
+
+class SQLitePersistenceTestCase(SQLiteEngineMixin, test_persistence.PersistenceTestCase):
+    pass
+
+
+class SQLiteEngineTestCase(SQLiteEngineMixin, PyStoreDBTestCase):
+
+    @property
+    def engine(self):
+        return self.store._delegate.engine
+
+    def setUp(self):
+        super().setUp()
+        users = self.store.collection('users')
+        users.add({'name': 'John', 'age': 25, 'birthday': datetime(1999, 1, 1)})
+        users.add({'name': 'Jane', 'age': 20, 'country': None})
+        users.add({'name': 'Alice', 'age': 30, 'address': {'city': 'Paris'}})
+        users.add({'name': 'Bob', 'age': 30})
+
+    def test_wal_journal_mode(self):
+        mode = self.engine._execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode.lower(), 'wal')
+
+    def test_where_pushdown(self):
+        clauses, _ = self.engine.compiler.where([Q(age__gte=25, name__in=['John', 'Bob']), Q(name__icontains='o')])
+        self.assertEqual(len(clauses), 2)
+        names = [doc['name'] for doc in self.store.collection('users').where(age__gte=25, name__in=['John', 'Bob']).get().docs]
+        self.assertEqual(names, ['John', 'Bob'])
+        names = [doc['name'] for doc in self.store.collection('users').where(age__lt=30, name__gt='Bob').get().docs]
+        self.assertEqual(names, ['John', 'Jane'])
+        with self.assertRaises(ValueError):
+            self.store.collection('users').where(country__isnull=True).get().docs
+
+    def test_order_by_limit_pushdown(self):
+        kwargs = self.store.collection('users').order_by('age', descending=True).limit(2)._delegate.kwargs
+        order, limit = self.engine._pushdown_order('/users', **kwargs)
+        self.assertIsNotNone(order)
+        self.assertEqual(limit, 2)
+
+        docs = self.store.collection('users').order_by('age', descending=True).limit(2).get().docs
+        self.assertEqual([doc['name'] for doc in docs], ['Alice', 'Bob'])
+        docs = self.store.collection('users').order_by('age').order_by('name').limit_to_last(2).get().docs
+        self.assertEqual([doc['name'] for doc in docs], ['Alice', 'Bob'])
+
+    def test_order_by_mixed_types_is_not_pushed_down(self):
+        self.store.collection('users').add({'name': 'Zack', 'age': '40'})
+        kwargs = self.store.collection('users').order_by('age').limit(2)._delegate.kwargs
+        self.assertEqual(self.engine._pushdown_order('/users', **kwargs), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
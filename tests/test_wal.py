@@ -0,0 +1,71 @@
+import json
+import os
+import unittest
+
+import test_persistence
+from PyStoreDB.test import PyStoreDBTestCase
+
+
+class WriteAheadLogMixin:
+    store_dir = 'test_store_wal'
+    settings_options = {'wal': True, 'checkpoint_interval': 5}
+
+
+class WriteAheadLogPersistenceTestCase(WriteAheadLogMixin, test_persistence.PersistenceTestCase):
+    # the writes are replayed from the log when the store is reopened
+    settings_options = {'wal': True, 'checkpoint_interval': 1000}
+
+
+class WriteAheadLogTestCase(WriteAheadLogMixin, PyStoreDBTestCase):
+
+    @property
+    def snapshot_file(self):
+        return os.path.join(os.path.abspath(self.store_dir), f'{self.store.name}.json')
+
+    @property
+    def log_file(self):
+        return os.path.join(os.path.abspath(self.store_dir), f'{self.store.name}.wal')
+
+    def read_log(self):
+        with open(self.log_file) as f:
+            return [json.loads(line) for line in f]
+
+    def read_snapshot(self):
+        with open(self.snapshot_file) as f:
+            return json.load(f)
+
+    def setUp(self):
+        super().setUp()
+        self.store.clear()
+        self.store._delegate.engine.checkpoint()
+
+    def test_writes_are_appended_to_log(self):
+        user = self.store.collection('users').add({'name': 'John', 'age': 25})
+        user.update(age=26)
+        self.assertEqual([record['op'] for record in self.read_log()], ['set', 'update'])
+        self.assertEqual(self.read_log()[1]['data'], {'age': 26})
+        self.assertEqual(self.read_snapshot(), {})
+
+    def test_checkpoint_truncates_log(self):
+        for i in range(5):
+            self.store.collection('users').add({'index': i})
+        self.assertEqual(self.read_log(), [])
+        self.assertEqual(len(self.read_snapshot()['users']), 5)
+
+        self.store.collection('users').add({'index': 5})
+        self.assertEqual(len(self.read_log()), 1)
+        self.assertEqual(len(self.store.collection('users').get().docs), 6)
+
+    def test_torn_log_tail_is_ignored(self):
+        user = self.store.collection('users').add({'name': 'John'})
+        with open(self.log_file, 'a') as f:
+            f.write('{"op": "set", "path": "/users/x", "da')
+
+        store = self.reopen_store()
+        self.assertTrue(store.doc(user.path).get().exists)
+        self.assertEqual(len(store.collection('users').get().docs), 1)
+        self.assertEqual(len(self.read_log()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()